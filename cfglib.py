@@ -119,6 +119,55 @@ migrate_opts = [
                help='Time wait if except Performing error'),
     cfg.IntOpt('ssh_chunk_size', default=100,
                help='Size of one chunk to transfer via SSH'),
+    cfg.IntOpt('ssh_chunks_in_flight', default=1,
+               help='Number of chunks processed at the same time by '
+                    'SSHChunksTransfer'),
+    cfg.StrOpt('ssh_chunks_manifest_dir', default='ssh_chunks',
+               help='Local directory for lists of transferred chunks, '
+                    'used to resume failed SSH chunks transfer'),
+    cfg.IntOpt('ssh_connections_per_host', default=10,
+               help='Max number of commands executed via ssh on one host at '
+                    'the same time'),
+    cfg.IntOpt('ssh_connection_idle_timeout', default=600,
+               help='Time in seconds after which unused ssh connection is '
+                    'closed'),
+    cfg.IntOpt('mysql_pool_size', default=5,
+               help='Number of connections kept open to every database'),
+    cfg.IntOpt('mysql_pool_recycle', default=3600,
+               help='Time in seconds after which database connection is '
+                    'reopened'),
+    cfg.BoolOpt('mysql_pool_pre_ping', default=True,
+                help='Check database connection before using it'),
+    cfg.BoolOpt('swift_stream_copy', default=False,
+                help='Copy swift objects directly from source to destination '
+                     'instead of downloading all of them into memory first'),
+    cfg.IntOpt('swift_workers', default=1,
+               help='Number of swift objects copied at the same time'),
+    cfg.IntOpt('swift_chunk_size', default=65536,
+               help='Size in bytes of chunks swift objects are streamed by'),
+    cfg.IntOpt('swift_listing_limit', default=10000,
+               help='Number of objects requested in one container listing'),
+    cfg.IntOpt('image_transfer_workers', default=1,
+               help='Number of images copied from glance to glance at the '
+                    'same time, speed_limit is shared between them'),
+    cfg.IntOpt('scheduler_workers', default=1,
+               help='Number of tasks linked with "&" run at the same time, '
+                    '1 - all tasks are run one by one'),
+    cfg.StrOpt('scheduler_pool', default='process',
+               help='Pool used to run tasks at the same time: process or '
+                    'thread. Actions change global env of fabric, so '
+                    'thread is safe only for tasks without ssh commands'),
+    cfg.StrOpt('checkpoint_file', default='migration.checkpoint',
+               help='File where state of migration is saved after every '
+                    'task, it is used to resume failed migration. Empty - '
+                    'state is not saved'),
+    cfg.StrOpt('profile_trace', default='',
+               help='File to write time of every migration task to, in '
+                    'Chrome trace format. Empty - tasks are not profiled'),
+    cfg.IntOpt('instance_workers', default=1,
+               help='Number of instances deployed, started and stopped on '
+                    'destination at the same time. 1 - instances are '
+                    'migrated one by one'),
     cfg.StrOpt('group_file_path',
                help='Path to file with the groups of VMs'),
     cfg.BoolOpt('all_networks', default=False,
@@ -450,7 +499,18 @@ condense_opts = [
     cfg.StrOpt('group_file'),
     cfg.IntOpt('ram_reduction_coef', default=1),
     cfg.IntOpt('core_reduction_coef', default=4),
-    cfg.IntOpt('precision', default=85)]
+    cfg.IntOpt('precision', default=85),
+    cfg.IntOpt('workers', default=1,
+               help='Number of processes recalculating flavor distribution '
+                    'over nodes'),
+    cfg.IntOpt('cache_size', default=1024,
+               help='Number of knapsack solutions kept in cache'),
+    cfg.IntOpt('max_iterations', default=0,
+               help='Maximal number of condensation iterations, '
+                    '0 means no limit'),
+    cfg.IntOpt('time_limit', default=0,
+               help='Maximal time of condensation in seconds, '
+                    '0 means no limit')]
 
 database = cfg.OptGroup(name="database",
                         title="options for database")
@@ -17,6 +17,7 @@ import cloud
 import cloud_ferry
 from cloudferrylib.base.action import copy_var, rename_info, merge, is_end_iter, get_info_iter
 from cloudferrylib.os.actions import identity_transporter
+from cloudferrylib.scheduler import checkpoint
 from cloudferrylib.scheduler import scheduler
 from cloudferrylib.scheduler import namespace
 from cloudferrylib.scheduler import cursor
@@ -56,6 +57,7 @@ from cloudferrylib.os.actions import transport_ephemeral
 from cloudferrylib.os.actions import is_not_transport_image
 from cloudferrylib.os.actions import is_not_merge_diff
 from cloudferrylib.os.actions import stop_vm
+from cloudferrylib.utils import profiler
 from cloudferrylib.utils import utils as utl
 from cloudferrylib.os.actions import transport_compute_resources
 from cloudferrylib.os.actions import task_transfer
@@ -78,6 +80,8 @@ from cloudferrylib.os.actions import check_sql
 from cloudferrylib.os.actions import check_rabbitmq
 from cloudferrylib.os.actions import check_bandwidth
 
+LOG = utl.get_log(__name__)
+
 
 class OS2OSFerry(cloud_ferry.CloudFerry):
 
@@ -103,7 +107,7 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
             'SSHChunksTransfer': ssh_chunks.SSHChunksTransfer,
         }
 
-    def migrate(self, scenario=None):
+    def migrate(self, scenario=None, resume=False):
         namespace_scheduler = namespace.Namespace({
             '__init_task__': self.init,
             'info_result': {
@@ -124,8 +128,30 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
             scenario.init_tasks(self.init)
             scenario.load_scenario()
             process_migration = {k: cursor.Cursor(v) for k, v in scenario.get_net().items()}
-        scheduler_migr = scheduler.Scheduler(namespace=namespace_scheduler, **process_migration)
-        scheduler_migr.start()
+        migration_checkpoint = None
+        if self.config.migrate.checkpoint_file:
+            migration_checkpoint = checkpoint.Checkpoint(
+                self.config.migrate.checkpoint_file)
+        task_profiler = None
+        if self.config.migrate.profile_trace:
+            task_profiler = profiler.Profiler()
+            utl.stack_call_functions.addListener(task_profiler)
+        scheduler_migr = scheduler.Scheduler(
+            namespace=namespace_scheduler,
+            workers=self.config.migrate.scheduler_workers,
+            pool_type=self.config.migrate.scheduler_pool,
+            profiler=task_profiler,
+            checkpoint=migration_checkpoint,
+            resume=resume,
+            **process_migration)
+        try:
+            scheduler_migr.start()
+        finally:
+            if task_profiler:
+                utl.stack_call_functions.removeListenerLast()
+                task_profiler.dump_trace(self.config.migrate.profile_trace)
+                LOG.info("Time of migration tasks:\n%s",
+                         task_profiler.summary())
 
     def process_migrate(self):
         check_environment = self.check_environment()
@@ -33,7 +33,14 @@ class Action(task.Task):
         pass
 
     def save(self):
-        pass
-
-    def restore(self):
+        """
+        Return picklable state of the action which is kept in checkpoint,
+        None - action has no state
+        """
+        return None
+
+    def restore(self, state):
+        """
+        Restore state returned by save when migration is resumed
+        """
         pass
@@ -36,7 +36,8 @@ class CopyFromGlanceToGlance(transporter.Transporter):
         return {'images_info': new_info}
 
     @staticmethod
-    def callback_print_progress(size, length, obj_id, name):
+    def callback_print_progress(size, length, obj_id, name, speed=None,
+                                total_speed=None):
         LOG.info(
             "Download {0} bytes of {1} ({2}%) - id = {3} name = {4}".format(
                 size,
@@ -44,3 +45,6 @@ class CopyFromGlanceToGlance(transporter.Transporter):
                 size * 100 / length,
                 obj_id,
                 name))
+        if speed is not None:
+            LOG.info("Image {0} speed {1} B/s, total speed {2} B/s".format(
+                obj_id, int(speed), int(total_speed)))
@@ -30,5 +30,6 @@ class CopyFromObjectToObject(transporter.Transporter):
             action_get_obj = get_info_objects.GetInfoObjects(self.init,
                                                              self.src_cloud)
             objstorage_info = action_get_obj.run()
-        dst_objstorage.deploy(objstorage_info)
+        src_objstorage = self.src_cloud.resources[utl.OBJSTORAGE_RESOURCE]
+        dst_objstorage.deploy(objstorage_info, src_objstorage=src_objstorage)
         return {}
@@ -13,9 +13,8 @@
 # limitations under the License.
 
 
-import copy
-
 from cloudferrylib.base.action import action
+from cloudferrylib.utils import cow
 from cloudferrylib.utils import utils as utl
 
 
@@ -23,14 +22,13 @@ class PrepareNetworks(action.Action):
 
     def run(self, info=None, **kwargs):
 
-        info_compute = copy.deepcopy(info)
-
         network_resource = self.cloud.resources[utl.NETWORK_RESOURCE]
         identity_resource = self.cloud.resources[utl.IDENTITY_RESOURCE]
 
         keep_ip = self.cfg.migrate.keep_ip
 
-        instances = info_compute[utl.INSTANCES_TYPE]
+        instances = info[utl.INSTANCES_TYPE]
+        nics = {}
 
         # Get all tenants, participated in migration process
         tenants = set()
@@ -75,8 +73,9 @@ class PrepareNetworks(action.Action):
                         dst_floatingip_id = dst_flotingips_map[src_net['floatingip']]
                         floating_ip = network_resource.update_floatingip(dst_floatingip_id, port['id'])
                 params.append({'net-id': dst_net['id'], 'port-id': port['id']})
-            instances[id_inst][utl.INSTANCE_BODY]['nics'] = params
-        info_compute[utl.INSTANCES_TYPE] = instances
+            nics[(utl.INSTANCES_TYPE, id_inst, utl.INSTANCE_BODY,
+                  'nics')] = params
+        info_compute = cow.evolve(info, nics)
 
         # Reset DHCP to the original settings
         for snet in subnets:
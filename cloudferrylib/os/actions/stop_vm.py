@@ -13,13 +13,11 @@
 # limitations under the License.
 
 from cloudferrylib.base.action import action
-import copy
 
 
 class StopVms(action.Action):
 
     def run(self, info=None, **kwargs):
-        info = copy.deepcopy(info)
         compute_resource = self.cloud.resources['compute']
 
         for instance in info['instances']:
@@ -14,6 +14,7 @@
 
 
 import copy
+from multiprocessing.pool import ThreadPool
 
 from fabric.api import env
 from fabric.api import run
@@ -26,9 +27,12 @@ from cloudferrylib.os.actions import convert_volume_to_image
 from cloudferrylib.os.actions import copy_g2g
 from cloudferrylib.os.actions import task_transfer
 from cloudferrylib.os.identity import keystone
+from cloudferrylib.utils import cow
 from cloudferrylib.utils import utils as utl, forward_agent
 
 
+LOG = utl.get_log(__name__)
+
 CLOUD = 'cloud'
 BACKEND = 'backend'
 CEPH = 'ceph'
@@ -61,23 +65,20 @@ class TransportInstance(action.Action):
     # TODO constants
 
     def run(self, info=None, **kwargs):
-        info = copy.deepcopy(info)
         new_info = {
             utl.INSTANCES_TYPE: {
             }
         }
 
-        #Get next one instance
-        for instance_id, instance in info[utl.INSTANCES_TYPE].iteritems():
-            instance = self._replace_user_ids(instance)
-
-            one_instance = {
-                utl.INSTANCES_TYPE: {
-                    instance_id: instance
-                }
-            }
-            one_instance = self.deploy_instance(self.dst_cloud, one_instance)
+        instances = info[utl.INSTANCES_TYPE].items()
+        workers = self.cfg.migrate.instance_workers
+        if workers > 1 and len(instances) > 1:
+            migrated = self._transport_instances_in_pool(instances, workers)
+        else:
+            migrated = (self.transport_one_instance(instance_id, instance)
+                        for instance_id, instance in instances)
 
+        for one_instance in migrated:
             new_info[utl.INSTANCES_TYPE].update(
                 one_instance[utl.INSTANCES_TYPE])
 
@@ -85,8 +86,46 @@ class TransportInstance(action.Action):
             'info': new_info
         }
 
+    def transport_one_instance(self, instance_id, instance):
+        instance = self._replace_user_ids(instance)
+
+        one_instance = {
+            utl.INSTANCES_TYPE: {
+                instance_id: instance
+            }
+        }
+        return self.deploy_instance(self.dst_cloud, one_instance)
+
+    def _transport_instances_in_pool(self, instances, workers):
+        """Deploys instances by pool of threads. Most of the time instance
+        spends in waiting for status on destination, so instances are
+        independent of each other and may be processed at the same time.
+        Instance which failed doesn't stop others, failed instances are
+        raised by RuntimeError when the pool is finished."""
+
+        pool = ThreadPool(min(workers, len(instances)))
+        try:
+            results = pool.map(self._safe_transport_one_instance, instances)
+        finally:
+            pool.close()
+            pool.join()
+
+        failed = [instance_id for (instance_id, _), res in
+                  zip(instances, results) if res is None]
+        if failed:
+            raise RuntimeError("Instances failed to migrate: %s" %
+                               ", ".join(failed))
+        return results
+
+    def _safe_transport_one_instance(self, instance_item):
+        instance_id, instance = instance_item
+        try:
+            return self.transport_one_instance(instance_id, instance)
+        except Exception as e:
+            LOG.error("Failed to migrate instance '%s': %s", instance_id, e)
+            return None
+
     def deploy_instance(self, dst_cloud, info):
-        info = copy.deepcopy(info)
         dst_compute = dst_cloud.resources[COMPUTE]
 
         new_ids = dst_compute.deploy(info)
@@ -100,40 +139,31 @@ class TransportInstance(action.Action):
             old_instance = info['instances'][old_id]
 
             new_instance['old_id'] = old_id
-            new_instance['meta'] = old_instance['meta']
+            # new_info is read from destination and owned here, meta of
+            # source info must not be shared with it
+            new_instance['meta'] = copy.deepcopy(old_instance['meta'])
             new_instance[utl.INSTANCE_BODY]['key_name'] = \
                 old_instance[utl.INSTANCE_BODY]['key_name']
         info = self.prepare_ephemeral_drv(info, new_info, new_ids)
         return info
 
     def prepare_ephemeral_drv(self, info, new_info, map_new_to_old_ids):
-        info = copy.deepcopy(info)
-        new_info = copy.deepcopy(new_info)
+        updates = {}
         for new_id, old_id in map_new_to_old_ids.iteritems():
             instance_old = info[INSTANCES][old_id]
             instance_new = new_info[INSTANCES][new_id]
 
-            ephemeral_path_dst = instance_new[EPHEMERAL][PATH_SRC]
-            instance_new[EPHEMERAL][PATH_DST] = ephemeral_path_dst            
-            ephemeral_host_dst = instance_new[EPHEMERAL][HOST_SRC]
-            instance_new[EPHEMERAL][HOST_DST] = ephemeral_host_dst
-            
-            diff_path_dst = instance_new[DIFF][PATH_SRC]
-            instance_new[DIFF][PATH_DST] = diff_path_dst            
-            diff_host_dst = instance_new[DIFF][HOST_SRC]
-            instance_new[DIFF][HOST_DST] = diff_host_dst
-
-            ephemeral_path_src = instance_old[EPHEMERAL][PATH_SRC]
-            instance_new[EPHEMERAL][PATH_SRC] = ephemeral_path_src            
-            ephemeral_host_src = instance_old[EPHEMERAL][HOST_SRC]
-            instance_new[EPHEMERAL][HOST_SRC] = ephemeral_host_src
-            
-            diff_path_src = instance_old[DIFF][PATH_SRC]
-            instance_new[DIFF][PATH_SRC] = diff_path_src            
-            diff_host_src = instance_old[DIFF][HOST_SRC]
-            instance_new[DIFF][HOST_SRC] = diff_host_src
-
-        return new_info
+            for disk in (EPHEMERAL, DIFF):
+                # disk of new instance becomes destination, disk of old
+                # instance is source
+                updates[(INSTANCES, new_id, disk)] = dict(
+                    instance_new[disk],
+                    **{PATH_DST: instance_new[disk][PATH_SRC],
+                       HOST_DST: instance_new[disk][HOST_SRC],
+                       PATH_SRC: instance_old[disk][PATH_SRC],
+                       HOST_SRC: instance_old[disk][HOST_SRC]})
+
+        return cow.evolve(new_info, updates)
 
     def _replace_user_ids(self, instance):
         """User IDs for VMs on DST by default is set to admin's ID. This
@@ -145,5 +175,4 @@ class TransportInstance(action.Action):
             self.dst_cloud.resources[utl.IDENTITY_RESOURCE],
             src_user_id
         )
-        instance['instance']['user_id'] = dst_user.id
-        return instance
+        return cow.evolve(instance, {('instance', 'user_id'): dst_user.id})
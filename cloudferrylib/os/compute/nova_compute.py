@@ -339,8 +339,6 @@ class NovaCompute(compute.Compute):
         :param identity_info: Identity info.
         """
 
-        info = copy.deepcopy(info)
-
         if target == 'resources':
             info = self._deploy_resources(info, **kwargs)
         elif target == 'instances':
@@ -356,10 +354,8 @@ class NovaCompute(compute.Compute):
         for flavor_id, _flavor in flavors.iteritems():
             flavor = _flavor['flavor']
             if flavor['name'] in dest_flavors:
-                # _flavor['meta']['dest_id'] = dest_flavors[flavor['name']]
-                _flavor['meta']['id'] = dest_flavors[flavor['name']]
                 continue
-            _flavor['meta']['id'] = self.create_flavor(
+            dest_flavor_id = self.create_flavor(
                 name=flavor['name'],
                 flavorid=flavor_id,
                 ram=flavor['ram'],
@@ -371,7 +367,7 @@ class NovaCompute(compute.Compute):
                 is_public=flavor['is_public']).id
             if not flavor['is_public']:
                 for tenant in flavor['tenants']:
-                    self.add_flavor_access(_flavor['meta']['id'],
+                    self.add_flavor_access(dest_flavor_id,
                                            tenant_map[tenant])
 
     def _deploy_quotas(self, quotas, tenant_map, user_map=None):
@@ -410,7 +406,9 @@ class NovaCompute(compute.Compute):
         for _instance in info_compute['instances'].itervalues():
             instance = _instance['instance']
             meta = _instance['meta']
-            self.nova_client = nova_tenants_clients[instance['tenant_name']]
+            # client is not stored in self.nova_client, because
+            # TransportInstance may call deploy from several threads at once
+            tenant_client = nova_tenants_clients[instance['tenant_name']]
             create_params = {'name': instance['name'],
                              'flavor': instance['flavor_id'],
                              'key_name': instance['key_name'],
@@ -428,12 +426,12 @@ class NovaCompute(compute.Compute):
                     "boot_index": 0
                 }]
                 create_params['image'] = None
-            new_id = self.create_instance(**create_params)
+            new_id = self.create_instance(nova_client=tenant_client,
+                                          **create_params)
             new_ids[new_id] = instance['id']
-        self.nova_client = nova_tenants_clients[self.config['cloud']['tenant']]
         return new_ids
 
-    def create_instance(self, **kwargs):
+    def create_instance(self, nova_client=None, **kwargs):
         # do not provide key pair as boot argument, it will be updated with the
         # low level SQL update. See
         # `cloudferrylib.os.actions.transport_compute_resources` for more
@@ -443,7 +441,8 @@ class NovaCompute(compute.Compute):
         boot_args = {k: v for k, v in kwargs.items()
                      if k not in ignored_instance_args}
 
-        created_instance = self.nova_client.servers.create(**boot_args)
+        nova_client = nova_client or self.nova_client
+        created_instance = nova_client.servers.create(**boot_args)
 
         instances.update_user_ids_for_instance(self.mysql_connector,
                                                created_instance.id,
@@ -47,6 +47,8 @@ class KeystoneIdentity(identity.Identity):
                                    self.config['mail']['server'])
         self.templater = Templater()
         self.generator = GeneratorPassword()
+        # sparse matrix of role assignments, see get_roles_matrix
+        self.roles_matrix = None
 
     @staticmethod
     def convert(identity_obj, cfg):
@@ -227,6 +229,64 @@ class KeystoneIdentity(identity.Identity):
 
         return self.keystone_client.roles.roles_for_user(user_id, tenant_id)
 
+    def get_tenant_users(self, tenant_id):
+        """ Getting list of users which have roles in tenant. """
+
+        return self.keystone_client.tenants.list_users(tenant_id)
+
+    def get_roles_matrix(self):
+        """ Getting role assignments of all users in all tenants.
+
+        Keystone v2 API has no call which lists all assignments, so they are
+        read from assignment table of keystone database by one query. If
+        database can't be read (e.g. keystone older than Icehouse has no
+        assignment table), roles are requested by API only for users which
+        are members of tenant. Result is cached until tenants or users are
+        created.
+
+        :return: Dictionary {(user_id, tenant_id): [role, ...]} with
+                 non-empty role lists only.
+        """
+
+        if self.roles_matrix is None:
+            try:
+                self.roles_matrix = self._get_roles_matrix_from_db()
+            except Exception as e:
+                LOG.warning("Unable to read role assignments from keystone "
+                            "database, requesting them by API: %s", e)
+                self.roles_matrix = self._get_roles_matrix_from_api()
+        return self.roles_matrix
+
+    def _get_roles_matrix_from_db(self):
+        roles = {role.id: role for role in self.get_roles_list()}
+        matrix = {}
+        for user_id, tenant_id, role_id in self.mysql_connector.iter_rows(
+                "SELECT actor_id, target_id, role_id FROM assignment "
+                "WHERE type = 'UserProject' AND inherited = 0"):
+            if role_id in roles:
+                matrix.setdefault((user_id, tenant_id), []).append(
+                    roles[role_id])
+        return matrix
+
+    def _get_roles_matrix_from_api(self):
+        matrix = {}
+        for tenant in self.get_tenants_list():
+            for user in self.get_tenant_users(tenant.id):
+                roles = self.roles_for_user(user.id, tenant.id)
+                if roles:
+                    matrix[(user.id, tenant.id)] = list(roles)
+        return matrix
+
+    def add_user_role(self, user_id, role_id, tenant_id):
+        """ Grant role to user in tenant. """
+
+        role = self.keystone_client.roles.add_user_role(user_id, role_id,
+                                                        tenant_id)
+        if self.roles_matrix is not None:
+            self.roles_matrix.setdefault((user_id, tenant_id), []).append(
+                role)
+        return role
+
     def create_role(self, role_name):
         """ Create new role in keystone. """
 
@@ -235,6 +295,7 @@ class KeystoneIdentity(identity.Identity):
     def create_tenant(self, tenant_name, description=None, enabled=True):
         """ Create new tenant in keystone. """
 
+        self.roles_matrix = None
         return self.keystone_client.tenants.create(tenant_name=tenant_name,
                                                    description=description,
                                                    enabled=enabled)
@@ -243,6 +304,8 @@ class KeystoneIdentity(identity.Identity):
                     enabled=True):
         """ Create new user in keystone. """
 
+        # user created with tenant gets default role in it
+        self.roles_matrix = None
         return self.keystone_client.users.create(name=name,
                                                  password=password,
                                                  email=email,
@@ -358,40 +421,44 @@ class KeystoneIdentity(identity.Identity):
                 _role['meta']['new_id'] = dst_roles[role['name']]
 
     def _get_user_passwords(self):
+        user_names = {user.id: user.name for user in self.get_users_list()}
         info = {}
-        for user in self.get_users_list():
-            for password in self.mysql_connector.execute(
-                    "SELECT password FROM user WHERE id = :user_id",
-                    user_id=user.id):
-                info[user.name] = password[0]
+        for user_id, password in self.mysql_connector.iter_rows(
+                "SELECT id, password FROM user"):
+            if user_id in user_names:
+                info[user_names[user_id]] = password
 
         return info
 
     def _get_user_tenants_roles(self):
+        """Roles of users in tenants by names. Only pairs of user and tenant
+        which have roles are included."""
+
+        user_names = {user.id: user.name for user in self.get_users_list()}
+        tenant_names = {tenant.id: tenant.name for tenant in
+                        self.get_tenants_list()}
         user_tenants_roles = {}
-        tenants = self.get_tenants_list()
-        for user in self.get_users_list():
-            user_tenants_roles[user.name] = {}
-            for tenant in tenants:
-                roles = []
-                for role in self.roles_for_user(user.id, tenant.id):
-                    roles.append({'role': {'name': role.name, 'id': role.id}})
-                user_tenants_roles[user.name][tenant.name] = roles
+        for (user_id, tenant_id), roles in self.get_roles_matrix().iteritems():
+            if user_id not in user_names or tenant_id not in tenant_names:
+                continue
+            user_roles = user_tenants_roles.setdefault(user_names[user_id], {})
+            user_roles[tenant_names[tenant_id]] = [
+                {'role': {'name': role.name, 'id': role.id}}
+                for role in roles]
         return user_tenants_roles
 
     def _upload_user_passwords(self, users, user_passwords):
-        for _user in users:
-            user = _user['user']
-            if not _user['meta']['overwrite_password']:
-                continue
-            self.mysql_connector.execute(
-                "UPDATE user SET password = :password WHERE id = :user_id",
-                user_id=_user['meta']['new_id'],
-                password=user_passwords[user['name']])
+        params = [{'user_id': _user['meta']['new_id'],
+                   'password': user_passwords[_user['user']['name']]}
+                  for _user in users if _user['meta']['overwrite_password']]
+        self.mysql_connector.execute_many(
+            "UPDATE user SET password = :password WHERE id = :user_id",
+            params)
 
     def _upload_user_tenant_roles(self, user_tenants_roles, users, tenants):
         roles_id = {role.name: role.id for role in self.get_roles_list()}
         dst_users = {user.name: user.id for user in self.get_users_list()}
+        dst_roles_matrix = self.get_roles_matrix()
 
         for _user in users:
             user = _user['user']
@@ -401,18 +468,23 @@ class KeystoneIdentity(identity.Identity):
                 continue
             if user['name'] not in dst_users:
                 continue
+            user_roles = user_tenants_roles.get(user['name'], {})
             for _tenant in tenants:
                 tenant = _tenant['tenant']
-                exists_roles = [role.name for role in
-                                self.roles_for_user(_user['meta']['new_id'],
-                                                    _tenant['meta']['new_id'])]
-                for _role in user_tenants_roles[user['name']][tenant['name']]:
+                roles = user_roles.get(tenant['name'])
+                if not roles:
+                    continue
+                exists_roles = set(
+                    role.name for role in dst_roles_matrix.get(
+                        (_user['meta']['new_id'], _tenant['meta']['new_id']),
+                        []))
+                for _role in roles:
                     role = _role['role']
                     if role['name'] in exists_roles:
                         continue
-                    self.keystone_client.roles.add_user_role(
-                        _user['meta']['new_id'], roles_id[role['name']],
-                        _tenant['meta']['new_id'])
+                    self.add_user_role(_user['meta']['new_id'],
+                                       roles_id[role['name']],
+                                       _tenant['meta']['new_id'])
 
     def _generate_password(self):
         return self.generator.get_random_password()
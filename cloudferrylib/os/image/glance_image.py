@@ -18,6 +18,7 @@ import datetime
 import json
 import re
 import time
+from multiprocessing.pool import ThreadPool
 
 from fabric.api import run
 from fabric.api import settings
@@ -122,6 +123,16 @@ class GlanceImage(image.Image):
             if im in (glance_image.name, glance_image.id):
                 return glance_image
 
+    def _get_images_by_name_or_id(self):
+        """ Index of images by name and id, same as get_image for all
+        images at once. """
+
+        images = {}
+        for glance_image in self.get_image_list():
+            images.setdefault(glance_image.name, glance_image)
+            images.setdefault(glance_image.id, glance_image)
+        return images
+
     def get_image_status(self, image_id):
         return self.get_image_by_id(image_id).status
 
@@ -188,9 +199,11 @@ class GlanceImage(image.Image):
                 result[img.id][tenant_name] = entry.can_share
         return result
 
-    def create_member(self, image_id, tenant_name, can_share):
+    def create_member(self, image_id, tenant_name, can_share, tenant_id=None):
         # change tenant_name to tenant_id
-        tenant_id = self.identity_client.get_tenant_id_by_name(tenant_name)
+        if tenant_id is None:
+            tenant_id = self.identity_client.get_tenant_id_by_name(
+                tenant_name)
         self.glance_client.image_members.create(
             image_id,
             tenant_id,
@@ -233,13 +246,15 @@ class GlanceImage(image.Image):
             info = self.make_image_info(glance_image, info)
 
         elif kwargs.get('images_list'):
+            images = self._get_images_by_name_or_id()
             for im in kwargs['images_list']:
-                glance_image = self.get_image(im)
+                glance_image = images.get(im)
                 info = self.make_image_info(glance_image, info)
 
         elif kwargs.get('images_list_meta'):
+            images = self._get_images_by_name_or_id()
             for (im, meta) in kwargs['images_list_meta']:
-                glance_image = self.get_image(im)
+                glance_image = images.get(im)
                 info = self.make_image_info(glance_image, info)
                 info['images'][glance_image.id]['meta'] = meta
 
@@ -279,24 +294,37 @@ class GlanceImage(image.Image):
         migrate_images_list = []
         delete_container_format, delete_disk_format = [], []
         empty_image_list = {}
+        # destination images are listed once and index is updated with
+        # created images
+        dst_img_checksums, dst_img_names_checksums = self._get_images_index(
+            self.get_image_list())
+        tenant_ids = {tenant.name: tenant.id for tenant in
+                      self.identity_client.get_tenants_list()}
+        user_ids = {}
+        images_to_create = []
+        # images with the same name and checksum as image which will be
+        # created are not uploaded twice
+        keys_to_create = set()
+        duplicate_images = []
         for image_id_src, gl_image in info['images'].iteritems():
             if gl_image['image']:
-                dst_img_checksums = {x.checksum: x for x in
-                                     self.get_image_list()}
-                dst_img_names = [x.name for x in self.get_image_list()]
                 checksum_current = gl_image['image']['checksum']
                 name_current = gl_image['image']['name']
                 meta = gl_image['meta']
-                if checksum_current in dst_img_checksums and (
-                        name_current) in dst_img_names:
+                if (name_current, checksum_current) in dst_img_names_checksums:
                     migrate_images_list.append(
-                        (dst_img_checksums[checksum_current], meta))
+                        (dst_img_names_checksums[(name_current,
+                                                  checksum_current)], meta))
                     continue
+                if (name_current, checksum_current) in keys_to_create:
+                    duplicate_images.append(
+                        ((name_current, checksum_current), meta))
+                    continue
+                keys_to_create.add((name_current, checksum_current))
 
                 LOG.debug("updating owner of image {image}".format(
                     image=gl_image["image"]["owner"]))
-                gl_image["image"]["owner"] = \
-                    self.identity_client.get_tenant_id_by_name(
+                gl_image["image"]["owner"] = tenant_ids.get(
                     gl_image["image"]["owner_name"])
                 del gl_image["image"]["owner_name"]
 
@@ -314,40 +342,35 @@ class GlanceImage(image.Image):
                         LOG.debug("updating snapshot metadata for field "
                                   "'user_id' for image {image}".format(
                                       image=gl_image["image"]["id"]))
-                        metadata["user_id"] = \
-                            self.identity_client.keystone_client.users.find(
-                                username=metadata["user_name"]).id
+                        user_name = metadata["user_name"]
+                        if user_name not in user_ids:
+                            keystone_client = \
+                                self.identity_client.keystone_client
+                            user_ids[user_name] = keystone_client.users.find(
+                                username=user_name).id
+                        metadata["user_id"] = user_ids[user_name]
                         del metadata["user_name"]
 
-                LOG.debug("migrating image {image}".format(
-                    image=gl_image["image"]["id"]))
-                # we can face situation when image has no
-                # disk_format and container_format properties
-                # this situation appears, when image was created
-                # with option --copy-from
-                # glance-client cannot create image without this
-                # properties, we need to create them artificially
-                # and then - delete from database
-                migrate_image = self.create_image(
-                    name=gl_image['image']['name'],
-                    container_format=gl_image['image']['container_format'] or "bare",
-                    disk_format=gl_image['image']['disk_format'] or "qcow2",
-                    is_public=gl_image['image']['is_public'],
-                    protected=gl_image['image']['protected'],
-                    owner=gl_image['image']['owner'],
-                    size=gl_image['image']['size'],
-                    properties=gl_image['image']['properties'],
-                    data=file_like_proxy.FileLikeProxy(
-                        gl_image['image'],
-                        callback,
-                        self.config['migrate']['speed_limit']))
-                migrate_images_list.append((migrate_image, meta))
-                if not gl_image["image"]["container_format"]:
-                    delete_container_format.append(migrate_image.id)
-                if not gl_image["image"]["disk_format"]:
-                    delete_disk_format.append(migrate_image.id)
+                images_to_create.append((gl_image, meta))
             else:
                 empty_image_list[image_id_src] = gl_image
+
+        created_images = self._create_images(
+            [gl_image for gl_image, _ in images_to_create], callback)
+        for (gl_image, meta), migrate_image in zip(images_to_create,
+                                                   created_images):
+            checksum_current = gl_image['image']['checksum']
+            name_current = gl_image['image']['name']
+            migrate_images_list.append((migrate_image, meta))
+            dst_img_checksums[checksum_current] = migrate_image
+            dst_img_names_checksums[(name_current,
+                                     checksum_current)] = migrate_image
+            if not gl_image["image"]["container_format"]:
+                delete_container_format.append(migrate_image.id)
+            if not gl_image["image"]["disk_format"]:
+                delete_disk_format.append(migrate_image.id)
+        for key, meta in duplicate_images:
+            migrate_images_list.append((dst_img_names_checksums[key], meta))
         if migrate_images_list:
             im_name_list = [(im.name, meta) for (im, meta) in
                             migrate_images_list]
@@ -356,10 +379,10 @@ class GlanceImage(image.Image):
         # on this step we need to create map between source ids and dst ones
         LOG.debug("creating map between source and destination image ids")
         image_ids_map = {}
-        dst_img_checksums = {x.checksum: x.id for x in self.get_image_list()}
         for image_id_src, gl_image in info['images'].iteritems():
             cur_image = gl_image["image"]
-            image_ids_map[cur_image["id"]] = dst_img_checksums[cur_image["checksum"]]
+            image_ids_map[cur_image["id"]] = \
+                dst_img_checksums[cur_image["checksum"]].id
         LOG.debug("deploying image members")
         for image_id, data in info.get("members", {}).items():
             for tenant_name, can_share in data.items():
@@ -370,11 +393,72 @@ class GlanceImage(image.Image):
                 self.create_member(
                     image_ids_map[image_id],
                     tenant_name,
-                    can_share)
+                    can_share,
+                    tenant_id=tenant_ids.get(tenant_name))
         self.delete_fields('disk_format', delete_disk_format)
         self.delete_fields('container_format', delete_container_format)
         return new_info
 
+    def _create_images(self, gl_images, callback=None):
+        """Uploading images, image_transfer_workers images at the same
+        time. All uploads share one speed_limit.
+
+        :return: list of created images in the same order as gl_images
+        """
+
+        limiter = file_like_proxy.TokenBucket(
+            file_like_proxy.parse_speed_limit(
+                self.config['migrate']['speed_limit']))
+        workers = self.config['migrate']['image_transfer_workers']
+
+        def create(gl_image):
+            return self._create_image_from_source(gl_image, callback, limiter)
+
+        if workers > 1 and len(gl_images) > 1:
+            pool = ThreadPool(workers)
+            try:
+                return pool.map(create, gl_images)
+            finally:
+                pool.close()
+                pool.join()
+        return [create(gl_image) for gl_image in gl_images]
+
+    def _create_image_from_source(self, gl_image, callback, limiter):
+        LOG.debug("migrating image {image}".format(
+            image=gl_image["image"]["id"]))
+        # we can face situation when image has no
+        # disk_format and container_format properties
+        # this situation appears, when image was created
+        # with option --copy-from
+        # glance-client cannot create image without this
+        # properties, we need to create them artificially
+        # and then - delete from database
+        return self.create_image(
+            name=gl_image['image']['name'],
+            container_format=gl_image['image']['container_format'] or "bare",
+            disk_format=gl_image['image']['disk_format'] or "qcow2",
+            is_public=gl_image['image']['is_public'],
+            protected=gl_image['image']['protected'],
+            owner=gl_image['image']['owner'],
+            size=gl_image['image']['size'],
+            properties=gl_image['image']['properties'],
+            data=file_like_proxy.FileLikeProxy(
+                gl_image['image'],
+                callback,
+                self.config['migrate']['speed_limit'],
+                limiter=limiter))
+
+    @staticmethod
+    def _get_images_index(images):
+        """Indexes of images by checksum and by (name, checksum)."""
+
+        by_checksum = {}
+        by_name_checksum = {}
+        for image in images:
+            by_checksum[image.checksum] = image
+            by_name_checksum[(image.name, image.checksum)] = image
+        return by_checksum, by_name_checksum
+
     def delete_fields(self, field, list_of_ids):
         if not list_of_ids:
             return
@@ -39,6 +39,10 @@ class NeutronNetwork(network.Network):
         self.neutron_client = self.proxy(self.get_client(), config)
         self.ext_net_map = \
             utl.read_yaml_file(self.config.migrate.ext_net_map) or {}
+        # lookup tables built on first use, see get_ports_index and
+        # get_networks_index
+        self.ports_index = None
+        self.networks_index = None
 
     def get_client(self):
         return neutron_client.Client(
@@ -101,14 +105,48 @@ class NeutronNetwork(network.Network):
         return self.get_mac_by_ip
 
     def get_mac_by_ip(self, ip_address):
-        for port in self.get_list_ports():
-            for fixed_ip_info in port['fixed_ips']:
-                if fixed_ip_info['ip_address'] == ip_address:
-                    return port["mac_address"]
+        port = self.get_ports_index()['ip'].get(ip_address)
+        if port:
+            return port["mac_address"]
 
     def get_list_ports(self, **kwargs):
         return self.neutron_client.list_ports(**kwargs)['ports']
 
+    def get_ports_index(self):
+        """Ports of the cloud by fixed IP and by (network_id, MAC). It is
+        built by one list call and updated when ports are created or
+        deleted through this class."""
+
+        if self.ports_index is None:
+            self.ports_index = {'ip': {}, 'net_mac': {}}
+            for port in self.get_list_ports():
+                self._add_port_to_index(port)
+        return self.ports_index
+
+    def _add_port_to_index(self, port):
+        # first port in the list wins, as in the sequential search
+        for fixed_ip_info in port['fixed_ips']:
+            self.ports_index['ip'].setdefault(fixed_ip_info['ip_address'],
+                                              port)
+        self.ports_index['net_mac'].setdefault(
+            (port['network_id'], port['mac_address']), port)
+
+    def get_networks_index(self):
+        """Networks by id and by name, and subnets with parsed CIDRs by
+        tenant id. Invalidated when networks or subnets are uploaded."""
+
+        if self.networks_index is None:
+            index = {'id': {}, 'name': {}, 'tenant_subnets': {}}
+            for net in self.neutron_client.list_networks()['networks']:
+                index['id'][net['id']] = net
+                index['name'].setdefault(net['name'], net)
+            for snet in self.neutron_client.list_subnets()['subnets']:
+                index['tenant_subnets'].setdefault(snet['tenant_id'], []).\
+                    append((ipaddr.IPNetwork(snet['cidr']),
+                            snet['network_id']))
+            self.networks_index = index
+        return self.networks_index
+
     def create_port(self, net_id, mac, ip, tenant_id, keep_ip, sg_ids=None):
         param_create_port = {'network_id': net_id,
                              'mac_address': mac,
@@ -117,35 +155,44 @@ class NeutronNetwork(network.Network):
             param_create_port['security_groups'] = sg_ids
         if keep_ip:
             param_create_port['fixed_ips'] = [{"ip_address": ip}]
-        return self.neutron_client.create_port({
+        port = self.neutron_client.create_port({
             'port': param_create_port})['port']
+        if self.ports_index is not None:
+            self._add_port_to_index(port)
+        return port
 
     def delete_port(self, port_id):
+        self.ports_index = None
         return self.neutron_client.delete_port(port_id)
 
     def get_network(self, network_info, tenant_id, keep_ip=False):
+        index = self.get_networks_index()
         if keep_ip:
             instance_addr = ipaddr.IPAddress(network_info['ip'])
-            for snet in self.neutron_client.list_subnets()['subnets']:
-                if snet['tenant_id'] == tenant_id:
-                    if ipaddr.IPNetwork(snet['cidr']).Contains(instance_addr):
-                        return self.neutron_client.\
-                            list_networks(id=snet['network_id'])['networks'][0]
+            for cidr, network_id in index['tenant_subnets'].get(tenant_id,
+                                                                []):
+                if cidr.Contains(instance_addr):
+                    return self._get_indexed_network(index, id=network_id)
         if 'id' in network_info:
-            return self.neutron_client.\
-                list_networks(id=network_info['id'])['networks'][0]
+            return self._get_indexed_network(index, id=network_info['id'])
         if 'name' in network_info:
-            return self.neutron_client.\
-                list_networks(name=network_info['name'])['networks'][0]
+            return self._get_indexed_network(index,
+                                             name=network_info['name'])
         else:
             raise Exception("Can't find suitable network")
 
+    def _get_indexed_network(self, index, **search_opts):
+        field, value = search_opts.items()[0]
+        if value in index[field]:
+            return index[field][value]
+        # network may be created after index is built
+        return self.neutron_client.list_networks(
+            **search_opts)['networks'][0]
+
     def check_existing_port(self, network_id, mac):
-        for port in self.get_list_ports(fields=['network_id',
-                                                'mac_address', 'id']):
-            if (port['network_id'] == network_id) \
-                    and (port['mac_address'] == mac):
-                return port['id']
+        port = self.get_ports_index()['net_mac'].get((network_id, mac))
+        if port:
+            return port['id']
         return None
 
     @staticmethod
@@ -618,17 +665,20 @@ class NeutronNetwork(network.Network):
 
     def upload_lb_vips(self, vips, pools, subnets):
         existing_vips = self.get_lb_vips()
-        existing_vips_hashlist = [ex_vip['res_hash'] for ex_vip in existing_vips]
-        existing_pools = self.get_lb_pools()
-        existing_snets = self.get_subnets()
+        existing_vips_hashlist = \
+            set(ex_vip['res_hash'] for ex_vip in existing_vips)
+        existing_pools = self.index_by_hash(self.get_lb_pools())
+        existing_snets = self.index_by_hash(self.get_subnets())
+        pools_hashes = self.index_hash_by_id(pools)
+        subnets_hashes = self.index_hash_by_id(subnets)
         for vip in vips:
             if vip['res_hash'] not in existing_vips_hashlist:
                 tenant_id = \
                     self.identity_client.get_tenant_id_by_name(vip['tenant_name'])
-                pool_hash = self.get_res_hash_by_id(pools, vip['pool_id'])
-                dst_pool = self.get_res_by_hash(existing_pools, pool_hash)
-                snet_hash = self.get_res_hash_by_id(subnets, vip['subnet_id'])
-                dst_subnet = self.get_res_by_hash(existing_snets, snet_hash)
+                pool_hash = pools_hashes.get(vip['pool_id'])
+                dst_pool = existing_pools.get(pool_hash)
+                snet_hash = subnets_hashes.get(vip['subnet_id'])
+                dst_subnet = existing_snets.get(snet_hash)
                 vip_info = {
                     'vip': {
                         'name': vip['name'],
@@ -655,14 +705,15 @@ class NeutronNetwork(network.Network):
     def upload_lb_members(self, members, pools):
         existing_members = self.get_lb_members()
         existing_members_hashlist = \
-            [ex_member['res_hash'] for ex_member in existing_members]
-        existing_pools = self.get_lb_pools()
+            set(ex_member['res_hash'] for ex_member in existing_members)
+        existing_pools = self.index_by_hash(self.get_lb_pools())
+        pools_hashes = self.index_hash_by_id(pools)
         for member in members:
             if member['res_hash'] not in existing_members_hashlist:
                 tenant_id = \
                     self.identity_client.get_tenant_id_by_name(member['tenant_name'])
-                pool_hash = self.get_res_hash_by_id(pools, member['pool_id'])
-                dst_pool = self.get_res_by_hash(existing_pools, pool_hash)
+                pool_hash = pools_hashes.get(member['pool_id'])
+                dst_pool = existing_pools.get(pool_hash)
                 member_info = {
                     'member': {
                         'protocol_port': member["protocol_port"],
@@ -681,7 +732,7 @@ class NeutronNetwork(network.Network):
     def upload_lb_monitors(self, monitors):
         existing_mons = self.get_lb_monitors()
         existing_mons_hashlist = \
-            [ex_mon['res_hash'] for ex_mon in existing_mons]
+            set(ex_mon['res_hash'] for ex_mon in existing_mons)
         for mon in monitors:
             if mon['res_hash'] not in existing_mons_hashlist:
                 tenant_id = \
@@ -707,14 +758,16 @@ class NeutronNetwork(network.Network):
                          (mon['type'], mon['tenant_name']))
 
     def associate_lb_monitors(self, pools, monitors):
-        existing_pools = self.get_lb_pools()
-        existing_monitors = self.get_lb_monitors()
+        existing_pools = self.index_by_hash(self.get_lb_pools())
+        existing_monitors = self.index_by_hash(self.get_lb_monitors())
+        pools_hashes = self.index_hash_by_id(pools)
+        monitors_hashes = self.index_hash_by_id(monitors)
         for pool in pools:
-            pool_hash = self.get_res_hash_by_id(pools, pool['id'])
-            dst_pool = self.get_res_by_hash(existing_pools, pool_hash)
+            pool_hash = pools_hashes.get(pool['id'])
+            dst_pool = existing_pools.get(pool_hash)
             for monitor_id in pool['health_monitors']:
-                monitor_hash = self.get_res_hash_by_id(monitors, monitor_id)
-                dst_monitor = self.get_res_by_hash(existing_monitors, monitor_hash)
+                monitor_hash = monitors_hashes.get(monitor_id)
+                dst_monitor = existing_monitors.get(monitor_hash)
                 if dst_monitor['id'] not in dst_pool['health_monitors']:
                     dst_monitor_info = {
                         'health_monitor':{
@@ -731,15 +784,15 @@ class NeutronNetwork(network.Network):
     def upload_lb_pools(self, pools, subnets):
         existing_pools = self.get_lb_pools()
         existing_pools_hashlist = \
-            [ex_pool['res_hash'] for ex_pool in existing_pools]
-        existing_subnets = self.get_subnets()
+            set(ex_pool['res_hash'] for ex_pool in existing_pools)
+        existing_subnets = self.index_by_hash(self.get_subnets())
+        subnets_hashes = self.index_hash_by_id(subnets)
         for pool in pools:
             if pool['res_hash'] not in existing_pools_hashlist:
                 tenant_id = \
                     self.identity_client.get_tenant_id_by_name(pool['tenant_name'])
-                snet_hash = self.get_res_hash_by_id(subnets, pool['subnet_id'])
-                snet_id = self.get_res_by_hash(existing_subnets,
-                                               snet_hash)['id']
+                snet_hash = subnets_hashes.get(pool['subnet_id'])
+                snet_id = existing_subnets.get(snet_hash)['id']
                 pool_info = {
                     'pool':
                         {
@@ -761,7 +814,7 @@ class NeutronNetwork(network.Network):
 
     def upload_neutron_security_groups(self, sec_groups):
         exist_secgrs = self.get_sec_gr_and_rules()
-        exis_secgrs_hashlist = [ex_sg['res_hash'] for ex_sg in exist_secgrs]
+        exis_secgrs_hashlist = set(ex_sg['res_hash'] for ex_sg in exist_secgrs)
         for sec_group in sec_groups:
             if sec_group['name'] != DEFAULT_SECGR:
                 if sec_group['res_hash'] not in exis_secgrs_hashlist:
@@ -782,12 +835,12 @@ class NeutronNetwork(network.Network):
                         create_security_group(sg_info)['security_group']['id']
 
     def upload_sec_group_rules(self, sec_groups):
-        ex_secgrs = self.get_sec_gr_and_rules()
+        ex_secgrs = self.index_by_hash(self.get_sec_gr_and_rules())
+        sec_groups_hashes = None
         for sec_gr in sec_groups:
-            ex_secgr = \
-                self.get_res_by_hash(ex_secgrs, sec_gr['res_hash'])
+            ex_secgr = ex_secgrs.get(sec_gr['res_hash'])
             exrules_hlist = \
-                [r['rule_hash'] for r in ex_secgr['security_group_rules']]
+                set(r['rule_hash'] for r in ex_secgr['security_group_rules'])
             for rule in sec_gr['security_group_rules']:
                 if rule['protocol'] \
                         and (rule['rule_hash'] not in exrules_hlist):
@@ -802,12 +855,12 @@ class NeutronNetwork(network.Network):
                             'security_group_id': ex_secgr['id'],
                             'tenant_id': ex_secgr['tenant_id']}}
                     if rule['remote_group_id']:
+                        if sec_groups_hashes is None:
+                            sec_groups_hashes = \
+                                self.index_hash_by_id(sec_groups)
                         remote_sghash = \
-                            self.get_res_hash_by_id(sec_groups,
-                                                    rule['remote_group_id'])
-                        rem_ex_sec_gr = \
-                            self.get_res_by_hash(ex_secgrs,
-                                                 remote_sghash)
+                            sec_groups_hashes.get(rule['remote_group_id'])
+                        rem_ex_sec_gr = ex_secgrs.get(remote_sghash)
                         rinfo['security_group_rule']['remote_group_id'] = \
                             rem_ex_sec_gr['id']
                     new_rule = \
@@ -815,8 +868,9 @@ class NeutronNetwork(network.Network):
                     rule['meta']['id'] = new_rule['security_group_rule']['id']
 
     def upload_networks(self, networks):
+        existing_nets = self.get_networks()
         existing_nets_hashlist = (
-            [ex_net['res_hash'] for ex_net in self.get_networks()])
+            set(ex_net['res_hash'] for ex_net in existing_nets))
 
         # we need to handle duplicates in segmentation ids
         # hash is used with structure {"gre": [1, 2, ...],
@@ -824,7 +878,7 @@ class NeutronNetwork(network.Network):
         # networks with "provider:physical_network" property added
         # because only this networks seg_ids will be copied
         used_seg_ids = {}
-        for net in self.get_networks():
+        for net in existing_nets:
             if net.get("provider:physical_network"):
                 net_type = net.get("provider:network_type")
                 if net_type not in used_seg_ids:
@@ -911,11 +965,13 @@ class NeutronNetwork(network.Network):
                 net['meta']['id'] = (
                     self.neutron_client.create_network(
                         network_info)['network']['id'])
+        self.networks_index = None
 
     def upload_subnets(self, networks, subnets):
-        existing_nets = self.get_networks()
+        existing_nets = self.index_by_hash(self.get_networks())
         existing_subnets_hashlist = \
-            [ex_snet['res_hash'] for ex_snet in self.get_subnets()]
+            set(ex_snet['res_hash'] for ex_snet in self.get_subnets())
+        networks_hashes = self.index_hash_by_id(networks)
         for snet in subnets:
             if snet['external']:
                 if not self.config.migrate.migrate_extnets or \
@@ -927,14 +983,12 @@ class NeutronNetwork(network.Network):
                 LOG.debug("Cannot get tenant_id for subnet {subnet}".format(
                     subnet=snet.get("id")))
                 continue
-            net_hash = \
-                self.get_res_hash_by_id(networks, snet['network_id'])
+            net_hash = networks_hashes.get(snet['network_id'])
             if not net_hash:
                 LOG.debug("Cannot get network info for subnet {subnet}".format(
                     subnet=snet.get("id")))
                 continue
-            network = \
-                self.get_res_by_hash(existing_nets, net_hash)
+            network = existing_nets.get(net_hash)
             if not network:
                 LOG.debug("Cannot get network for subnet {subnet}".format(
                     subnet=snet.get("id")))
@@ -960,6 +1014,7 @@ class NeutronNetwork(network.Network):
                 LOG.info("| Dst cloud already has the same subnetwork "
                          "with name %s in tenant %s" %
                          (snet['name'], snet['tenant_name']))
+        self.networks_index = None
 
     def upload_routers(self, networks, subnets, routers):
         existing_nets = self.get_networks()
@@ -1097,6 +1152,24 @@ class NeutronNetwork(network.Network):
             if resource['id'] == resource_id:
                 return resource['res_hash']
 
+    @staticmethod
+    def index_by_hash(resources):
+        """Dict version of get_res_by_hash for lookups in loops"""
+
+        index = {}
+        for resource in resources:
+            index.setdefault(resource['res_hash'], resource)
+        return index
+
+    @staticmethod
+    def index_hash_by_id(resources):
+        """Dict version of get_res_hash_by_id for lookups in loops"""
+
+        index = {}
+        for resource in resources:
+            index.setdefault(resource['id'], resource['res_hash'])
+        return index
+
     @staticmethod
     def get_resource_hash(neutron_resource, *args):
         list_info = list()
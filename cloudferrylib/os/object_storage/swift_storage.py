@@ -12,11 +12,36 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+from multiprocessing.pool import ThreadPool
+
 from cloudferrylib.base import objstorage
 from swiftclient import client as swift_client
 from cloudferrylib.utils import utils as utl
 
 
+LOG = utl.get_log(__name__)
+
+
+class IterReader(object):
+    """File-like object over iterator of chunks returned by get_object
+    with resp_chunk_size: put_object streams only contents with read."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
 class SwiftStorage(objstorage.ObjStorage):
     """The main class for working with Object Storage Service. """
 
@@ -39,38 +64,129 @@ class SwiftStorage(objstorage.ObjStorage):
         return conn.get_auth()
 
     def read_info(self, **kwargs):
+        """Getting info about containers and objects.
+
+        In streaming mode (swift_stream_copy) object bodies are not
+        downloaded, they are copied directly from source storage on deploy.
+        """
+
         info = {utl.OBJSTORAGE_RESOURCE:
                     {utl.CONTAINERS: {}}}
         account_info = self.get_account_info()
         info[utl.OBJSTORAGE_RESOURCE][utl.CONTAINERS] = account_info[1]
         for container_info in info[utl.OBJSTORAGE_RESOURCE][utl.CONTAINERS]:
-            container_info['objects'] = self.get_container(container_info['name'])[1]
+            container_info['objects'] = list(
+                self.iter_objects(container_info['name']))
+            if self.config.migrate.swift_stream_copy:
+                continue
             for object_info in container_info['objects']:
                 resp, object_info['data'] = self.get_object(container_info['name'],
                                                             object_info['name'])
         return info
 
-    def deploy(self, info, **kwargs):
+    def deploy(self, info, src_objstorage=None, **kwargs):
+        """Creating containers and objects.
+
+        Objects without 'data' are streamed from src_objstorage. Objects
+        which already exist with the same ETag are skipped.
+        """
+
+        tasks = []
         for container_info in info[utl.OBJSTORAGE_RESOURCE][utl.CONTAINERS]:
             self.put_container(container_info['name'])
+            dst_hashes = {obj['name']: obj['hash'] for obj in
+                          self.iter_objects(container_info['name'])}
             for object_info in container_info['objects']:
-                self.put_object(container=container_info['name'],
-                                obj_name=object_info['name'],
-                                content=object_info['data'],
-                                content_type=object_info['content_type'])
+                if dst_hashes.get(object_info['name']) == object_info['hash']:
+                    LOG.debug("Object %s/%s already exists, skipping",
+                              container_info['name'], object_info['name'])
+                    continue
+                tasks.append((container_info['name'], object_info))
+
+        workers = self.config.migrate.swift_workers
+        if workers > 1 and len(tasks) > 1:
+            self._copy_objects_in_pool(tasks, src_objstorage, workers)
+        else:
+            for container, object_info in tasks:
+                self.copy_object(container, object_info, src_objstorage)
         return info
 
+    def copy_object(self, container, object_info, src_objstorage=None):
+        """Uploading one object, streaming its body from src_objstorage
+        chunk by chunk if it was not downloaded in read_info."""
+
+        if 'data' in object_info:
+            content = object_info['data']
+        else:
+            resp, chunks = src_objstorage.get_object(
+                container, object_info['name'],
+                resp_chunk_size=self.config.migrate.swift_chunk_size)
+            content = IterReader(chunks)
+        self.put_object(container=container,
+                        obj_name=object_info['name'],
+                        content=content,
+                        content_type=object_info['content_type'],
+                        content_length=object_info['bytes'])
+
+    def _copy_objects_in_pool(self, tasks, src_objstorage, workers):
+        pool = ThreadPool(workers)
+        try:
+            failed = [task for task, copied in zip(tasks, pool.map(
+                lambda task: self._safe_copy_object(task, src_objstorage),
+                tasks)) if not copied]
+        finally:
+            pool.close()
+            pool.join()
+        if failed:
+            raise RuntimeError(
+                "Failed to copy %d objects: %s" % (
+                    len(failed),
+                    ", ".join("%s/%s" % (container, object_info['name'])
+                              for container, object_info in failed)))
+
+    def _safe_copy_object(self, task, src_objstorage):
+        container, object_info = task
+        try:
+            self.copy_object(container, object_info, src_objstorage)
+            return True
+        except Exception as e:
+            LOG.error("Failed to copy object %s/%s: %s",
+                      container, object_info['name'], e)
+            return False
+
+    def iter_objects(self, container):
+        """Listing objects of container page by page using marker, so
+        containers with more objects than listing limit are listed
+        completely. Server may return less objects than requested limit
+        (container_listing_limit), so listing ends on empty page only."""
+
+        limit = self.config.migrate.swift_listing_limit
+        marker = None
+        while True:
+            objects = self.get_container(container, marker=marker,
+                                         limit=limit)[1]
+            if not objects:
+                break
+            for obj in objects:
+                yield obj
+            marker = objects[-1]['name']
+
     def get_account_info(self):
         return swift_client.get_account(self.storage_url, self.token)
 
-    def get_container(self, container, *args):
-        return swift_client.get_container(self.storage_url, self.token, container, *args)
+    def get_container(self, container, *args, **kwargs):
+        return swift_client.get_container(self.storage_url, self.token,
+                                          container, *args, **kwargs)
 
-    def get_object(self, container, obj_name, *args):
-        return swift_client.get_object(self.storage_url, self.token, container, obj_name, *args)
+    def get_object(self, container, obj_name, *args, **kwargs):
+        return swift_client.get_object(self.storage_url, self.token,
+                                       container, obj_name, *args, **kwargs)
 
-    def put_object(self, container, obj_name, content=None, content_type=None, *args):
-        return swift_client.put_object(self.storage_url, self.token, container, obj_name, content, content_type, *args)
+    def put_object(self, container, obj_name, content=None,
+                   content_type=None, *args, **kwargs):
+        return swift_client.put_object(self.storage_url, self.token,
+                                       container, obj_name, content, *args,
+                                       content_type=content_type, **kwargs)
 
     def put_container(self, container, *args):
         return swift_client.put_container(self.storage_url, self.token, container, *args)
@@ -18,6 +18,7 @@ import time
 from cinderclient.v1 import client as cinder_client
 
 from cloudferrylib.base import storage
+from cloudferrylib.utils import cow
 from cloudferrylib.utils import mysql_connector
 from cloudferrylib.utils import utils as utl
 
@@ -164,7 +165,7 @@ class CinderStorage(storage.Storage):
         for vol_id, vol in info[utl.VOLUMES_TYPE].iteritems():
             vol_for_deploy = self.convert_to_params(vol)
             volume = self.create_volume(**vol_for_deploy)
-            vol[utl.VOLUME_BODY]['id'] = volume.id
+            vol = cow.evolve(vol, {(utl.VOLUME_BODY, 'id'): volume.id})
             self.wait_for_status(volume.id, AVAILABLE)
             self.finish(vol)
             new_ids[volume.id] = vol_id
@@ -0,0 +1,80 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import cPickle as pickle
+import os
+
+from cloudferrylib.utils import utils
+
+LOG = utils.get_log(__name__)
+
+
+class Checkpoint(object):
+    """
+    Local file with state of migration chain saved after every task:
+    name of the chain, path of the cursor through the chain (num_element
+    of every finished task), picklable vars of namespace and states
+    returned by Action.save. It lets scheduler continue failed migration
+    from the next task instead of starting it from scratch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, chain_name, path, namespace_vars, states):
+        dumped_vars = self.dump_vars(namespace_vars)
+        header = {'chain': chain_name,
+                  'path': path,
+                  'vars': dumped_vars.keys(),
+                  'states': states}
+        # write to temporary file first, so failure during write doesn't
+        # break previous checkpoint
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as checkpoint_file:
+            pickle.dump(header, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+            # vars are already pickled, they are written after header as
+            # is instead of being pickled once more
+            for key in header['vars']:
+                checkpoint_file.write(dumped_vars[key])
+        os.rename(tmp_path, self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as checkpoint_file:
+            data = pickle.load(checkpoint_file)
+            data['vars'] = {key: pickle.load(checkpoint_file)
+                            for key in data['vars']}
+        return data
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def dump_vars(namespace_vars):
+        """
+        Pickle every var which can be pickled, service vars like
+        __children__ and __init_task__ are created again on restart
+        """
+        result = {}
+        for key, value in namespace_vars.items():
+            if key.startswith('__'):
+                continue
+            try:
+                result[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                LOG.warning("Var '%s' is not saved in checkpoint, resumed "
+                            "migration can't use it: %s", key, e)
+        return result
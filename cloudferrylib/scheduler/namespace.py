@@ -19,10 +19,51 @@ CHILDREN = '__children__'
 
 class Namespace:
 
-    def __init__(self, vars={}):
+    def __init__(self, vars=None):
+        if vars is None:
+            vars = {}
         if not CHILDREN in vars:
             vars[CHILDREN] = dict()
         self.vars = vars
 
     def fork(self, is_deep_copy=False):
         return Namespace(copy.copy(self.vars)) if not is_deep_copy else Namespace(copy.deepcopy(self.vars))
+
+    def changes(self, origin):
+        """
+        Return vars that were added or replaced in this namespace since it
+        was forked from origin
+        """
+        return {key: value for key, value in self.vars.items()
+                if key != CHILDREN and
+                (key not in origin.vars or origin.vars[key] is not value)}
+
+    def merge(self, updates):
+        """
+        Apply list of updates made by tasks run at the same time,
+        namespace is left untouched if updates conflict
+        """
+        self.vars.update(merge_changes(updates))
+
+
+def merge_changes(updates):
+    """
+    Merge list of updates made by tasks run at the same time into one.
+    Key updated by one task is just set, key updated by several tasks
+    must get equal values from all of them, otherwise NamespaceConflict
+    is raised.
+    """
+    merged = {}
+    for update in updates:
+        for key, value in update.items():
+            if key in merged and merged[key] != value:
+                raise NamespaceConflict(key)
+            merged[key] = value
+    return merged
+
+
+class NamespaceConflict(RuntimeError):
+    def __init__(self, key):
+        self.key = key
+        super(NamespaceConflict, self).__init__(
+            "Parallel tasks set different values of '%s'" % key)
@@ -14,13 +14,15 @@
 
 
 import multiprocessing
+from multiprocessing import pool as mp_pool
 import traceback
 
 from cloudferrylib.scheduler.namespace import Namespace, CHILDREN
+from cloudferrylib.utils import profiler as prof
 from cloudferrylib.utils import utils
-from cursor import Cursor
+from cursor import Cursor, DEFAULT
 from task import BaseTask
-from thread_tasks import WrapThreadTask
+from thread_tasks import WrapThreadTask, wait_child
 
 
 LOG = utils.get_log(__name__)
@@ -29,19 +31,61 @@ LOG = utils.get_log(__name__)
 NO_ERROR = 0
 ERROR = 255
 
+PREPARATION = "PREPARATION"
+MIGRATION = "MIGRATION"
+ROLLBACK = "ROLLBACK"
+
+THREAD_POOL = 'thread'
+PROCESS_POOL = 'process'
+
+# branches run by process pool, forked workers take them from here
+# by index, so tasks don't have to be pickled
+_BRANCHES = []
+
+
+def _run_branch_in_process(index):
+    """
+    Returns changes made by branch and events recorded by profiler in
+    the worker, they are merged into profiler of the parent
+    """
+    scheduler, task = _BRANCHES[index]
+    if not scheduler.profiler:
+        return scheduler.run_branch(task), []
+    position = scheduler.profiler.position()
+    changes = scheduler.run_branch(task)
+    return changes, scheduler.profiler.events_since(position)
+
 
 class BaseScheduler(object):
     def __init__(self, namespace=None, migration=None, preparation=None,
-                 rollback=None):
+                 rollback=None, workers=1, pool_type=PROCESS_POOL,
+                 profiler=None, checkpoint=None, resume=False):
         self.namespace = namespace if namespace else Namespace()
         self.status_error = NO_ERROR
         self.migration = migration
         self.preparation = preparation
         self.rollback = rollback
+        # only tasks linked with "&" to one task are run at the same time
+        # by pool of workers, 1 - all tasks are run one by one. Actions use
+        # global env of fabric (settings(host_string=...)), so thread pool
+        # is safe only for branches which don't run ssh commands
+        self.workers = workers
+        self.pool_type = pool_type
+        # utils.profiler.Profiler which records time of every task
+        self.profiler = profiler
+        # checkpoint.Checkpoint where state is saved after every task,
+        # with resume=True chains are continued from saved state
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.resume_state = None
         self.map_func_task = dict() if not hasattr(
             self,
             'map_func_task') else self.map_func_task
         self.map_func_task[BaseTask()] = self.task_run
+        self.map_func_branch = dict() if not hasattr(
+            self,
+            'map_func_branch') else self.map_func_branch
+        self.map_func_branch[BaseTask()] = self.task_run_branch
 
     def event_start_task(self, task):
         LOG.info('%s Start task: %s', '-' * 8, task)
@@ -60,15 +104,45 @@ class BaseScheduler(object):
 
     def run_task(self, task):
         if self.event_start_task(task):
-            self.map_func_task[task](task)
+            self.profile(self.map_func_task[task], task, self.namespace)
         self.event_end_task(task)
 
+    def profile(self, func, task, namespace):
+        """
+        Run func for task and record its span if profiler is set
+        """
+        if not self.profiler:
+            return func(task)
+        span = self.profiler.span(repr(task),
+                                  namespace_size=len(namespace.vars))
+        try:
+            res = func(task)
+        except Exception as e:
+            span.finish(prof.ERROR, error=repr(e))
+            raise
+        span.finish(namespace_size=len(namespace.vars))
+        return res
+
     def process_chain(self, chain, chain_name):
         if chain:
             LOG.info("Processing CHAIN %s", chain_name)
+            chain = iter(chain)
+            path, states = self.replay_chain(chain, chain_name)
             for task in chain:
                 try:
                     self.run_task(task)
+                    finished = [task]
+                    if self.is_parallel(chain, task):
+                        finished.extend(
+                            [chain.next() for _ in task.parall_elem])
+                        self.run_branches(finished[1:])
+                    self.save_checkpoint(chain_name, path, states, finished)
+                except BranchError as e:
+                    self.status_error = ERROR
+                    self.exception = e.error
+                    self.error_task(e.task, e.error)
+                    LOG.info("Failed processing CHAIN %s", chain_name)
+                    break
                 except Exception as e:
                     self.status_error = ERROR
                     self.exception = e
@@ -78,30 +152,161 @@ class BaseScheduler(object):
             else:
                 LOG.info("Succesfully finished CHAIN %s", chain_name)
 
+    def is_parallel(self, chain, task):
+        """
+        Tasks linked to task with "&" are run in pool only when cursor
+        is going to return them right after task
+        """
+        return (self.workers > 1 and isinstance(chain, Cursor) and
+                bool(getattr(task, 'parall_elem', None)))
+
+    def run_branches(self, branches):
+        """
+        Run independent tasks at the same time, every task gets its own fork
+        of namespace, changes of all tasks are merged back when all of them
+        are finished, next task of chain is started after that
+        """
+        if self.pool_type == PROCESS_POOL:
+            _BRANCHES[:] = [(self, task) for task in branches]
+            pool = multiprocessing.Pool(min(self.workers, len(branches)))
+            run = _run_branch_in_process
+            args = range(len(branches))
+        else:
+            pool = mp_pool.ThreadPool(min(self.workers, len(branches)))
+            run = self.run_branch
+            args = branches
+        try:
+            results = [pool.apply_async(run, (arg,)) for arg in args]
+            updates = []
+            for task, result in zip(branches, results):
+                try:
+                    update = result.get()
+                except Exception as e:
+                    raise BranchError(task, e)
+                if self.pool_type == PROCESS_POOL:
+                    update, events = update
+                    if self.profiler:
+                        self.profiler.merge(events)
+                updates.append(update)
+        finally:
+            pool.close()
+            pool.join()
+            _BRANCHES[:] = []
+        self.namespace.merge(updates)
+
+    def run_branch(self, task):
+        """
+        Run task on fork of namespace and return changes made by task
+        """
+        namespace = self.namespace.fork()
+        if self.event_start_task(task):
+            self.profile(
+                lambda t: self.map_func_branch[t](t, namespace),
+                task, namespace)
+        self.event_end_task(task)
+        return namespace.changes(self.namespace)
+
+    def replay_chain(self, chain, chain_name):
+        """
+        Skip tasks of chain finished before restart, num_element of every
+        skipped task is restored, so cursor goes the same path as before.
+        Returns path and states of actions to continue checkpoints with.
+        """
+        state = self.resume_state
+        if not state or state['chain'] != chain_name:
+            return [], {}
+        self.resume_state = None
+        LOG.info("Resuming CHAIN %s after %d finished tasks", chain_name,
+                 len(state['path']))
+        for index, num_element in enumerate(state['path']):
+            task = chain.next()
+            task.num_element = num_element
+            if index in state['states']:
+                task.restore(state['states'][index])
+        return list(state['path']), dict(state['states'])
+
+    def save_checkpoint(self, chain_name, path, states, tasks):
+        if not self.checkpoint or chain_name == ROLLBACK:
+            return
+        for task in tasks:
+            save = getattr(task, 'save', None)
+            state = save() if save else None
+            if state is not None:
+                states[len(path)] = state
+            path.append(getattr(task, 'num_element', DEFAULT))
+        # children are not saved, thread task is finished for checkpoint
+        # only when its result is received by wait task, until then
+        # resumed chain has to start from the previous checkpoint
+        if self.has_running_children():
+            return
+        self.checkpoint.save(chain_name, path, self.namespace.vars, states)
+
+    def has_running_children(self):
+        return any(child.get('process') and child.get('result') is not None
+                   for child in self.namespace.vars[CHILDREN].values())
+
+    def restore_checkpoint(self):
+        if not self.checkpoint or not self.resume:
+            return
+        state = self.checkpoint.load()
+        if state is None:
+            LOG.warning("Checkpoint %s is not found, starting from scratch",
+                        self.checkpoint.path)
+            return
+        self.namespace.vars.update(state['vars'])
+        self.resume_state = state
+
     def start(self):
-        # try to prepare for migration
-        self.process_chain(self.preparation, "PREPARATION")
+        self.restore_checkpoint()
+        # try to prepare for migration, preparation is already finished
+        # if migration is resumed
+        if not self.resume_state or self.resume_state['chain'] != MIGRATION:
+            self.process_chain(self.preparation, PREPARATION)
         # if we didn't get error during preparation task - process migration
+        rolled_back = False
         if self.status_error != ERROR:
-            self.process_chain(self.migration, "MIGRATION")
+            self.process_chain(self.migration, MIGRATION)
             # if we had an error during process migration - rollback
             if self.status_error == ERROR:
-                self.process_chain(self.rollback, "ROLLBACK")
+                self.process_chain(self.rollback, ROLLBACK)
+                rolled_back = bool(self.rollback)
+        # checkpoint is kept only to resume failed chain which was not
+        # rolled back
+        if self.checkpoint and (self.status_error != ERROR or rolled_back):
+            self.checkpoint.remove()
 
     def task_run(self, task):
         task(namespace=self.namespace)
 
+    def task_run_branch(self, task, namespace):
+        task(namespace=namespace)
+
     def addCursor(self, cursor):
         self.cursor = cursor
 
 
+class BranchError(Exception):
+    def __init__(self, task, error):
+        self.task = task
+        self.error = error
+        super(BranchError, self).__init__(str(error))
+
+
 class SchedulerThread(BaseScheduler):
     def __init__(self, namespace=None, thread_task=None, migration=None,
-                 preparation=None, rollback=None, scheduler_parent=None):
+                 preparation=None, rollback=None, scheduler_parent=None,
+                 workers=1, pool_type=PROCESS_POOL, profiler=None,
+                 checkpoint=None, resume=False):
         super(SchedulerThread, self).__init__(namespace, migration=migration,
                                               preparation=preparation,
-                                              rollback=rollback)
+                                              rollback=rollback,
+                                              workers=workers,
+                                              pool_type=pool_type,
+                                              profiler=profiler,
+                                              checkpoint=checkpoint,
+                                              resume=resume)
         self.map_func_task[WrapThreadTask()] = self.task_run_thread
+        self.map_func_branch[WrapThreadTask()] = self.task_run_thread_branch
         self.child_threads = dict()
         self.thread_task = thread_task
         self.scheduler_parent = scheduler_parent
@@ -129,23 +334,76 @@ class SchedulerThread(BaseScheduler):
             self.start_separate_thread()
 
     def start_separate_thread(self):
-        p = multiprocessing.Process(target=self.start_current_thread)
+        result, child_result = multiprocessing.Pipe(False)
+        p = multiprocessing.Process(target=self.start_child_process,
+                                    args=(child_result,))
         self.namespace.vars[CHILDREN][self.thread_task]['process'] = p
+        self.namespace.vars[CHILDREN][self.thread_task]['result'] = result
         p.start()
+        child_result.close()
+
+    def start_child_process(self, result):
+        """
+        Process the net in child process and send changes of namespace,
+        error and events of profiler back to parent, they are received by
+        WaitThreadTask
+        """
+        origin = self.namespace.fork()
+        position = self.profiler.position() if self.profiler else 0
+        self.start_current_thread()
+        error = self.exception if self.status_error == ERROR else None
+        changes = self.namespace.changes(origin)
+        events = (self.profiler.events_since(position) if self.profiler
+                  else [])
+        try:
+            result.send((changes, error, events))
+        except Exception as e:
+            LOG.exception("Failed to send result of thread task")
+            result.send(({}, RuntimeError(
+                str(error) if error else
+                "Result of thread task can't be sent: %s" % e), events))
+        finally:
+            result.close()
 
     def start_current_thread(self):
         self.trigger_start_scheduler()
-        super(SchedulerThread, self).start()
+        try:
+            super(SchedulerThread, self).start()
+        finally:
+            self.release_children()
         self.trigger_stop_scheduler()
 
+    def release_children(self):
+        """
+        Child process blocks in sending its result until the result is
+        received, and multiprocessing joins children at exit, so results
+        not received by wait task would hang the parent. After error such
+        children are terminated, otherwise their results are dropped.
+        """
+        for thread_task, child in self.namespace.vars[CHILDREN].items():
+            # forked namespace shares children of parents, child process
+            # finds its own entry there
+            if child['scheduler'].scheduler_parent is not self:
+                continue
+            if not child.get('process') or child.get('result') is None:
+                continue
+            if self.status_error == ERROR:
+                LOG.warning("Terminating thread task %s", thread_task)
+                child['result'].close()
+                child['result'] = None
+                child['process'].terminate()
+                child['process'].join()
+                continue
+            LOG.warning("Result of thread task %s is not waited, dropping "
+                        "it", thread_task)
+            try:
+                wait_child(child)
+            except Exception:
+                LOG.exception("Thread task %s failed", thread_task)
+
     def fork(self, thread_task, is_deep_copy=False):
         namespace = self.namespace.fork(is_deep_copy)
-        scheduler = self.__class__(namespace=namespace,
-                                   thread_task=thread_task,
-                                   preparation=self.preparation,
-                                   migration=Cursor(thread_task.getNet()),
-                                   rollback=self.rollback,
-                                   scheduler_parent=self)
+        scheduler = self.child_scheduler(thread_task, namespace)
         self.namespace.vars[CHILDREN][thread_task] = {
             'namespace': namespace,
             'scheduler': scheduler,
@@ -153,10 +411,33 @@ class SchedulerThread(BaseScheduler):
         }
         return scheduler
 
+    def child_scheduler(self, thread_task, namespace):
+        return self.__class__(namespace=namespace,
+                              thread_task=thread_task,
+                              preparation=self.preparation,
+                              migration=Cursor(thread_task.getNet()),
+                              rollback=self.rollback,
+                              scheduler_parent=self,
+                              workers=self.workers,
+                              pool_type=self.pool_type,
+                              profiler=self.profiler)
+
     def task_run_thread(self, task):
         scheduler_fork = self.fork(task)
         scheduler_fork.start()
 
+    def task_run_thread_branch(self, task, namespace):
+        """
+        Thread task run in pool doesn't need separate process, its net is
+        processed in the current worker and changes are kept in namespace
+        of the branch, it is not registered in children of the parent
+        """
+        scheduler_fork = self.child_scheduler(task, namespace.fork())
+        scheduler_fork.start_current_thread()
+        if scheduler_fork.status_error == ERROR:
+            raise scheduler_fork.exception
+        namespace.vars.update(scheduler_fork.namespace.changes(namespace))
+
 
 class Scheduler(SchedulerThread):
     pass
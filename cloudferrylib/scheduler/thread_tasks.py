@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+from namespace import merge_changes
 from task import Task
 from utils.equ_instance import EquInstance
 __author__ = 'mirrorcoder'
@@ -37,12 +38,42 @@ class WaitThreadTask(Task):
         super(WaitThreadTask, self).__init__()
 
     def run(self, __children__={}, **kwargs):
-        if __children__:
-            __children__[self.tt]['process'].join()
+        if __children__ and __children__[self.tt]['process']:
+            return wait_child(__children__[self.tt])
 
 
 class WaitThreadAllTask(Task):
     def run(self, __children__={}, **kwargs):
         if __children__:
-            for p in __children__:
-                __children__[p]['process'].join()
+            return merge_changes([wait_child(__children__[p])
+                                  for p in __children__
+                                  if __children__[p]['process']])
+
+
+def wait_child(child):
+    """
+    Wait for process of thread task and return changes made by it in
+    namespace, error of the child is raised in the parent. Events of
+    profiler recorded in the child are added to profiler of the parent.
+    """
+    process = child['process']
+    result = child.get('result')
+    if result is None:
+        process.join()
+        return {}
+    try:
+        changes, error, events = result.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError("Thread task exited with code %s without "
+                           "result" % process.exitcode)
+    finally:
+        result.close()
+        child['result'] = None
+    process.join()
+    profiler = getattr(child.get('scheduler'), 'profiler', None)
+    if profiler:
+        profiler.merge(events)
+    if error is not None:
+        raise error
+    return changes
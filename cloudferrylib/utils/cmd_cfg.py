@@ -26,6 +26,8 @@ rbd_cmd = BC("rbd %s")
 base_ssh_cmd = BC("ssh %s")
 ssh_cmd = base_ssh_cmd("-oStrictHostKeyChecking=no %s '%s'")
 ssh_cmd_port = base_ssh_cmd("-oStrictHostKeyChecking=no -p %s %s '%s'")
+ssh_mux_cmd = base_ssh_cmd("-oStrictHostKeyChecking=no -oControlMaster=auto "
+                           "-oControlPath=%s -oControlPersist=%s %s '%s'")
 dd_cmd_of = BC("dd bs=%s of=%s")
 dd_cmd_if = BC("dd bs=%s if=%s")
 dd_full = BC('dd if=%s of=%s bs=%s count=%s seek=%sM')
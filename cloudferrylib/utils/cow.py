@@ -0,0 +1,41 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import copy
+
+
+def evolve(data, updates):
+    """
+    Return copy of nested dicts and lists with updates applied, data itself
+    is left untouched.
+
+    :param updates: dict {path: value}, path is tuple of keys, paths must
+                    not be prefixes of each other
+
+    Only containers along paths are copied, once per call, all other values
+    are shared with data. Info is never changed in place then, so it may be
+    passed from task to task without defensive deep copies.
+    """
+    root = copy.copy(data)
+    copied = {(): root}
+    for path, value in updates.items():
+        node = root
+        for depth in xrange(1, len(path)):
+            prefix = path[:depth]
+            if prefix not in copied:
+                copied[prefix] = copy.copy(node[path[depth - 1]])
+                node[path[depth - 1]] = copied[prefix]
+            node = copied[prefix]
+        node[path[-1]] = value
+    return root
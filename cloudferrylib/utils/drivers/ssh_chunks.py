@@ -13,14 +13,17 @@
 # limitations under the License.
 
 
+import hashlib
+import json
 import os
+import threading
+from multiprocessing.pool import ThreadPool
 
 from fabric.api import env
-from fabric.api import hide
 from fabric.api import run
-from fabric.api import settings
 
 from cloudferrylib.utils import driver_transporter
+from cloudferrylib.utils import ssh_util
 from cloudferrylib.utils import utils
 
 
@@ -29,150 +32,244 @@ LOG = utils.get_log(__name__)
 
 # Command templates
 dd_src_command = 'dd if=%s of=%slv_part_%s skip=%s bs=1M count=%s'
-dd_dst_command = 'dd if=%slv_part_%s of=%s seek=%s bs=1M count=%s'
+# conv=notrunc: chunks may be written in any order, so writing one chunk
+# must not cut off the chunks already written after it
+dd_dst_command = ('dd if=%slv_part_%s of=%s seek=%s bs=1M count=%s '
+                  'conv=notrunc')
 md5_command = "md5sum %slv_part_%s"
 gzip_command = "gzip -f %slv_part_%s"
 unzip_command = "gzip -f -d %slv_part_%s.gz"
 scp_command = 'scp -o StrictHostKeyChecking=no %slv_part_%s.gz %s@%s:%s'
-rm_command = 'rm -rf %slv_part_%s*'
-ssh_command = "ssh -o StrictHostKeyChecking=no %s@%s '%s'"
+rm_command = 'rm -f %slv_part_%s %slv_part_%s.gz'
+
+
+class ChunksManifest(object):
+    """Local file with checksums of chunks which are already written on
+    destination. Allows to continue failed transfer from the chunks which
+    are not transferred yet instead of starting from the beginning."""
+
+    def __init__(self, manifest_dir, data, part_size, part_count):
+        self.source = {'host_src': data['host_src'],
+                       'path_src': data['path_src'],
+                       'host_dst': data['host_dst'],
+                       'path_dst': data['path_dst'],
+                       'part_size': part_size,
+                       'part_count': part_count}
+        key = hashlib.md5(json.dumps(self.source, sort_keys=True))
+        self.path = os.path.join(manifest_dir,
+                                 'ssh_chunks_%s.json' % key.hexdigest())
+        self.chunks = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not utils.check_file(self.path):
+            return
+        with open(self.path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get('source') == self.source:
+            self.chunks = {int(part): md5 for part, md5 in
+                           manifest['chunks'].iteritems()}
+
+    def _dump(self):
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir and not os.path.isdir(manifest_dir):
+            os.makedirs(manifest_dir)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump({'source': self.source, 'chunks': self.chunks},
+                      manifest_file)
+        # rename is atomic, so manifest is never left half-written
+        os.rename(tmp_path, self.path)
+
+    def is_done(self, part):
+        return part in self.chunks
+
+    def mark_done(self, part, md5):
+        with self.lock:
+            self.chunks[part] = md5
+            self._dump()
+
+    def remove(self):
+        if utils.check_file(self.path):
+            os.remove(self.path)
 
 
 class SSHChunksTransfer(driver_transporter.DriverTransporter):
-    def transfer(self, data):
-        host_src = data['host_src']
-        host_dst = data['host_dst']
-        path_src = data['path_src']
-        path_dst = data['path_dst']
-
-        ssh_user_src = self.cfg.src.ssh_user
-        ssh_sudo_pass_src = self.cfg.src.ssh_sudo_password
-
-        ssh_user_dst = self.cfg.dst.ssh_user
-        ssh_sudo_pass_dst = self.cfg.dst.ssh_sudo_password
+    """Transfers file by chunks: every chunk is cut by dd, compressed,
+    copied by scp and written on destination with md5 check.
 
-        src_temp_dir = os.path.join(self.cfg.src.temp, '')
-        dst_temp_dir = os.path.join(self.cfg.dst.temp, '')
+    migrate.ssh_chunks_in_flight chunks are processed at the same time,
+    so reading of one chunk on source overlaps with copying and writing
+    of others. Written chunks are stored in ChunksManifest, so the next
+    run of failed transfer skips them."""
 
-        attempts_count = self.cfg.migrate.retry
+    def transfer(self, data):
         part_size = self.cfg.migrate.ssh_chunk_size
-
         part_count, part_modulo = self._calculate_parts_count(data)
 
-        with settings(host_string=host_src,
-                      user=ssh_user_src,
-                      password=ssh_sudo_pass_src), utils.forward_agent(
-                env.key_filename):
-            for part in range(part_count):
-                success = 0  # marker of successful transport operation
-                attempt = 0  # number of retry
-
-                # Create chunk
-                if part == range(part_count)[0]:
-                    # First chunk
-                    command = dd_src_command % (path_src,
-                                                src_temp_dir,
-                                                part,
-                                                0,
-                                                part_size)
-                elif part == range(part_count)[-1] and part_modulo:
-                    # Last chunk
-                    command = dd_src_command % (path_src,
-                                                src_temp_dir,
-                                                part,
-                                                part * part_size,
-                                                part_modulo)
-                else:
-                    # All middle chunks
-                    command = dd_src_command % (path_src,
-                                                src_temp_dir,
-                                                part,
-                                                part * part_size,
-                                                part_size)
-
-                run(command)
-
-                # Calculate source chunk check md5 checksum
-                md5_src_out = run(md5_command % (src_temp_dir, part))
-                md5_src = md5_src_out.split()[-2]
-
-                # Compress chunk
-                run(gzip_command % (src_temp_dir, part))
-
-                while success == 0:
-                    # Transport chunk to destination
-                    run(scp_command % (src_temp_dir,
-                                       part,
-                                       ssh_user_dst,
-                                       host_dst,
-                                       dst_temp_dir))
-
-                    # Unzip chunk (TODO: check exit code; if != 0: retry)
-                    run(ssh_command %
-                        (ssh_user_dst, host_dst, unzip_command % (dst_temp_dir,
-                                                                  part)))
-
-                    # Calculate md5sum on destination
-                    md5_dst_out = run(ssh_command %
-                                      (ssh_user_dst, host_dst,
-                                       md5_command % (dst_temp_dir, part)))
-                    md5_dst = md5_dst_out.split()[-2]
-
-                    # Compare source and destination md5 sums;
-                    # If not equal - retry with 'attempts_count' times
-                    if md5_src == md5_dst:
-                        success = 1
-
-                    if not success:
-                        attempt += 1
-                        LOG.critical("Unable to transfer part %s of %s. "
-                                     "Retrying... Attempt %s from %s.",
-                                     part, path_src, attempt, attempts_count)
-                        if attempt == attempts_count:
-                            LOG.error("SSH chunks transfer of %s failed.",
-                                      path_src)
-                            break
-                            # TODO: save state:
-                            # chunks count, volume info, and all metadata info
-                            # with timestamp and reason, errors info, error
-                            # codes
-                        continue
-
-                    #  Write chunk on destination
-                    if part == range(part_count)[0]:
-                        command = dd_dst_command % (dst_temp_dir,
-                                                    part,
-                                                    path_dst,
-                                                    0,
-                                                    part_size)
-                    elif part == range(part_count)[-1] and part_modulo:
-                        command = dd_dst_command % (dst_temp_dir,
-                                                    part,
-                                                    path_dst,
-                                                    part * part_size,
-                                                    part_modulo)
-                    else:
-                        command = dd_dst_command % (dst_temp_dir,
-                                                    part,
-                                                    path_dst,
-                                                    part * part_size,
-                                                    part_size)
-                    with hide('running'):
-                        # Because of password
-                        run(ssh_command %
-                            (ssh_user_dst, host_dst,
-                             'echo %s | sudo -S %s' % (ssh_sudo_pass_dst,
-                                                       command)))
-
-                        LOG.info(
-                            'Running: %s', ssh_command %
-                            (ssh_user_dst, host_dst,
-                             'echo %s | sudo -S %s' % ('<password>', command)))
-
-                    # Delete used chunk from both servers
-                    run(rm_command % (src_temp_dir, part))
-                    run(ssh_command % (ssh_user_dst, host_dst, rm_command %
-                                       (dst_temp_dir, part)))
+        manifest = ChunksManifest(self.cfg.migrate.ssh_chunks_manifest_dir,
+                                  data, part_size, part_count)
+        parts = [part for part in range(part_count)
+                 if not manifest.is_done(part)]
+        if len(parts) < part_count:
+            LOG.info("Resuming transfer of %s: %s of %s chunks are "
+                     "already transferred", data['path_src'],
+                     part_count - len(parts), part_count)
+
+        chunk_params = {
+            'host_dst': data['host_dst'],
+            'path_src': data['path_src'],
+            'path_dst': data['path_dst'],
+            'ssh_user_dst': self.cfg.dst.ssh_user,
+            'ssh_sudo_pass_dst': self.cfg.dst.ssh_sudo_password,
+            'src_temp_dir': os.path.join(self.cfg.src.temp, ''),
+            'dst_temp_dir': os.path.join(self.cfg.dst.temp, ''),
+            'attempts_count': self.cfg.migrate.retry,
+            'part_size': part_size,
+            'part_count': part_count,
+            'part_modulo': part_modulo,
+            'manifest': manifest
+        }
+
+        def transfer_chunk(part):
+            return self._safe_transfer_chunk(part, chunk_params)
+
+        workers = min(self.cfg.migrate.ssh_chunks_in_flight, len(parts))
+        with ssh_util.connection_manager.connection(
+                data['host_src'], self.cfg.src.ssh_user,
+                password=self.cfg.src.ssh_sudo_password), \
+                utils.forward_agent(env.key_filename):
+            if workers > 1:
+                # open connection to source before threads are started,
+                # so all of them share it
+                run('mkdir -p %s' % chunk_params['src_temp_dir'])
+                pool = ThreadPool(workers)
+                try:
+                    results = pool.map(transfer_chunk, parts)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = map(transfer_chunk, parts)
+
+        if all(results):
+            manifest.remove()
+        else:
+            LOG.error("SSH chunks transfer of %s is incomplete, "
+                      "restart migration to transfer remaining chunks.",
+                      data['path_src'])
+
+    def _safe_transfer_chunk(self, part, params):
+        """Failed chunk must not stop the pool: fabric aborts with
+        SystemExit, which hangs ThreadPool.map if raised in a worker"""
+
+        try:
+            return self._transfer_chunk(part, params)
+        except (Exception, SystemExit) as e:
+            LOG.error("SSH chunks transfer of part %s of %s failed: %s",
+                      part, params['path_src'], e)
+            return False
+
+    def _transfer_chunk(self, part, params):
+        src_temp_dir = params['src_temp_dir']
+        dst_temp_dir = params['dst_temp_dir']
+        ssh_user_dst = params['ssh_user_dst']
+        host_dst = params['host_dst']
+        path_src = params['path_src']
+        attempts_count = params['attempts_count']
+        offset, count = self._chunk_position(part, params['part_size'],
+                                             params['part_count'],
+                                             params['part_modulo'])
+
+        # Create chunk
+        run(dd_src_command % (path_src, src_temp_dir, part, offset, count))
+
+        # Calculate source chunk check md5 checksum
+        md5_src_out = run(md5_command % (src_temp_dir, part))
+        md5_src = md5_src_out.split()[-2]
+
+        # Compress chunk
+        run(gzip_command % (src_temp_dir, part))
+
+        attempt = 0  # number of retry
+        while True:
+            # Transport chunk to destination
+            run(scp_command % (src_temp_dir,
+                               part,
+                               ssh_user_dst,
+                               host_dst,
+                               dst_temp_dir))
+
+            # Unzip chunk (TODO: check exit code; if != 0: retry)
+            run(self._dst_command(params, unzip_command % (dst_temp_dir,
+                                                           part)))
+
+            # Calculate md5sum on destination
+            md5_dst_out = run(self._dst_command(
+                params, md5_command % (dst_temp_dir, part)))
+            md5_dst = md5_dst_out.split()[-2]
+
+            # Compare source and destination md5 sums;
+            # If not equal - retry with 'attempts_count' times
+            if md5_src == md5_dst:
+                break
+
+            attempt += 1
+            LOG.critical("Unable to transfer part %s of %s. "
+                         "Retrying... Attempt %s from %s.",
+                         part, path_src, attempt, attempts_count)
+            if attempt == attempts_count:
+                LOG.error("SSH chunks transfer of %s failed.", path_src)
+                return False
+
+        #  Write chunk on destination
+        command = dd_dst_command % (dst_temp_dir,
+                                    part,
+                                    params['path_dst'],
+                                    offset,
+                                    count)
+        LOG.info(
+            'Running: %s', self._dst_command(
+                params, 'echo %s | sudo -S %s' % ('<password>', command)))
+        # quiet instead of hide('running'): hide changes global output
+        # state shared by all threads, so other thread could echo password
+        result = run(self._dst_command(
+            params, 'echo %s | sudo -S %s' % (params['ssh_sudo_pass_dst'],
+                                              command)), quiet=True)
+        if result.failed:
+            LOG.error("Unable to write part %s of %s on destination.",
+                      part, path_src)
+            return False
+
+        params['manifest'].mark_done(part, md5_src)
+
+        # Delete used chunk from both servers
+        run(rm_command % (src_temp_dir, part, src_temp_dir, part))
+        run(self._dst_command(params, rm_command % (dst_temp_dir, part,
+                                                    dst_temp_dir, part)))
+        return True
+
+    @staticmethod
+    def _dst_command(params, command):
+        """Command executed on destination host through the ssh connection
+        shared by all commands of the transfer"""
+
+        return str(ssh_util.connection_manager.nested_ssh_cmd(
+            '%s@%s' % (params['ssh_user_dst'], params['host_dst']), command))
+
+    @staticmethod
+    def _chunk_position(part, part_size, part_count, part_modulo):
+        """Returns offset and size of chunk in megabytes"""
+
+        if part == 0:
+            # First chunk
+            return 0, part_size
+        elif part == part_count - 1 and part_modulo:
+            # Last chunk
+            return part * part_size, part_modulo
+        # All middle chunks
+        return part * part_size, part_size
 
     def _calculate_parts_count(self, data):
         part_size = self.cfg.migrate.ssh_chunk_size
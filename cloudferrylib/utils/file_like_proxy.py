@@ -13,7 +13,9 @@
 # limitations under the License.
 
 
+import inspect
 import re
+import threading
 import time
 
 from utils import get_log
@@ -24,9 +26,75 @@ LOG = get_log(__name__)
 CHUNK_SIZE = 512 * 1024  # B
 
 
+def parse_speed_limit(speed_limit):
+    """Converts speed limit like '10MB' to bytes per second, '-' means no
+    limit and is converted to 0."""
+
+    if speed_limit == '-':
+        return 0
+    array = filter(None, re.split(r'(\d+)', speed_limit))
+    mult = {
+        'b': 1,
+        'kb': 1024,
+        'mb': 1024 * 1024,
+    }[array[1].lower()]
+    return int(array[0]) * mult
+
+
+class TokenBucket(object):
+    """Bandwidth limiter shared between streams.
+
+    Every read takes tokens (bytes) from the bucket, which is refilled with
+    rate bytes per second. When the bucket is empty the reader sleeps until
+    tokens it took are refilled, so total rate of all streams does not
+    exceed rate. Rate 0 means no limit, bucket only counts bytes then.
+    """
+
+    def __init__(self, rate, capacity=CHUNK_SIZE):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.lock = threading.Lock()
+        self.start_time = self.timestamp = time.time()
+        self.consumed = 0
+
+    def consume(self, amount):
+        with self.lock:
+            self.consumed += amount
+            if not self.rate:
+                return
+            now = time.time()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= amount
+            sleep_time = -self.tokens / float(self.rate)
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+
+    def speed(self):
+        """Average rate of all streams in bytes per second."""
+
+        elapsed = time.time() - self.start_time
+        return self.consumed / elapsed if elapsed > 0 else 0
+
+
+def accepts_kwargs(func):
+    """Callbacks written before speed was reported take only 4 arguments,
+    speed and total_speed are passed only to callbacks with **kwargs."""
+
+    try:
+        return inspect.getargspec(func).keywords is not None
+    except TypeError:
+        return False
+
+
 class FileLikeProxy:
-    def __init__(self, transfer_object, callback, speed_limit='1mb'):
-        self.__callback = callback if callback else lambda size, length, obj_id, name: True
+    def __init__(self, transfer_object, callback, speed_limit='1mb',
+                 limiter=None):
+        self.__callback = (callback if callback else
+                           lambda size, length, obj_id, name: True)
+        self.__speed_kwargs = accepts_kwargs(self.__callback)
         self.resp = transfer_object['resource'].get_ref_image(
             transfer_object['id'])
         self.length = (
@@ -37,24 +105,15 @@ class FileLikeProxy:
         self.res = 0
         self.delta = 0
         self.buffer = ''
-        self.prev_send_time = 0
-        self.speed_limit = self.__parse_speed_limit(speed_limit)
-        if self.speed_limit != 0:
+        self.start_time = time.time()
+        self.speed_limit = parse_speed_limit(speed_limit)
+        self.limiter = limiter if limiter else TokenBucket(self.speed_limit)
+        if self.limiter.rate != 0:
             self.read = self.speed_limited_read
 
-    def __parse_speed_limit(self, speed_limit):
-        if speed_limit is '-':
-            return 0
-        array = filter(None, re.split(r'(\d+)', speed_limit))
-        mult = {
-            'b': 1,
-            'kb': 1024,
-            'mb': 1024 * 1024,
-        }[array[1].lower()]
-        return int(array[0]) * mult
-
     def read(self, *args, **kwargs):
         res = self.resp.read(*args, **kwargs)
+        self.limiter.consume(len(res))
         self.__trigger_callback(len(res))
         return res
 
@@ -65,19 +124,21 @@ class FileLikeProxy:
         res = self.buffer[0:CHUNK_SIZE]
         self.buffer = self.buffer[CHUNK_SIZE::]
 
+        self.limiter.consume(len(res))
         self.__trigger_callback(len(res))
-        cur_send_time = time.time()
-        sleep_time = float(len(res)) / self.speed_limit
-        sleep_time -= cur_send_time - self.prev_send_time
-        time.sleep(max((0, sleep_time)))
-        self.prev_send_time = cur_send_time
         return res
 
     def __trigger_callback(self, len_data):
         self.delta += len_data
         self.res += len_data
         if self.delta > self.percent:
-            self.__callback(self.res, self.length, self.id, self.name)
+            kwargs = {}
+            if self.__speed_kwargs:
+                elapsed = time.time() - self.start_time
+                kwargs = {'speed': self.res / elapsed if elapsed > 0 else 0,
+                          'total_speed': self.limiter.speed()}
+            self.__callback(self.res, self.length, self.id, self.name,
+                            **kwargs)
             self.delta = 0
 
     def close(self):
@@ -13,9 +13,61 @@
 # limitations under the License.
 
 
+import os
+import threading
+
 import sqlalchemy
 
 
+class EngineRegistry(object):
+    """Process wide registry of SQLAlchemy engines keyed by connection URL.
+
+    Engine keeps pool of connections, so the connection to database is
+    opened once instead of on every statement. Connections inherited from
+    parent process can not be shared with it, so after fork the registry
+    starts with new engines. Inherited engines are kept referenced and never
+    disposed in child process, otherwise closing them would break
+    connections of the parent."""
+
+    def __init__(self, pool_size=5, pool_recycle=3600, pre_ping=True):
+        self.pool_size = pool_size
+        self.pool_recycle = pool_recycle
+        self.pre_ping = pre_ping
+        self.lock = threading.Lock()
+        self.engines = {}
+        self.inherited = []
+        self.pid = os.getpid()
+
+    def configure(self, pool_size, pool_recycle, pre_ping):
+        with self.lock:
+            self.pool_size = pool_size
+            self.pool_recycle = pool_recycle
+            self.pre_ping = pre_ping
+
+    def get(self, url):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.inherited.extend(self.engines.values())
+                self.engines = {}
+                self.pid = os.getpid()
+            if url not in self.engines:
+                self.engines[url] = sqlalchemy.create_engine(
+                    url,
+                    pool_size=self.pool_size,
+                    pool_recycle=self.pool_recycle,
+                    pool_pre_ping=self.pre_ping)
+            return self.engines[url]
+
+    def dispose(self):
+        with self.lock:
+            for engine in self.engines.values():
+                engine.dispose()
+            self.engines = {}
+
+
+engines = EngineRegistry()
+
+
 class MysqlConnector():
     def __init__(self, config, db):
         self.config = config
@@ -30,9 +82,28 @@ class MysqlConnector():
                                          self.db)
 
     def get_engine(self):
-        return sqlalchemy.create_engine(self.connection_url)
+        return engines.get(self.connection_url)
 
     def execute(self, command, **kwargs):
-        with sqlalchemy.create_engine(
-                self.connection_url).begin() as connection:
+        with self.get_engine().begin() as connection:
             return connection.execute(sqlalchemy.text(command), **kwargs)
+
+    def execute_many(self, command, params):
+        """Executes command once per item of params (list of dicts) as one
+        executemany call in single transaction."""
+
+        params = list(params)
+        if not params:
+            return
+        with self.get_engine().begin() as connection:
+            connection.execute(sqlalchemy.text(command), params)
+
+    def iter_rows(self, command, **kwargs):
+        """Yields rows of query result without buffering all of them on
+        client side."""
+
+        with self.get_engine().connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(
+                sqlalchemy.text(command), **kwargs)
+            for row in result:
+                yield row
@@ -0,0 +1,153 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import json
+import os
+import resource
+import threading
+import time
+
+import prettytable
+
+TASK = 'task'
+STEP = 'step'
+
+OK = 'ok'
+ERROR = 'error'
+
+
+# getrusage(RUSAGE_THREAD) is linux only and python 2 has no constant
+RUSAGE_THREAD = getattr(resource, 'RUSAGE_THREAD', 1)
+
+
+def cpu_time():
+    """CPU time of the current thread, tasks of parallel branches run in
+    threads of one process. Where per-thread time is not supported, CPU
+    time of the whole process is returned."""
+
+    try:
+        usage = resource.getrusage(RUSAGE_THREAD)
+        return usage.ru_utime + usage.ru_stime
+    except (ValueError, resource.error):
+        user, system = os.times()[:2]
+        return user + system
+
+
+class Span(object):
+    """Time interval of one task or step, it is recorded on finish"""
+
+    def __init__(self, profiler, name, category, args=None):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args or {}
+        self.start = time.time()
+        self.cpu_start = cpu_time()
+
+    def finish(self, status=OK, **args):
+        self.args.update(args)
+        self.args['status'] = status
+        self.args['cpu_time'] = cpu_time() - self.cpu_start
+        self.profiler.record(self, time.time() - self.start)
+
+
+class Profiler(object):
+    """
+    Collects wall and cpu time of scheduler tasks and of functions
+    decorated with utils.log_step, results are exported as Chrome
+    trace (chrome://tracing) and summary table of tasks.
+    Profiler is listener of utils.stack_call_functions, so every log_step
+    function called while it is added gets its span. Spans recorded in
+    forked processes (process pool branches and thread tasks) are sent
+    back to the parent with results of the processes, see events_since
+    and merge.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.events = []
+        self.steps = threading.local()
+
+    def span(self, name, category=TASK, **args):
+        return Span(self, name, category, args)
+
+    def record(self, span, duration):
+        self.events.append({
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': int((span.start - self.start) * 10 ** 6),
+            'dur': int(duration * 10 ** 6),
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident,
+            'args': span.args,
+        })
+
+    def position(self):
+        """Position in events to get events recorded after it"""
+
+        return len(self.events)
+
+    def events_since(self, position):
+        return self.events[position:]
+
+    def merge(self, events):
+        """Add events recorded by copy of profiler in child process"""
+
+        self.events.extend(events)
+
+    def func_enter(self, stack):
+        if not hasattr(self.steps, 'spans'):
+            self.steps.spans = []
+        # stack of log_step functions is separate for every thread
+        func = stack.stack_call_functions[-1]
+        self.steps.spans.append(self.span(func['func_name'], STEP))
+
+    def func_exit(self, stack):
+        spans = getattr(self.steps, 'spans', None)
+        if spans:
+            error = stack.stack_call_functions[-1].get('error')
+            if error is not None:
+                spans.pop().finish(ERROR, error=repr(error))
+            else:
+                spans.pop().finish()
+
+    def trace(self):
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def dump_trace(self, path):
+        with open(path, 'w') as trace_file:
+            json.dump(self.trace(), trace_file)
+
+    def summary(self):
+        """
+        Table of tasks with number of runs, errors, total wall and cpu
+        time, longest tasks first
+        """
+        tasks = {}
+        for event in self.events:
+            if event['cat'] != TASK:
+                continue
+            stat = tasks.setdefault(event['name'], [0, 0, 0., 0.])
+            stat[0] += 1
+            stat[1] += event['args']['status'] != OK
+            stat[2] += event['dur'] / 10. ** 6
+            stat[3] += event['args']['cpu_time']
+        table = prettytable.PrettyTable(
+            ['Task', 'Runs', 'Errors', 'Wall time, s', 'CPU time, s'])
+        for name, stat in sorted(tasks.items(), key=lambda i: i[1][2],
+                                 reverse=True):
+            table.add_row([name, stat[0], stat[1], "%.3f" % stat[2],
+                           "%.3f" % stat[3]])
+        return table.get_string()
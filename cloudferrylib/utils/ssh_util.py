@@ -13,23 +13,119 @@
 # limitations under the License.
 
 
+import contextlib
+import threading
+import time
+
 from fabric.api import run
 from fabric.api import settings
+from fabric.state import connections
 
 import cmd_cfg
 from utils import forward_agent
 
 
+class SshConnectionManager(object):
+    """Shares ssh connections between commands executed on the same host.
+
+    Fabric keeps connection to every host it connected to, so the
+    connection is opened only once. Manager limits number of commands
+    executed on one host at the same time and closes connections which
+    were not used for idle_timeout seconds. Nested ssh from the host to
+    internal hosts reuses one master connection (ssh ControlMaster), which
+    is closed by ssh itself after idle_timeout seconds.
+
+    Host of the connection is set by fabric settings(host_string=...),
+    which change global env of fabric shared by all threads of process.
+    So threads of one process may run commands at the same time only on
+    the same host (e.g. chunks of one file in ssh_chunks); commands to
+    different hosts at the same time need separate processes (scheduler
+    process pool)."""
+
+    control_path = '~/.ssh/cloudferry-%r@%h:%p'
+
+    def __init__(self, max_per_host=10, idle_timeout=600):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.semaphores = {}
+        self.in_use = {}
+        self.last_used = {}
+
+    def configure(self, max_per_host, idle_timeout):
+        with self.lock:
+            if max_per_host != self.max_per_host:
+                # semaphores are created again with the new limit, commands
+                # running now release the old ones
+                self.semaphores = {}
+            self.max_per_host = max_per_host
+            self.idle_timeout = idle_timeout
+
+    def _semaphore(self, key):
+        with self.lock:
+            if key not in self.semaphores:
+                self.semaphores[key] = threading.BoundedSemaphore(
+                    self.max_per_host)
+            return self.semaphores[key]
+
+    @contextlib.contextmanager
+    def connection(self, host, user, gateway=None, **kwargs):
+        """Context in which fabric commands are executed on host.
+        Additional kwargs are passed to fabric settings."""
+
+        key = (user, host, gateway)
+        if gateway:
+            kwargs['gateway'] = gateway
+        self.evict_idle()
+        with self._semaphore(key):
+            with self.lock:
+                self.in_use[key] = self.in_use.get(key, 0) + 1
+            try:
+                with settings(host_string=host, user=user, **kwargs):
+                    yield
+            finally:
+                with self.lock:
+                    self.in_use[key] -= 1
+                    self.last_used[key] = time.time()
+
+    def evict_idle(self):
+        now = time.time()
+        with self.lock:
+            busy = set((user, host) for (user, host, _), count
+                       in self.in_use.iteritems() if count)
+            for key, last_used in self.last_used.items():
+                user, host, _ = key
+                # connections through different gateways are cached by
+                # fabric under the same key
+                if (user, host) in busy or \
+                        now - last_used < self.idle_timeout:
+                    continue
+                del self.last_used[key]
+                host_string = host if '@' in host else '%s@%s' % (user, host)
+                if host_string in connections:
+                    connections[host_string].close()
+                    del connections[host_string]
+
+    def nested_ssh_cmd(self, host, cmd):
+        return cmd_cfg.ssh_mux_cmd(self.control_path, self.idle_timeout,
+                                   host, cmd)
+
+
+connection_manager = SshConnectionManager()
+
+
 class SshUtil(object):
     def __init__(self, cloud, config_migrate, host=None):
         self.cloud = cloud
         self.host = host if host else cloud.host
         self.config_migrate = config_migrate
+        connection_manager.configure(
+            config_migrate.ssh_connections_per_host,
+            config_migrate.ssh_connection_idle_timeout)
 
     def execute(self, cmd, internal_host=None, host_exec=None):
         host = host_exec if host_exec else self.host
-        with settings(host_string=host,
-                      user=self.cloud.ssh_user):
+        with connection_manager.connection(host, self.cloud.ssh_user):
             if internal_host:
                 return self.execute_on_inthost(str(cmd), internal_host)
             else:
@@ -37,4 +133,5 @@ class SshUtil(object):
 
     def execute_on_inthost(self, cmd, host):
         with forward_agent(self.config_migrate.key_filename):
-            return run(str(cmd_cfg.ssh_cmd(host, str(cmd))))
+            return run(str(connection_manager.nested_ssh_cmd(host,
+                                                             str(cmd))))
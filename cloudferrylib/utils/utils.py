@@ -25,6 +25,7 @@ import json
 from jinja2 import Environment, FileSystemLoader
 import os
 import inspect
+import threading
 from multiprocessing import Lock
 from fabric.api import run, settings, local, env, sudo
 from fabric.context_managers import hide
@@ -191,7 +192,7 @@ class GeneratorPassword:
         return self.__generate_password()
 
     def __generate_password(self):
-        random.seed = (os.urandom(1024))
+        random.seed(os.urandom(1024))
         return ''.join(random.choice(self.chars) for i in range(self.length))
 
 
@@ -247,9 +248,16 @@ def get_log(name):
 
 class StackCallFunctions(object):
     def __init__(self):
-        self.stack_call_functions = []
+        # every thread has its own stack of called functions
+        self.local = threading.local()
         self.listeners = []
 
+    @property
+    def stack_call_functions(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
     def trigger(self, name_event):
         for listener in self.listeners:
             {
@@ -268,8 +276,9 @@ class StackCallFunctions(object):
     def depth(self):
         return len(self.stack_call_functions)
 
-    def pop(self, res):
+    def pop(self, res, error=None):
         self.stack_call_functions[-1]['result'] = res
+        self.stack_call_functions[-1]['error'] = error
         self.trigger('func_exit')
         self.stack_call_functions.pop()
 
@@ -289,7 +298,11 @@ def log_step(log):
         def inner(*args, **kwargs):
             stack_call_functions.append(func.__name__, args, kwargs)
             log.info("%s> Step %s" % ("- - "*stack_call_functions.depth(), func.__name__))
-            res = func(*args, **kwargs)
+            try:
+                res = func(*args, **kwargs)
+            except Exception as e:
+                stack_call_functions.pop(None, e)
+                raise
             stack_call_functions.pop(res)
             return res
         return inner
@@ -23,6 +23,10 @@ TRANSFER = "transfer"
 MIGRATE = "migrate"
 CONDENSE = "condense"
 
+# dumped steps are written to database by batches of this size, so
+# failure in the middle of condensation loses only the last steps
+FLUSH_STEPS = 100
+
 
 def normalize(string):
     """
@@ -42,6 +46,8 @@ class Actions(object):
         self.iteration = 0
         # name of the cloud that performs actions
         self.name = name
+        # dumped steps that are not written to database yet
+        self.dumped = []
         self.new_step()
 
     def new_step(self):
@@ -64,11 +70,22 @@ class Actions(object):
 
     def dump_actions(self):
         """
-            This method writes all actions on the current step to database
+            This method saves all actions on the current step, they are
+            written to database on flush
         """
-        data_storage.put(self.key, json.dumps(self.data))
+        self.dumped.append((self.key, json.dumps(self.data)))
         self.new_step()
         self.iteration += 1
+        if len(self.dumped) >= FLUSH_STEPS:
+            self.flush()
+
+    def flush(self):
+        """
+            This method writes all dumped steps to database at once
+        """
+        if self.dumped:
+            data_storage.put_many(self.dumped)
+            self.dumped = []
 
     def add_migration_action(self, vm_obj, target_node):
         """
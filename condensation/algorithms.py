@@ -12,8 +12,15 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import collections
 
-def accurate(flavors_list, max_ram, max_core):
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def accurate_python(flavors_list, max_ram, max_core):
     """
     This is implementation of bounded multiobjective multidimension knapsack
     solution with dynamic programming
@@ -68,7 +75,7 @@ def accurate(flavors_list, max_ram, max_core):
     return result
 
 
-def fast(flavors_list, max_ram, max_core):
+def fast_python(flavors_list, max_ram, max_core):
     """
     This is implementation of unbounded multiobjective multidimensional
     knapsack problem solution
@@ -97,3 +104,213 @@ def fast(flavors_list, max_ram, max_core):
                             [candidate_ram, candidate_core], prev_state[1][:]]
                         state[ram][core][1][i] += 1
     return state[max_ram][max_core][1]
+
+
+def accurate_numpy(flavors_list, max_ram, max_core):
+    """
+    Vectorized version of accurate_python with the same result.
+    Only two layers of the state (previous and current item) are kept as 2-D
+    arrays of ram and core objectives, whole layer is computed at once. For
+    backtracking we keep bitmap of cells where item was added for every
+    item.
+    """
+
+    if max_ram < 0 or max_core < 0:
+        return []
+    shape = (max_ram + 1, max_core + 1)
+    prev_ram = numpy.zeros(shape, dtype=numpy.int64)
+    prev_core = numpy.zeros(shape, dtype=numpy.int64)
+    added = []
+    for flavor in flavors_list:
+        flavor_ram, flavor_core = flavor[1:]
+        cur_ram = prev_ram.copy()
+        cur_core = prev_core.copy()
+        was_added = numpy.zeros(shape, dtype=bool)
+        ram_from, core_from = max(1, flavor_ram), max(1, flavor_core)
+        if ram_from <= max_ram and core_from <= max_core:
+            region = (slice(ram_from, None), slice(core_from, None))
+            shifted = (slice(ram_from - flavor_ram, max_ram + 1 - flavor_ram),
+                       slice(core_from - flavor_core,
+                             max_core + 1 - flavor_core))
+            candidate_ram = prev_ram[shifted] + flavor_ram
+            candidate_core = prev_core[shifted] + flavor_core
+            # we put item into knapsack
+            # only if we can improve both of objectives
+            put = ((candidate_ram >= prev_ram[region]) &
+                   (candidate_core >= prev_core[region]))
+            cur_ram[region] = numpy.where(put, candidate_ram,
+                                          prev_ram[region])
+            cur_core[region] = numpy.where(put, candidate_core,
+                                           prev_core[region])
+            was_added[region] = put & (
+                (candidate_ram != prev_ram[region]) |
+                (candidate_core != prev_core[region]))
+        added.append(numpy.packbits(was_added, axis=None))
+        prev_ram, prev_core = cur_ram, cur_core
+
+    # backtrack the result
+    result = []
+    ram, core = max_ram, max_core
+    for index in range(len(flavors_list), 0, -1):
+        cell = ram * (max_core + 1) + core
+        if (added[index - 1][cell >> 3] >> (7 - (cell & 7))) & 1:
+            result.append(flavors_list[index - 1])
+            flavor_ram, flavor_core = flavors_list[index - 1][1:]
+            ram -= flavor_ram
+            core -= flavor_core
+    return result
+
+
+def fast_numpy(flavors_list, max_ram, max_core):
+    """
+    Vectorized version of fast_python with the same result.
+    Cell (ram, core) depends on cell (ram - flavor_ram, core - flavor_core)
+    updated for the same flavor, so the state is processed by slabs of
+    flavor_ram rows, every slab depends only on previous one.
+    """
+
+    if max_ram < 0 or max_core < 0:
+        return [0 for i in flavors_list]
+    shape = (max_ram + 1, max_core + 1)
+    state_ram = numpy.zeros(shape, dtype=numpy.int64)
+    state_core = numpy.zeros(shape, dtype=numpy.int64)
+    counts = numpy.zeros(shape + (len(flavors_list),), dtype=numpy.int64)
+
+    for i, fl_obj in enumerate(flavors_list):
+        flavor_count, flavor_ram, flavor_core = fl_obj[1:]
+        if flavor_ram > max_ram or flavor_core > max_core:
+            continue
+        if flavor_ram:
+            axis, step, start, stop = 0, flavor_ram, flavor_ram, max_ram + 1
+        elif flavor_core:
+            axis, step, start, stop = 1, flavor_core, flavor_core, max_core + 1
+        else:
+            axis, step, start, stop = 0, max_ram + 1, 0, max_ram + 1
+        for slab_start in range(start, stop, step):
+            slab_stop = min(slab_start + step, stop)
+            if axis == 0:
+                region = (slice(slab_start, slab_stop),
+                          slice(flavor_core, None))
+                shifted = (slice(slab_start - flavor_ram,
+                                 slab_stop - flavor_ram),
+                           slice(0, max_core + 1 - flavor_core))
+            else:
+                region = (slice(flavor_ram, None),
+                          slice(slab_start, slab_stop))
+                shifted = (slice(0, max_ram + 1 - flavor_ram),
+                           slice(slab_start - flavor_core,
+                                 slab_stop - flavor_core))
+            candidate_ram = state_ram[shifted] + flavor_ram
+            candidate_core = state_core[shifted] + flavor_core
+            prev_counts = counts[shifted]
+            put = ((prev_counts[..., i] < flavor_count) &
+                   (state_ram[region] <= candidate_ram) &
+                   (state_core[region] <= candidate_core))
+            new_counts = prev_counts[put]
+            new_counts[:, i] += 1
+            state_ram[region] = numpy.where(put, candidate_ram,
+                                            state_ram[region])
+            state_core[region] = numpy.where(put, candidate_core,
+                                             state_core[region])
+            region_counts = counts[region]
+            region_counts[put] = new_counts
+            counts[region] = region_counts
+    return [int(count) for count in counts[max_ram, max_core]]
+
+
+if numpy is not None:
+    accurate = accurate_numpy
+    fast = fast_numpy
+else:
+    accurate = accurate_python
+    fast = fast_python
+
+
+class SolutionsCache(object):
+    """
+    LRU cache of solutions. Many nodes have the same free resources and
+    are solved against the same flavors, key is the capacity and multiset
+    of flavors, so solution is reused for any order of flavors_list
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.solutions = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(accurate_mode, flavors_list, max_ram, max_core):
+        return (max_ram, max_core, bool(accurate_mode),
+                tuple(sorted(flavors_list)))
+
+    def get(self, accurate_mode, flavors_list, max_ram, max_core):
+        """
+        Returns cached solution for flavors_list or None
+        """
+        key = self.key(accurate_mode, flavors_list, max_ram, max_core)
+        if key not in self.solutions:
+            self.misses += 1
+            return None
+        self.hits += 1
+        solution = self.solutions.pop(key)
+        self.solutions[key] = solution
+        if accurate_mode:
+            return list(solution)
+        # solution of fast algorithm is count of every flavor in order of
+        # flavors_list
+        return [solution[fl] for fl in flavors_list]
+
+    def put(self, accurate_mode, flavors_list, max_ram, max_core, solution):
+        if self.size <= 0:
+            return
+        key = self.key(accurate_mode, flavors_list, max_ram, max_core)
+        if not accurate_mode:
+            solution = dict(zip(flavors_list, solution))
+        self.solutions.pop(key, None)
+        self.solutions[key] = solution
+        while len(self.solutions) > self.size:
+            self.solutions.popitem(last=False)
+
+    def clear(self):
+        self.solutions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits * 100. / total if total else 0.
+
+    def __str__(self):
+        return "%d hits, %d misses (%.1f%% hit rate), %d solutions" % (
+            self.hits, self.misses, self.hit_rate, len(self.solutions))
+
+
+solutions_cache = SolutionsCache()
+
+
+def solve(accurate_mode, flavors_list, max_ram, max_core, cache=None):
+    """
+    This function runs accurate or fast algorithm, it takes only plain
+    data, so it can be called in worker process
+    Solutions are taken from and stored to cache if it is provided
+    """
+    if cache is not None:
+        solution = cache.get(accurate_mode, flavors_list, max_ram, max_core)
+        if solution is not None:
+            return solution
+    if accurate_mode:
+        solution = accurate(flavors_list, max_ram, max_core)
+    else:
+        solution = fast(flavors_list, max_ram, max_core)
+    if cache is not None:
+        cache.put(accurate_mode, flavors_list, max_ram, max_core, solution)
+    return solution
+
+
+def solve_task(task):
+    """
+    Wrapper of solve for multiprocessing.Pool.map
+    """
+    return solve(*task)
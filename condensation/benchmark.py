@@ -0,0 +1,153 @@
+# Copyright (c) 2015 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+
+from condensation import action
+from condensation import algorithms
+from condensation import cloud
+from cloudferrylib.utils import utils as utl
+LOG = utl.get_log(__name__)
+
+
+NODE_CORE = 32
+NODE_RAM = 128 * 1024
+
+
+def generate_state(nodes=100, flavors=5, flavor_skew=1.0, fill_ratio=0.5,
+                   group_depth=1, groups=10, seed=0):
+    """
+    This function generates synthetic nodes, flavors, vms and groups in
+    format of Cloud.from_dicts
+        nodes - number of nodes
+        flavors - number of flavors, flavor k has 2 ** k cores and 2 ** k GB
+            of ram
+        flavor_skew - vms get flavor k with probability proportional to
+            1 / (k + 1) ** flavor_skew, 0 means uniform distribution
+        fill_ratio - part of resources of every node used by vms
+        group_depth - depth of groups tree, every group is split into 2
+            subgroups on every level
+        groups - number of top level groups
+    """
+    rand = random.Random(seed)
+    nodes_dict = {}
+    for i in range(nodes):
+        nodes_dict[u"node%d" % i] = {"core": NODE_CORE, "ram": NODE_RAM,
+                                     "core_ratio": 1, "ram_ratio": 1}
+    flavors_dict = {}
+    for i in range(flavors):
+        flavors_dict[str(i)] = {"fl_id": str(i), "name": "flavor%d" % i,
+                                "ram": 1024 * 2 ** i, "core": 2 ** i}
+    weights = [1. / (i + 1) ** flavor_skew for i in range(flavors)]
+
+    vms = {}
+    for node_name in sorted(nodes_dict):
+        free_ram = NODE_RAM * fill_ratio
+        free_core = NODE_CORE * fill_ratio
+        while True:
+            fl_id = str(_weighted_choice(rand, weights))
+            flavor = flavors_dict[fl_id]
+            if flavor["ram"] > free_ram or flavor["core"] > free_core:
+                break
+            free_ram -= flavor["ram"]
+            free_core -= flavor["core"]
+            vm_id = u"vm%d" % len(vms)
+            vms[vm_id] = {"id": vm_id, "host": node_name, "flavor": fl_id}
+
+    vm_ids = sorted(vms)
+    rand.shuffle(vm_ids)
+    groups_dict = {}
+    for i in range(groups):
+        groups_dict["group%d" % i] = _generate_groups(
+            vm_ids[i::groups], group_depth, "group%d" % i)
+    return nodes_dict, flavors_dict, vms, groups_dict
+
+
+def _weighted_choice(rand, weights):
+    point = rand.random() * sum(weights)
+    for index, weight in enumerate(weights):
+        point -= weight
+        if point < 0:
+            return index
+    return len(weights) - 1
+
+
+def _generate_groups(vm_ids, depth, name):
+    if depth <= 1:
+        return vm_ids
+    middle = len(vm_ids) / 2
+    return {name + "-0": _generate_groups(vm_ids[:middle], depth - 1,
+                                          name + "-0"),
+            name + "-1": _generate_groups(vm_ids[middle:], depth - 1,
+                                          name + "-1")}
+
+
+def run_point(params):
+    """
+    This function runs migration of synthetic cloud to empty cloud and
+    returns measurements, actions are not dumped to database
+    """
+    state = generate_state(**params)
+    dumped = []
+    put_many = action.data_storage.put_many
+    action.data_storage.put_many = lambda items: dumped.extend(
+        len(value) for key, value in items)
+    algorithms.solutions_cache.clear()
+    start_time = time.time()
+    error = None
+    try:
+        cloud.Cloud.from_dicts('source', *state).migrate_to(
+            cloud.Cloud('destination'))
+    except RuntimeError as e:
+        error = str(e)
+    finally:
+        action.data_storage.put_many = put_many
+    return {
+        "params": params,
+        "vms": len(state[2]),
+        "time": time.time() - start_time,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "knapsack_calls": (algorithms.solutions_cache.hits +
+                           algorithms.solutions_cache.misses),
+        "knapsack_solved": algorithms.solutions_cache.misses,
+        "dumped_bytes": sum(dumped),
+        "error": error,
+    }
+
+
+def run(points, output=None):
+    """
+    This function runs every point in separate process, so peak RSS is
+    measured for every point separately, and writes one json line per
+    point to output
+    """
+    output = output or sys.stdout
+    results = []
+    for params in points:
+        LOG.info("running condensation benchmark %s", params)
+        pool = multiprocessing.Pool(1)
+        try:
+            result = pool.apply(run_point, (params,))
+        finally:
+            pool.close()
+            pool.join()
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        results.append(result)
+    return results
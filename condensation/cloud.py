@@ -12,18 +12,27 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+from condensation import algorithms
 from condensation import group
 from condensation import flavor
 from condensation import action
 from condensation import node
 from condensation import vm
 
+import bisect
 import prettytable
 import fractions
+import multiprocessing
+import time
 from cfglib import CONF
 from cloudferrylib.utils import utils
 LOG = utils.get_log(__name__)
 
+# results of condensation step
+FILLED = "filled"
+SWITCH_TO_ACCURATE = "switch_to_accurate"
+DONE = "done"
+
 
 class Cloud(object):
 
@@ -97,6 +106,9 @@ class Cloud(object):
         self.actions = action.Actions(name)
         # do we need to solve bounded dynamic knapsacks problem
         self.improve_accuracy = False
+        self.stats = {}
+        # pool of knapsack workers while condense is running
+        self.pool = None
         LOG.debug("created cloud obj with name " + name)
 
     def add_nodes(self, nodes_dict):
@@ -105,8 +117,50 @@ class Cloud(object):
         """
         LOG.debug("adding nodes to cloud " + self.name)
         self.nodes = nodes_dict
+        # index of vms on nodes that are not full:
+        # flavor -> {node -> number of vms with flavor on node}
+        self.flavor_distribution = {}
+        self.flavor_amounts = {}
+        self.indexed_nodes = {}
+        # index of nodes that are not full ordered by free resources:
+        # sorted list of (free ram, free core, node name, node)
+        self.free_nodes = []
+        self.free_nodes_keys = {}
         for node_obj in nodes_dict.values():
             node_obj.cloud = self
+            self.index_node(node_obj)
+
+    def index_node(self, node_obj):
+        """
+            This method updates flavor distribution index with vms of
+            node and placement index with free resources of node, it is
+            called by node when vm is linked or unlinked
+        """
+        key = self.free_nodes_keys.pop(node_obj, None)
+        if key is not None:
+            del self.free_nodes[bisect.bisect_left(self.free_nodes, key)]
+        for flavor_obj, count in self.indexed_nodes.pop(node_obj,
+                                                        {}).items():
+            distribution = self.flavor_distribution[flavor_obj]
+            del distribution[node_obj]
+            self.flavor_amounts[flavor_obj] -= count
+            if not distribution:
+                del self.flavor_distribution[flavor_obj]
+                del self.flavor_amounts[flavor_obj]
+        if node_obj.cloud is not self or node_obj.is_full:
+            return
+        key = node_obj.free_resources + (node_obj.name, node_obj)
+        self.free_nodes_keys[node_obj] = key
+        bisect.insort(self.free_nodes, key)
+        flavors_count = dict(node_obj.flavors_count)
+        if not flavors_count:
+            return
+        self.indexed_nodes[node_obj] = flavors_count
+        for flavor_obj, count in flavors_count.items():
+            self.flavor_distribution.setdefault(flavor_obj, {})[
+                node_obj] = count
+            self.flavor_amounts[flavor_obj] = self.flavor_amounts.get(
+                flavor_obj, 0) + count
 
     def calc_required_flavors_for_nodes(self):
         """
@@ -119,20 +173,14 @@ class Cloud(object):
         # we need to count for each flavor distribution
         # on nodes that are not full
         LOG.debug("starting recalculation of flavor distribution over nodes")
-        flavors_dict = {}
-        for node_obj in self.nodes.values():
-            if node_obj.is_full:
-                continue
-            for vm_obj in node_obj.vms.values():
-                if vm_obj.flavor not in flavors_dict:
-                    flavors_dict[vm_obj.flavor] = 0
-                flavors_dict[vm_obj.flavor] += 1
+        flavors_dict = dict(self.flavor_amounts)
 
         # just in case - make list of nodes to be recalculated distinct
         self.node_ids_to_be_recalculated = list(set(
             self.node_ids_to_be_recalculated))
         LOG.info("recalculating nodes " + ",".join(
             self.node_ids_to_be_recalculated))
+        nodes_to_recalculate = []
         for node_name in self.node_ids_to_be_recalculated:
             # paranoid check
             if node_name not in self.nodes:
@@ -141,9 +189,19 @@ class Cloud(object):
                 continue
             node_obj = self.nodes[node_name]
             if node_obj.vms and not node_obj.is_full:
-                LOG.debug("recalculating " + node_name)
+                nodes_to_recalculate.append(node_obj)
+        self.stats['knapsack_calls'] = self.stats.get(
+            'knapsack_calls', 0) + len(nodes_to_recalculate)
+
+        if self.pool and len(nodes_to_recalculate) > 1:
+            self.required_flavors_for_nodes.update(
+                self.calc_required_flavors_in_pool(
+                    nodes_to_recalculate, flavors_dict, self.pool))
+        else:
+            for node_obj in nodes_to_recalculate:
+                LOG.debug("recalculating " + node_obj.name)
                 self.required_flavors_for_nodes.update({
-                    node_name: node_obj.calculate_flavors_required(
+                    node_obj.name: node_obj.calculate_flavors_required(
                         flavors_dict,
                         self.improve_accuracy)})
 
@@ -151,19 +209,103 @@ class Cloud(object):
         self.node_ids_to_be_recalculated = []
         LOG.debug("finished recalculation of flavor distribution over nodes")
 
+    def calc_required_flavors_in_pool(self, nodes, flavors_dict, pool):
+        """
+        This method calculates flavor distribution for nodes in pool of
+        worker processes. Only free resources of node and flavors as tuples
+        are sent to workers, results are returned in order of nodes
+        """
+        LOG.debug("recalculating %d nodes in pool", len(nodes))
+        inputs = [node_obj.knapsack_input(flavors_dict,
+                                          self.improve_accuracy)
+                  for node_obj in nodes]
+        tasks = [(self.improve_accuracy, flavors_list, max_ram, max_core)
+                 for _, flavors_list, max_ram, max_core in inputs]
+        # only solutions which are not cached are calculated in pool
+        solutions = [algorithms.solutions_cache.get(*task) for task in tasks]
+        missed = [index for index, solution in enumerate(solutions)
+                  if solution is None]
+        if missed:
+            calculated = pool.map(algorithms.solve_task,
+                                  [tasks[index] for index in missed])
+            for index, solution in zip(missed, calculated):
+                solutions[index] = solution
+                algorithms.solutions_cache.put(*(tasks[index] + (solution,)))
+        result = {}
+        for node_obj, (fl_dict, flavors_list, _, _), solution in zip(
+                nodes, inputs, solutions):
+            result[node_obj.name] = node_obj.knapsack_result(
+                fl_dict, flavors_list, self.improve_accuracy, solution)
+        return result
+
     def condense(self, improve_accuracy=False):
         """
             This method finds vms distribution on nodes with highest density
-            it runs recursively until we cannot find better solution
+            it runs steps until we cannot find better solution or
+            condense.max_iterations or condense.time_limit is exceeded
+        """
+        algorithms.solutions_cache.size = CONF.condense.cache_size
+        self.stats = {'iterations': 0, 'nodes_filled': 0, 'vms_moved': 0,
+                      'knapsack_calls': 0}
+        start_time = time.time()
+        # knapsack workers are forked once per condensation instead of
+        # on every step
+        if CONF.condense.workers > 1:
+            self.pool = multiprocessing.Pool(CONF.condense.workers)
+        try:
+            self.start_condensation(improve_accuracy)
+            while True:
+                max_iterations = CONF.condense.max_iterations
+                if (max_iterations and
+                        self.stats['iterations'] >= max_iterations):
+                    LOG.warning("condensation stopped after %d iterations",
+                                self.stats['iterations'])
+                    break
+                if (CONF.condense.time_limit and
+                        time.time() - start_time > CONF.condense.time_limit):
+                    LOG.warning("condensation stopped after %d seconds",
+                                CONF.condense.time_limit)
+                    break
+                iteration_start = time.time()
+                knapsack_calls = self.stats['knapsack_calls']
+                vms_moved = self.stats['vms_moved']
+                result = self.condense_step()
+                self.stats['iterations'] += 1
+                LOG.debug("condensation iteration %d (%s) took %.3f s: "
+                          "%d knapsack calls, %d vms moved",
+                          self.stats['iterations'], result,
+                          time.time() - iteration_start,
+                          self.stats['knapsack_calls'] - knapsack_calls,
+                          self.stats['vms_moved'] - vms_moved)
+                if result == DONE:
+                    break
+                if result == SWITCH_TO_ACCURATE:
+                    # recalculate for all spare nodes
+                    self.start_condensation(True)
+        finally:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+        self.stats['time'] = time.time() - start_time
+        LOG.info("condensation of cloud %s finished in %.3f s: "
+                 "%d iterations, %d nodes filled, %d vms moved, "
+                 "%d knapsack calls", self.name, self.stats['time'],
+                 self.stats['iterations'], self.stats['nodes_filled'],
+                 self.stats['vms_moved'], self.stats['knapsack_calls'])
+        LOG.info("knapsack solutions cache: %s", algorithms.solutions_cache)
+
+    def start_condensation(self, improve_accuracy):
+        """
+            This method prepares recalculation of all nodes that are neither
+            full, nor empty
         """
         self.required_flavors_for_nodes = {}
         self.improve_accuracy = improve_accuracy
         self.node_ids_to_be_recalculated = []
-        # recalculate all nodes that are neither full, nor empty
         for node_name, node_obj in self.nodes.items():
             if node_obj.vms and not node_obj.is_full:
                 self.node_ids_to_be_recalculated.append(node_name)
-        self.condense_recursively()
 
     def fil_node(self, node_to_be_filled, node_name_to_be_filled):
         for flavor_obj, count in self.required_flavors_for_nodes[
@@ -191,6 +333,8 @@ class Cloud(object):
                     vm_obj.link_node(node_to_be_filled)
                     self.actions.add_condensation_action(
                         vm_obj, node_obj, node_to_be_filled)
+                    self.stats['vms_moved'] = self.stats.get(
+                        'vms_moved', 0) + 1
                     count -= 1
 
         # This node is already full - we don't need to store its distribution
@@ -216,17 +360,19 @@ class Cloud(object):
                         if node_name not in self.node_ids_to_be_recalculated:
                             self.node_ids_to_be_recalculated.append(node_name)
 
-    def condense_recursively(self):
+    def condense_step(self):
         """
-            This method finds vms distribution on nodes with highest density
-            it runs recursively until we cannot find better solution
+            This method fills one node with vms from other nodes
+            returns DONE if we cannot find better solution and
+            SWITCH_TO_ACCURATE if condensation should be restarted with
+            accurate algorithm
         """
         # calculate how much flavors each node need to be full
         self.calc_required_flavors_for_nodes()
 
         if not self.required_flavors_for_nodes:
             # we cannot improve result - we are done
-            return
+            return DONE
 
         # select node to be filled
         if self.improve_accuracy:
@@ -254,8 +400,7 @@ class Cloud(object):
             # it means that we are done with approximation part
             # and we need to switch to accurate algorithm
             if all([i < CONF.condense.precision for i in pot_util]):
-                # recalculate for all spare nodes
-                return self.condense(True)
+                return SWITCH_TO_ACCURATE
 
         # at this moment we have node to be filled and flavors to put on it
         # we need to do actual job at this step
@@ -265,7 +410,8 @@ class Cloud(object):
         LOG.info("filing node " + node_name_to_be_filled)
         self.fil_node(node_to_be_filled, node_name_to_be_filled)
         self.postprocess_filing()
-        return self.condense_recursively()
+        self.stats['nodes_filled'] = self.stats.get('nodes_filled', 0) + 1
+        return FILLED
 
     def transfer_nodes(self, cloud):
         """
@@ -282,6 +428,8 @@ class Cloud(object):
         node_to_be_transfered = self.nodes.pop(node_name)
         node_to_be_transfered.cloud = cloud
         cloud.nodes[node_to_be_transfered.name] = node_to_be_transfered
+        self.index_node(node_to_be_transfered)
+        cloud.index_node(node_to_be_transfered)
         self.actions.add_transfer_action(node_name)
 
     def get_group_to_migrate(self):
@@ -295,12 +443,56 @@ class Cloud(object):
         """
             This method tries to assign vms from group from source cloud
             to destination cloud
+            First vms are placed with best fit decreasing heuristic, if
+            some vms are left - distribution is calculated with knapsack
+            algorithms
+        """
+        vm_list = group_obj.get_all_vms()
+        flavors_dict, result = self.best_fit_group(vm_list, cloud_obj)
+        if flavors_dict:
+            flavors_dict, result = self.knapsack_group(vm_list, cloud_obj)
+        return flavors_dict, result
+
+    @staticmethod
+    def best_fit_group(vm_list, cloud_obj):
+        """
+            This method places vms from the largest one to the node with
+            the least free ram where vm fits, nodes are taken from
+            placement index of destination cloud
+        """
+        # free resources of nodes after placement of group
+        free_nodes = list(cloud_obj.free_nodes)
+        flavors_dict = {}
+        result = {}
+        for vm_obj in sorted(vm_list, reverse=True,
+                             key=lambda i: (i.flavor.ram, i.flavor.core)):
+            flavor_obj = vm_obj.flavor
+            index = bisect.bisect_left(free_nodes, (flavor_obj.ram,))
+            while (index < len(free_nodes) and
+                   free_nodes[index][1] < flavor_obj.core):
+                index += 1
+            if index == len(free_nodes):
+                flavors_dict[flavor_obj] = flavors_dict.get(
+                    flavor_obj, 0) + 1
+                continue
+            free_ram, free_core, name, node_obj = free_nodes.pop(index)
+            bisect.insort(free_nodes, (free_ram - flavor_obj.ram,
+                                       free_core - flavor_obj.core,
+                                       name, node_obj))
+            required = result.setdefault(node_obj, {})
+            required[flavor_obj] = required.get(flavor_obj, 0) + 1
+        return flavors_dict, result
+
+    @staticmethod
+    def knapsack_group(vm_list, cloud_obj):
+        """
+            This method fills nodes of destination cloud one by one with
+            flavors of vms, using knapsack algorithms
         """
         # try to assign vms on dst cloud
         list_of_nodes = [i for i in cloud_obj.nodes.values() if not i.is_full]
 
         flavors_dict = {}
-        vm_list = group_obj.get_all_vms()
         for vm_obj in vm_list:
             if vm_obj.flavor not in flavors_dict:
                 flavors_dict[vm_obj.flavor] = 0
@@ -325,13 +517,22 @@ class Cloud(object):
         return flavors_dict, result
 
     def migrate_vms(self, cloud):
-        return self.migrate_group(cloud)
+        """
+            This method migrates groups while they fit destination cloud,
+            first group must fit
+        """
+        strict = True
+        while self.migrate_group(cloud, strict):
+            strict = False
 
     def migrate_group(self, cloud, strict=True):
-        """This method migrates single group"""
+        """
+            This method migrates single group
+            returns True if group was migrated
+        """
         group_to_migrate = self.get_group_to_migrate()
         if not group_to_migrate:
-            return
+            return False
         # check that group can fit destination cloud
         flavors_left, distribution = self.check_if_group_fits(
             group_to_migrate, cloud)
@@ -341,16 +542,21 @@ class Cloud(object):
                 raise RuntimeError(msg)
             else:
                 self.groups.insert(0, group_to_migrate)
-                return
+                return False
+        vms_left = group_to_migrate.get_all_vms()
         for node_obj, flavors_required in distribution.items():
-            for vm_obj in group_to_migrate.get_all_vms():
+            not_migrated = []
+            for vm_obj in vms_left:
                 flavor_obj = vm_obj.flavor
                 if flavor_obj in flavors_required:
                     flavors_required[flavor_obj] -= 1
                     if flavors_required[flavor_obj] == 0:
                         del flavors_required[flavor_obj]
                     self.migrate_vm(vm_obj, node_obj)
-        return self.migrate_group(cloud, False)
+                else:
+                    not_migrated.append(vm_obj)
+            vms_left = not_migrated
+        return True
 
     def migrate_vm(self, vm_obj, target_node):
         """This method migrates vm from one cloud to another"""
@@ -361,13 +567,18 @@ class Cloud(object):
         """
         This method contains main logic of application - it processes
         migration"""
-        while self.nodes and self.groups:
-            self.condense()
-            self.transfer_nodes(cloud)
-            self.migrate_vms(cloud)
-            cloud.condense()
-            self.actions.dump_actions()
-            cloud.actions.dump_actions()
+        try:
+            while self.nodes and self.groups:
+                self.condense()
+                self.transfer_nodes(cloud)
+                self.migrate_vms(cloud)
+                cloud.condense()
+                self.actions.dump_actions()
+                cloud.actions.dump_actions()
+        finally:
+            # steps computed before failure are kept
+            self.actions.flush()
+            cloud.actions.flush()
 
     def __str__(self):
         """
@@ -51,21 +51,14 @@ class Flavor(object):
         This method returns how much vms with flavor exist on nodes that
         are not full
         """
-        return len([i for i in self.vms if (
-            not i.node.is_full and i.node.cloud == cloud)])
+        return cloud.flavor_amounts.get(self, 0)
 
     def node_distribution(self, cloud):
         """
         This method returns dict of nodes that contains this flavor
         with number of vms with flavor as value
         """
-        result = {}
-        for vm_obj in self.vms:
-            if not vm_obj.node.is_full and vm_obj.node.cloud == cloud:
-                if vm_obj.node not in result:
-                    result[vm_obj.node] = 0
-                result[vm_obj.node] += 1
-        return result
+        return dict(cloud.flavor_distribution.get(self, {}))
 
     def __repr__(self):
         return "%s [%s]" % (self.name, self.fl_id)
@@ -41,6 +41,11 @@ class Group(object):
         self.children = []
         self.parent = None
         self.vms = {}
+        # distinct vms of the whole subtree and their ram, cores
+        # they are calculated on demand and invalidated on add_vms and
+        # add_groups of this group or any group below
+        self._all_vms = None
+        self._capacity = None
 
     def add_groups(self, groups_list):
         """
@@ -49,22 +54,50 @@ class Group(object):
         self.children.extend(groups_list)
         for group in groups_list:
             group.parent = self
+        self.invalidate()
 
     def add_vms(self, vms_dict):
         """
             This method adds vms to self
         """
         self.vms.update(vms_dict)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+            This method drops cached vms and capacity of this group
+            and all groups above
+        """
+        group = self
+        while group is not None:
+            group._all_vms = None
+            group._capacity = None
+            group = group.parent
+
+    @property
+    def all_vms(self):
+        """
+            This method returns set of distinct vms of the whole subtree,
+            sets of children are reused, so set is built once per group
+        """
+        if self._all_vms is None:
+            all_vms = set(self.vms.values())
+            for child in self.children:
+                all_vms.update(child.all_vms)
+            self._all_vms = frozenset(all_vms)
+        return self._all_vms
+
+    def iter_vms(self):
+        """
+            This method iterates over distinct vms of the whole subtree
+        """
+        return iter(self.all_vms)
 
     def get_all_vms(self):
         """
             This method gets vms from all children recursively
         """
-        result = self.vms.values()
-        for child in self.children:
-            result.extend(child.get_all_vms())
-        # make list distinct
-        return list(set(result))
+        return list(self.all_vms)
 
     @property
     def capacity(self):
@@ -72,8 +105,13 @@ class Group(object):
             This method calculates number of ram, cores required by
             all vms of this group
         """
-        flavors = [vm.flavor for vm in self.get_all_vms()]
-        return sum(fl.ram for fl in flavors), sum(fl.core for fl in flavors)
+        if self._capacity is None:
+            ram, core = 0, 0
+            for vm in self.iter_vms():
+                ram += vm.flavor.ram
+                core += vm.flavor.core
+            self._capacity = ram, core
+        return self._capacity
 
     def parent_count(self, count=0):
         """
@@ -32,24 +32,47 @@ class Node(object):
         self.ram_factor = ram_factor
         self.core_factor = core_factor
         self.vms = {}
+        self.cloud = None
+        # resources used by vms and number of vms of each flavor are
+        # updated on link/unlink, so we don't need to count them every time
+        self.used_ram = 0
+        self.used_core = 0
+        self.flavors_count = {}
 
     def link_vm(self, vm_obj):
         """
             This method adds vm to dict
         """
+        if vm_obj.vm_id in self.vms:
+            self.unlink_vm(self.vms[vm_obj.vm_id])
         self.vms.update({vm_obj.vm_id: vm_obj})
+        self.used_ram += vm_obj.flavor.ram
+        self.used_core += vm_obj.flavor.core
+        self.flavors_count[vm_obj.flavor] = self.flavors_count.get(
+            vm_obj.flavor, 0) + 1
+        if self.cloud is not None:
+            self.cloud.index_node(self)
 
     def unlink_vm(self, vm_obj):
         """
             This method removes vm from dict
         """
         if vm_obj.vm_id in self.vms:
-            del self.vms[vm_obj.vm_id]
+            vm_obj = self.vms.pop(vm_obj.vm_id)
+            self.used_ram -= vm_obj.flavor.ram
+            self.used_core -= vm_obj.flavor.core
+            self.flavors_count[vm_obj.flavor] -= 1
+            if not self.flavors_count[vm_obj.flavor]:
+                del self.flavors_count[vm_obj.flavor]
+            if self.cloud is not None:
+                self.cloud.index_node(self)
 
     def get_vm_by_flavor(self, flavor):
         """
             Returns vm with flavor provided from this node
         """
+        if flavor not in self.flavors_count:
+            return
         for vm_obj in self.vms.values():
             if vm_obj.flavor == flavor:
                 return vm_obj
@@ -66,8 +89,7 @@ class Node(object):
         """
             This method returns free ram, core on Node
         """
-        return (self.ram - sum(i.flavor.ram for k, i in self.vms.items()),
-                self.core - sum(i.flavor.core for k, i in self.vms.items()))
+        return self.ram - self.used_ram, self.core - self.used_core
 
     @property
     def utilization(self):
@@ -107,6 +129,19 @@ class Node(object):
                         number of flavors that is always less than number of
                         vms
         """
+        flavors_dict, flavors_list, max_ram, max_core = self.knapsack_input(
+            flavors, accurate)
+        return self.knapsack_result(
+            flavors_dict, flavors_list, accurate,
+            algorithms.solve(accurate, flavors_list, max_ram, max_core,
+                             algorithms.solutions_cache))
+
+    def knapsack_input(self, flavors, accurate=False):
+        """
+        This method converts flavors available for this node to input of
+        knapsack algorithms: plain tuples which are cheap to send to
+        another process
+        """
         # reduce count of flavors
         # we need this step to reduce number of available flavors
         # because we have vms assigned to this node
@@ -125,22 +160,14 @@ class Node(object):
 
         flavors_dict = {}
         flavors_list = []
-        result_dict = {}
         if accurate:
             # convert data from dict to list of tuples (algorithm interface)
-            flavor_id, flavor_ram, flavor_core = range(3)
             for fl_obj, count in flavors.items():
                 flavors_dict[fl_obj.fl_id] = fl_obj
                 for i in range(count):
                     flavors_list.append(
                         (fl_obj.fl_id,
                          fl_obj.reduced_ram, fl_obj.reduced_core))
-            # convert output of algorithm to application interface (dict)
-            for i in algorithms.accurate(flavors_list, max_ram, max_core):
-                flavor = flavors_dict[i[flavor_id]]
-                if flavor not in result_dict:
-                    result_dict[flavor] = 0
-                result_dict[flavor] += 1
         else:
             # use fast algorithm
             # convert data from dict to list of tuples (algorithm interface)
@@ -154,9 +181,27 @@ class Node(object):
             # sort flavors by ram
             flavors_list = sorted(flavors_list, key=lambda a: a[flavor_ram],
                                   reverse=True)
+        return flavors_dict, flavors_list, max_ram, max_core
+
+    @staticmethod
+    def knapsack_result(flavors_dict, flavors_list, accurate, solution):
+        """
+        This method converts output of knapsack algorithm to application
+        interface (dict flavor -> count)
+        """
+        result_dict = {}
+        if accurate:
+            flavor_id, flavor_ram, flavor_core = range(3)
+            # convert output of algorithm to application interface (dict)
+            for i in solution:
+                flavor = flavors_dict[i[flavor_id]]
+                if flavor not in result_dict:
+                    result_dict[flavor] = 0
+                result_dict[flavor] += 1
+        else:
+            flavor_id, flavor_count, flavor_ram, flavor_core = range(4)
             # convert solution from list data structure to dict
-            for index, i in enumerate(algorithms.fast(
-                    flavors_list, max_ram, max_core)):
+            for index, i in enumerate(solution):
                 if i:
                     flavor = flavors_dict[flavors_list[index][flavor_id]]
                     if flavor not in result_dict:
@@ -21,8 +21,10 @@ class Vm(object):
         self.vm_id = vm_id
         self.node = None
         self.flavor = None
-        self.link_node(node)
+        # node counts resources of linked vms, so flavor should be known
+        # before vm is linked to node
         self.link_flavor(flavor)
+        self.link_node(node)
 
     def link_node(self, node):
         """
@@ -38,5 +40,9 @@ class Vm(object):
         """
             This method links Vm with given Flavor
         """
+        if self.node:
+            self.node.unlink_vm(self)
         self.flavor = flavor
         self.flavor.link_vm(self)
+        if self.node:
+            self.node.link_vm(self)
@@ -22,6 +22,9 @@ from cfglib import CONF
 
 CONNECTION = [None]
 
+# number of commands sent to database in one round trip
+BATCH_SIZE = 10000
+
 
 def redis_socket_to_kwargs(function):
     def wrapper(*args, **kwargs):
@@ -44,17 +47,59 @@ def get(key, connection):
     return connection.get(key)
 
 
+@redis_socket_to_kwargs
+def put_many(items, connection):
+    """
+    Store (key, value) pairs from dict or iterable with one round trip
+    per BATCH_SIZE pairs
+    """
+    if isinstance(items, dict):
+        items = items.iteritems()
+    pipe = connection.pipeline(transaction=False)
+    for index, (key, value) in enumerate(items, 1):
+        pipe.set(key, value)
+        if not index % BATCH_SIZE:
+            pipe.execute()
+    pipe.execute()
+
+
+@redis_socket_to_kwargs
+def get_many(keys, connection):
+    """
+    Return list of values of keys, None for missing keys, with one round
+    trip per BATCH_SIZE keys
+    """
+    keys = list(keys)
+    values = []
+    for start in xrange(0, len(keys), BATCH_SIZE):
+        values.extend(connection.mget(keys[start:start + BATCH_SIZE]))
+    return values
+
+
 @redis_socket_to_kwargs
 def delete(key, connection):
     return connection.delete(key)
 
+
 @redis_socket_to_kwargs
 def delete_batch(keys, connection):
-    pipe = connection.pipeline()
-    for key in keys:
+    pipe = connection.pipeline(transaction=False)
+    for index, key in enumerate(keys, 1):
         pipe.delete(key)
+        if not index % BATCH_SIZE:
+            pipe.execute()
     pipe.execute()
 
+
 @redis_socket_to_kwargs
 def keys(pattern, connection):
     return connection.keys(pattern)
+
+
+@redis_socket_to_kwargs
+def scan(pattern, connection):
+    """
+    Iterate over keys matching pattern without blocking database
+    the way KEYS command does
+    """
+    return connection.scan_iter(match=pattern, count=BATCH_SIZE)
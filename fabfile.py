@@ -22,6 +22,7 @@ from cloudferrylib.scheduler.scenario import Scenario
 from cloud import cloud_ferry
 from cloud import grouping
 from dry_run import chain
+from condensation import benchmark
 from condensation import process
 from condensation.scripts import nova_collector as nova_collector_module
 from make_filters import make_filters
@@ -32,9 +33,11 @@ LOG = utl.get_log(__name__)
 
 
 @task
-def migrate(name_config=None, name_instance=None, debug=False):
+def migrate(name_config=None, name_instance=None, debug=False, resume=False):
     """
         :name_config - name of config yaml-file, example 'config.yaml'
+        :resume - continue failed migration from the task after the last
+            finished one, state is taken from migrate.checkpoint_file
     """
     if debug:
         utl.configure_logging("DEBUG")
@@ -43,8 +46,11 @@ def migrate(name_config=None, name_instance=None, debug=False):
     utils.init_singletones(cfglib.CONF)
     env.key_filename = cfglib.CONF.migrate.key_filename
     cloud = cloud_ferry.CloudFerry(cfglib.CONF)
+    # fab passes arguments as strings: fab migrate:resume=False
+    resume = str(resume).lower() in ('true', '1', 'yes')
     cloud.migrate(Scenario(path_scenario=cfglib.CONF.migrate.scenario,
-                           path_tasks=cfglib.CONF.migrate.tasks_mapping))
+                           path_tasks=cfglib.CONF.migrate.tasks_mapping),
+                  resume=resume)
 
 
 @task
@@ -89,6 +95,24 @@ def condense(name_config=None, debug=False):
     process.process()
 
 
+@task
+def condense_benchmark(name_config=None, nodes='100,500,1000', flavors=5,
+                       flavor_skew=1.0, fill_ratio=0.5, group_depth=1,
+                       groups=10, seed=0):
+    """
+        :nodes - comma separated list of node counts, every count is
+            separate scale point
+    """
+    cfglib.collector_configs_plugins()
+    cfglib.init_config(name_config)
+    points = [{"nodes": int(count), "flavors": int(flavors),
+               "flavor_skew": float(flavor_skew),
+               "fill_ratio": float(fill_ratio),
+               "group_depth": int(group_depth), "groups": int(groups),
+               "seed": int(seed)} for count in nodes.split(',')]
+    benchmark.run(points)
+
+
 @task
 def nova_collector(name_config=None):
     cfglib.collector_configs_plugins()
@@ -26,7 +26,7 @@ MIGRATE_VM_PREFIX = 'migrate_vm_'
 
 def delete_relations():
     LOG.info("started deleting old VM to hypervisor relations")
-    keys = data_storage.keys(MIGRATE_VM_PREFIX + '*')
+    keys = list(data_storage.scan(MIGRATE_VM_PREFIX + '*'))
     data_storage.delete_batch(keys)
     LOG.info("Relation deleting done. %s records was removed." % len(keys))
 
@@ -36,24 +36,39 @@ def check_filter_folder(filter_folder):
         os.makedirs(filter_folder)
 
 
+def iter_steps():
+    """
+    Iterate over steps of source cloud dumped by condensation, steps are
+    read from database in batches
+    """
+    cursor = 0
+    while True:
+        keys = ["%s_source" % i for i in
+                xrange(cursor, cursor + data_storage.BATCH_SIZE)]
+        for step in data_storage.get_many(keys):
+            if step is None:
+                return
+            yield step
+        cursor += data_storage.BATCH_SIZE
+
+
 def make(filter_folder, images_date):
     delete_relations()
     check_filter_folder(filter_folder)
     LOG.info("started creating filter files and all needed resources")
+    relations = {}
     cursor = 0
-    while True:
-        step = data_storage.get("%s_source" % cursor)
-        if step is None:
-            break
+    for step in iter_steps():
         cursor += 1
         ids = []
         for migrate in json.loads(step)['migrate']:
             vm_id = migrate[0]
             ids.append(vm_id)
-            data_storage.put(MIGRATE_VM_PREFIX + vm_id, migrate[1])
+            relations[MIGRATE_VM_PREFIX + vm_id] = migrate[1]
         vm_filter = {'images': {'date': images_date},
                      'instances': {'id': ids}}
         with file("%s/filter_%s.yaml" % (filter_folder, cursor), 'w') as \
                 filter_file:
             filter_file.write(yaml.safe_dump(vm_filter))
+    data_storage.put_many(relations)
     LOG.info("Creating filter files done. %s filters was created." % cursor)
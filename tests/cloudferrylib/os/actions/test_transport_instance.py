@@ -0,0 +1,115 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.actions import transport_instance
+from cloudferrylib.utils import utils
+from tests import test
+
+
+def fake_deploy_instance(dst_cloud, info):
+    instance_id, instance = info['instances'].items()[0]
+    if instance.get('broken'):
+        raise RuntimeError("fake error")
+    return {'instances': {'new_' + instance_id: {'old_id': instance_id}}}
+
+
+class TransportInstanceTestCase(test.TestCase):
+    def setUp(self):
+        super(TransportInstanceTestCase, self).setUp()
+
+        self.fake_info = {'instances': {'vm1': {'instance': {}},
+                                        'vm2': {'instance': {}},
+                                        'vm3': {'instance': {}}}}
+
+        self.mock_patch = mock.patch.multiple(
+            transport_instance.TransportInstance,
+            deploy_instance=mock.Mock(side_effect=fake_deploy_instance),
+            _replace_user_ids=mock.Mock(side_effect=lambda instance: instance))
+        self.mock_patch.start()
+
+    def _make_action(self, workers):
+        fake_config = utils.ext_dict(
+            migrate=utils.ext_dict({'instance_workers': workers}))
+        return transport_instance.TransportInstance(
+            {'src_cloud': mock.Mock(),
+             'dst_cloud': mock.Mock(),
+             'cfg': fake_config})
+
+    def test_run_sequentially(self):
+        res = self._make_action(1).run(info=self.fake_info)
+
+        self.assertEqual({'new_vm1', 'new_vm2', 'new_vm3'},
+                         set(res['info']['instances']))
+
+    def test_run_in_pool(self):
+        res = self._make_action(2).run(info=self.fake_info)
+
+        self.assertEqual({'new_vm1', 'new_vm2', 'new_vm3'},
+                         set(res['info']['instances']))
+        self.assertEqual('vm2', res['info']['instances']['new_vm2']['old_id'])
+
+    def test_failed_instance_does_not_stop_pool(self):
+        self.fake_info['instances']['vm2']['broken'] = True
+
+        action = self._make_action(3)
+
+        self.assertRaises(RuntimeError, action.run, info=self.fake_info)
+        self.assertEqual(3, action.deploy_instance.call_count)
+
+    def test_failed_instance_stops_sequential_run(self):
+        self.fake_info['instances']['vm2']['broken'] = True
+
+        action = self._make_action(1)
+
+        self.assertRaises(RuntimeError, action.run, info=self.fake_info)
+
+    def test_prepare_ephemeral_drv_does_not_change_info(self):
+        disk = {'path_src': 'src_path', 'host_src': 'src_host'}
+        new_disk = {'path_src': 'dst_path', 'host_src': 'dst_host'}
+        info = {'instances': {'old': {'ephemeral': disk, 'diff': disk}}}
+        new_info = {'instances': {'new': {'ephemeral': new_disk,
+                                          'diff': new_disk}}}
+
+        res = self._make_action(1).prepare_ephemeral_drv(info, new_info,
+                                                         {'new': 'old'})
+
+        self.assertEqual({'path_src': 'src_path', 'host_src': 'src_host',
+                          'path_dst': 'dst_path', 'host_dst': 'dst_host'},
+                         res['instances']['new']['ephemeral'])
+        self.assertEqual({'path_src': 'dst_path', 'host_src': 'dst_host'},
+                         new_disk)
+
+    def test_deploy_instance_does_not_share_meta(self):
+        self.mock_patch.stop()
+        disk = {'path_src': 'path', 'host_src': 'host'}
+        meta = {'volume': [{'id': 'volume_id'}]}
+        info = {'instances': {'old': {'instance': {'key_name': 'key'},
+                                      'meta': meta,
+                                      'ephemeral': disk, 'diff': disk}}}
+        compute = mock.Mock()
+        dst_cloud = mock.Mock(resources={'compute': compute})
+        compute.deploy.return_value = {'new': 'old'}
+        compute.read_info.return_value = {
+            'instances': {'new': {'instance': {}, 'ephemeral': disk,
+                                  'diff': disk}}}
+
+        res = self._make_action(1).deploy_instance(dst_cloud, info)
+
+        new_meta = res['instances']['new']['meta']
+        self.assertEqual(meta, new_meta)
+        self.assertIsNot(meta['volume'], new_meta['volume'])
@@ -201,6 +201,7 @@ class KeystoneIdentityTestCase(test.TestCase):
 
         self.mock_client().tenants.list.return_value = fake_tenants_list
         self.mock_client().users.list.return_value = fake_users_list
+        self.mock_client().tenants.list_users.return_value = fake_users_list
         self.mock_client().roles.list.return_value = fake_roles_list
         self.mock_client().roles.roles_for_user.return_value = [
             self.fake_role_0]
@@ -209,6 +210,58 @@ class KeystoneIdentityTestCase(test.TestCase):
 
         self.assertEquals(fake_info, info)
 
+    def test_get_user_tenants_roles_only_members(self):
+        self.mock_client().tenants.list.return_value = [self.fake_tenant_0,
+                                                        self.fake_tenant_1]
+        self.mock_client().users.list.return_value = [self.fake_user_0,
+                                                      self.fake_user_1]
+        self.mock_client().tenants.list_users.side_effect = (
+            lambda tenant_id: [self.fake_user_0]
+            if tenant_id == self.fake_tenant_0.id else [])
+        self.mock_client().roles.roles_for_user.return_value = [
+            self.fake_role_0]
+
+        user_tenants_roles = self.keystone_client._get_user_tenants_roles()
+
+        self.assertEqual(
+            {'user_name_0': {'tenant_name_0': [
+                {'role': {'name': 'role_name_0', 'id': 'role_id_0'}}]}},
+            user_tenants_roles)
+        self.mock_client().roles.roles_for_user.assert_called_once_with(
+            self.fake_user_0.id, self.fake_tenant_0.id)
+
+    def test_get_roles_matrix_from_db(self):
+        self.mock_client().roles.list.return_value = [self.fake_role_0,
+                                                      self.fake_role_1]
+        self.fake_cloud.mysql_connector.iter_rows.return_value = [
+            ('user_id_0', 'tenant_id_0', 'role_id_0'),
+            ('user_id_0', 'tenant_id_0', 'role_id_1'),
+            ('user_id_1', 'tenant_id_1', 'unknown_role_id')]
+
+        matrix = self.keystone_client.get_roles_matrix()
+
+        self.assertEqual(
+            {('user_id_0', 'tenant_id_0'): [self.fake_role_0,
+                                            self.fake_role_1]},
+            matrix)
+        self.assertFalse(self.mock_client().roles.roles_for_user.called)
+
+    def test_get_roles_matrix_falls_back_to_api(self):
+        self.mock_client().tenants.list.return_value = [self.fake_tenant_0]
+        self.mock_client().tenants.list_users.return_value = [
+            self.fake_user_0]
+        self.mock_client().roles.roles_for_user.return_value = [
+            self.fake_role_0]
+        self.fake_cloud.mysql_connector.iter_rows.side_effect = Exception(
+            "no assignment table")
+
+        matrix = self.keystone_client.get_roles_matrix()
+
+        self.assertEqual(
+            {(self.fake_user_0.id, self.fake_tenant_0.id): [
+                self.fake_role_0]},
+            matrix)
+
     def test_deploy(self):
         fake_tenants_list = [self.fake_tenant_0, self.fake_tenant_1]
         fake_users_list = [self.fake_user_0, self.fake_user_1]
@@ -252,6 +305,33 @@ class KeystoneIdentityTestCase(test.TestCase):
         self.assertEquals(mock_calls,
                           self.mock_client().roles.add_user_role.mock_calls)
 
+    def test_get_user_passwords(self):
+        self.mock_client().users.list.return_value = [self.fake_user_0,
+                                                      self.fake_user_1]
+        self.fake_cloud.mysql_connector.iter_rows.return_value = [
+            ('user_id_0', 'hash_0'), ('user_id_1', 'hash_1'),
+            ('unknown_id', 'hash_2')]
+
+        passwords = self.keystone_client._get_user_passwords()
+
+        self.assertEqual({'user_name_0': 'hash_0', 'user_name_1': 'hash_1'},
+                         passwords)
+        self.fake_cloud.mysql_connector.iter_rows.assert_called_once_with(
+            "SELECT id, password FROM user")
+
+    def test_upload_user_passwords(self):
+        users = [{'user': {'name': 'user_name_0'},
+                  'meta': {'new_id': 'new_id_0', 'overwrite_password': True}},
+                 {'user': {'name': 'user_name_1'},
+                  'meta': {'new_id': 'new_id_1', 'overwrite_password': False}}]
+
+        self.keystone_client._upload_user_passwords(
+            users, {'user_name_0': 'hash_0', 'user_name_1': 'hash_1'})
+
+        self.fake_cloud.mysql_connector.execute_many.assert_called_once_with(
+            "UPDATE user SET password = :password WHERE id = :user_id",
+            [{'user_id': 'new_id_0', 'password': 'hash_0'}])
+
     @staticmethod
     def _get_fake_info(fake_tenants_list, fake_users_list, fake_roles_list):
         fake_user_tenants_roles = {}
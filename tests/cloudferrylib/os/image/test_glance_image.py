@@ -30,6 +30,8 @@ FAKE_CONFIG = utils.ext_dict(cloud=utils.ext_dict({'user': 'fake_user',
                                                    }),
                              migrate=utils.ext_dict({'speed_limit': '10MB',
                                                      'all_images': True,
+                                                     'image_transfer_workers':
+                                                         1,
                                                      'retry': '7',
                                                      'time_wait': 5}))
 
@@ -230,3 +232,53 @@ class GlanceImageTestCase(test.TestCase):
 
         info = self.glance_image.read_info()
         self.assertEqual(self.fake_result_info, info)
+
+    def test_deploy_lists_images_once(self):
+        fake_tenant = mock.Mock()
+        fake_tenant.name = 'fake_tenant_name'
+        fake_tenant.id = 'dst_tenant_id'
+        self.identity_mock.get_tenants_list.return_value = [fake_tenant]
+        self.glance_image.get_tags = mock.Mock(return_value={})
+        self.glance_image.get_members = mock.Mock(return_value={})
+        new_image = mock.Mock(id='new_image_id', checksum='fake_shecksum_2',
+                              container_format='bare', disk_format='qcow2',
+                              status='active')
+        new_image.name = 'fake_image_name_2'
+        dst_images = [self.fake_image_1]
+
+        def image_create(**kwargs):
+            dst_images.append(new_image)
+            return new_image
+
+        self.glance_mock_client().images.create.side_effect = image_create
+        self.glance_mock_client().images.list.return_value = dst_images
+        image_2 = dict(self.fake_result_info['images']['fake_image_id_1'],
+                       image=dict(
+                           self.fake_result_info['images'][
+                               'fake_image_id_1']['image'],
+                           id='fake_image_id_2',
+                           name='fake_image_name_2',
+                           checksum='fake_shecksum_2'))
+        info = {'images': {
+            'fake_image_id_1': self.fake_result_info['images'][
+                'fake_image_id_1'],
+            'fake_image_id_2': image_2},
+            'members': {'fake_image_id_2': {'fake_tenant_name': False}}}
+
+        with mock.patch.object(self.glance_image, 'convert',
+                               side_effect=lambda image, cloud: {}), \
+                mock.patch('cloudferrylib.utils.file_like_proxy.'
+                           'FileLikeProxy'):
+            self.glance_image.deploy(info)
+
+        self.glance_mock_client().images.create.assert_called_once_with(
+            name='fake_image_name_2', container_format='bare',
+            disk_format='qcow2', is_public=True, protected=False,
+            owner='dst_tenant_id', size=1024, properties={},
+            data=mock.ANY)
+        self.glance_mock_client().image_members.create.assert_called_once_with(
+            'new_image_id', 'dst_tenant_id', False)
+        self.assertFalse(self.identity_mock.get_tenant_id_by_name.called)
+        # once for the index and once to read info about deployed images
+        self.assertEqual(
+            2, self.glance_mock_client().images.list.call_count)
@@ -598,3 +598,61 @@ class NeutronTestCase(test.TestCase):
         self.neutron_mock_client().add_interface_router.\
             assert_called_once_with('fake_router_id_2',
                                     {'subnet_id': 'fake_subnet_id_2'})
+
+    def test_get_mac_by_ip_lists_ports_once(self):
+        self.neutron_mock_client().list_ports.return_value = {
+            'ports': [{'id': 'fake_port_id_1',
+                       'network_id': 'fake_network_id_1',
+                       'mac_address': 'fake_mac_1',
+                       'fixed_ips': [{'ip_address': 'fake_ip_1'}]},
+                      {'id': 'fake_port_id_2',
+                       'network_id': 'fake_network_id_1',
+                       'mac_address': 'fake_mac_2',
+                       'fixed_ips': [{'ip_address': 'fake_ip_2'}]}]}
+
+        self.assertEqual('fake_mac_1',
+                         self.neutron_network_client.get_mac_by_ip(
+                             'fake_ip_1'))
+        self.assertEqual('fake_mac_2',
+                         self.neutron_network_client.get_mac_by_ip(
+                             'fake_ip_2'))
+        self.assertIsNone(
+            self.neutron_network_client.get_mac_by_ip('fake_ip_3'))
+        self.assertEqual(1, self.neutron_mock_client().list_ports.call_count)
+
+    def test_check_existing_port_sees_created_port(self):
+        self.neutron_mock_client().list_ports.return_value = {'ports': []}
+        self.neutron_mock_client().create_port.return_value = {
+            'port': {'id': 'fake_port_id_1',
+                     'network_id': 'fake_network_id_1',
+                     'mac_address': 'fake_mac_1',
+                     'fixed_ips': [{'ip_address': 'fake_ip_1'}]}}
+
+        self.assertIsNone(self.neutron_network_client.check_existing_port(
+            'fake_network_id_1', 'fake_mac_1'))
+        self.neutron_network_client.create_port('fake_network_id_1',
+                                                'fake_mac_1', 'fake_ip_1',
+                                                'fake_tenant_id_1', True)
+
+        self.assertEqual('fake_port_id_1',
+                         self.neutron_network_client.check_existing_port(
+                             'fake_network_id_1', 'fake_mac_1'))
+        self.assertEqual(1, self.neutron_mock_client().list_ports.call_count)
+
+    def test_get_network_by_ip(self):
+        net = {'id': 'fake_network_id_1', 'name': 'fake_network_name_1'}
+        self.neutron_mock_client().list_networks.return_value = {
+            'networks': [net]}
+        self.neutron_mock_client().list_subnets.return_value = {
+            'subnets': [{'tenant_id': 'fake_tenant_id_1',
+                         'cidr': '10.0.0.0/24',
+                         'network_id': 'fake_network_id_1'}]}
+
+        for _ in range(2):
+            self.assertEqual(net, self.neutron_network_client.get_network(
+                {'ip': '10.0.0.5'}, 'fake_tenant_id_1', keep_ip=True))
+
+        self.assertEqual(1,
+                         self.neutron_mock_client().list_networks.call_count)
+        self.assertEqual(1,
+                         self.neutron_mock_client().list_subnets.call_count)
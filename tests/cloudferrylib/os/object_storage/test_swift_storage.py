@@ -0,0 +1,167 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+
+import mock
+
+from cloudferrylib.os.object_storage import swift_storage
+from cloudferrylib.utils import utils
+from tests import test
+
+
+def fake_config(stream_copy=False, workers=1, listing_limit=100):
+    return utils.ext_dict(
+        cloud=utils.ext_dict(),
+        migrate=utils.ext_dict({'swift_stream_copy': stream_copy,
+                                'swift_workers': workers,
+                                'swift_chunk_size': 4,
+                                'swift_listing_limit': listing_limit}))
+
+
+def fake_object(name, obj_hash='hash'):
+    return {'name': name, 'hash': obj_hash, 'bytes': 4,
+            'content_type': 'text/plain'}
+
+
+def fake_listing(objects):
+    """get_container returning objects on the first page only"""
+    return mock.Mock(side_effect=lambda container, marker, limit: (
+        {}, [] if marker else objects))
+
+
+class SwiftStorageTestCase(test.TestCase):
+    def setUp(self):
+        super(SwiftStorageTestCase, self).setUp()
+        patcher = mock.patch.object(swift_storage.SwiftStorage,
+                                    'get_swift_conn',
+                                    return_value=('fake_url', 'fake_token'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _make_storage(self, **kwargs):
+        storage = swift_storage.SwiftStorage(fake_config(**kwargs),
+                                             mock.Mock())
+        storage.put_container = mock.Mock()
+        storage.put_object = mock.Mock()
+        return storage
+
+    def test_iter_objects_uses_marker(self):
+        storage = self._make_storage(listing_limit=2)
+        pages = {None: [fake_object('a'), fake_object('b')],
+                 'b': [fake_object('c'), fake_object('d')],
+                 'd': []}
+        storage.get_container = mock.Mock(
+            side_effect=lambda container, marker, limit: ({}, pages[marker]))
+
+        names = [obj['name'] for obj in storage.iter_objects('container')]
+
+        self.assertEqual(['a', 'b', 'c', 'd'], names)
+        self.assertEqual(3, storage.get_container.call_count)
+
+    def test_iter_objects_server_limit_is_lower(self):
+        storage = self._make_storage(listing_limit=3)
+        pages = {None: [fake_object('a'), fake_object('b')],
+                 'b': [fake_object('c')],
+                 'c': []}
+        storage.get_container = mock.Mock(
+            side_effect=lambda container, marker, limit: ({}, pages[marker]))
+
+        names = [obj['name'] for obj in storage.iter_objects('container')]
+
+        self.assertEqual(['a', 'b', 'c'], names)
+
+    def test_read_info_stream_copy_skips_data(self):
+        storage = self._make_storage(stream_copy=True)
+        storage.get_account_info = mock.Mock(
+            return_value=({}, [{'name': 'container'}]))
+        storage.get_container = fake_listing([fake_object('a')])
+        storage.get_object = mock.Mock()
+
+        info = storage.read_info()
+
+        container = info[utils.OBJSTORAGE_RESOURCE][utils.CONTAINERS][0]
+        self.assertNotIn('data', container['objects'][0])
+        self.assertFalse(storage.get_object.called)
+
+    def _deploy(self, storage, objects, dst_objects):
+        storage.get_container = fake_listing(dst_objects)
+        src_storage = mock.Mock()
+        src_storage.get_object.side_effect = (
+            lambda container, name, resp_chunk_size: ({}, iter([name])))
+        info = {utils.OBJSTORAGE_RESOURCE: {utils.CONTAINERS: [
+            {'name': 'container', 'objects': objects}]}}
+        storage.deploy(info, src_objstorage=src_storage)
+        return src_storage
+
+    def test_deploy_streams_objects(self):
+        storage = self._make_storage(workers=3)
+
+        self._deploy(storage, [fake_object('a'), fake_object('b'),
+                               fake_object('c')], [])
+
+        uploaded = {call[1]['obj_name']: call[1]['content'].read()
+                    for call in storage.put_object.call_args_list}
+        self.assertEqual({'a': 'a', 'b': 'b', 'c': 'c'}, uploaded)
+
+    def test_deploy_raises_if_object_failed(self):
+        storage = self._make_storage(workers=3)
+        storage.put_object.side_effect = (
+            lambda obj_name, **kwargs: obj_name == 'b' and 1 / 0)
+
+        self.assertRaises(RuntimeError, self._deploy, storage,
+                          [fake_object('a'), fake_object('b'),
+                           fake_object('c')], [])
+        self.assertEqual(3, storage.put_object.call_count)
+
+    @mock.patch.object(swift_storage.swift_client, 'http_connection')
+    def test_streamed_object_is_uploaded_by_swiftclient(self, connection):
+        conn = mock.Mock()
+        conn.getresponse.return_value.status = 201
+        connection.return_value = (mock.Mock(path='/v1'), conn)
+        storage = swift_storage.SwiftStorage(fake_config(), mock.Mock())
+        src_storage = mock.Mock()
+        src_storage.get_object.return_value = ({}, iter(['da', 'ta']))
+
+        storage.copy_object('container', fake_object('a'), src_storage)
+
+        data = conn.putrequest.call_args[1]['data']
+        self.assertEqual('data', data.read(65536))
+
+    def test_deploy_skips_objects_with_same_etag(self):
+        storage = self._make_storage()
+
+        src_storage = self._deploy(
+            storage, [fake_object('a', 'hash_a'), fake_object('b', 'hash_b')],
+            [fake_object('a', 'hash_a'), fake_object('b', 'old_hash')])
+
+        src_storage.get_object.assert_called_once_with(
+            'container', 'b', resp_chunk_size=4)
+        self.assertEqual(1, storage.put_object.call_count)
+
+
+class IterReaderTestCase(test.TestCase):
+    def test_read_by_size(self):
+        reader = swift_storage.IterReader(iter(['abc', 'de', 'f']))
+
+        self.assertEqual('ab', reader.read(2))
+        self.assertEqual('cde', reader.read(3))
+        self.assertEqual('f', reader.read(3))
+        self.assertEqual('', reader.read(3))
+
+    def test_read_all(self):
+        reader = swift_storage.IterReader(iter(['abc', 'de']))
+
+        self.assertEqual('abcde', reader.read())
@@ -0,0 +1,55 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from cloudferrylib.utils import cow
+from tests import test
+
+
+class EvolveTestCase(test.TestCase):
+    def setUp(self):
+        super(EvolveTestCase, self).setUp()
+        self.data = {'instances': {'vm1': {'instance': {'name': 'a'},
+                                           'meta': {}},
+                                   'vm2': {'instance': {'name': 'b'},
+                                           'meta': {}}},
+                     'nics': [{'ip': '10.0.0.1'}]}
+
+    def test_data_is_not_changed(self):
+        new = cow.evolve(self.data, {('instances', 'vm1', 'instance',
+                                      'name'): 'c'})
+
+        self.assertEqual('c', new['instances']['vm1']['instance']['name'])
+        self.assertEqual('a',
+                         self.data['instances']['vm1']['instance']['name'])
+
+    def test_untouched_values_are_shared(self):
+        new = cow.evolve(self.data, {('instances', 'vm1', 'meta', 'id'): 1,
+                                     ('nics', 0, 'ip'): '10.0.0.2'})
+
+        self.assertIs(self.data['instances']['vm2'], new['instances']['vm2'])
+        self.assertIs(self.data['instances']['vm1']['instance'],
+                      new['instances']['vm1']['instance'])
+        self.assertEqual({'id': 1}, new['instances']['vm1']['meta'])
+        self.assertEqual('10.0.0.1', self.data['nics'][0]['ip'])
+        self.assertEqual('10.0.0.2', new['nics'][0]['ip'])
+
+    def test_containers_are_copied_once(self):
+        new = cow.evolve(self.data, {('instances', 'vm1', 'meta'): 1,
+                                     ('instances', 'vm2', 'meta'): 2})
+
+        self.assertEqual(1, new['instances']['vm1']['meta'])
+        self.assertEqual(2, new['instances']['vm2']['meta'])
+        self.assertEqual({}, self.data['instances']['vm2']['meta'])
@@ -0,0 +1,98 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+
+import mock
+
+from cloudferrylib.utils import file_like_proxy
+from tests import test
+
+
+class TokenBucketTestCase(test.TestCase):
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.now = [100.0]
+        self.slept = []
+
+        def fake_sleep(seconds):
+            self.slept.append(seconds)
+            self.now[0] += seconds
+
+        for name, fake in (('time', lambda: self.now[0]),
+                           ('sleep', fake_sleep)):
+            patcher = mock.patch.object(file_like_proxy.time, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_parse_speed_limit(self):
+        self.assertEqual(10 * 1024 * 1024,
+                         file_like_proxy.parse_speed_limit('10MB'))
+        self.assertEqual(0, file_like_proxy.parse_speed_limit('-'))
+
+    def test_streams_share_rate(self):
+        bucket = file_like_proxy.TokenBucket(100, capacity=100)
+
+        # two streams read 300 bytes each, 100 bytes are available at once
+        for _ in range(3):
+            bucket.consume(100)
+            bucket.consume(100)
+
+        self.assertAlmostEqual(5.0, self.now[0] - 100.0)
+        self.assertEqual(600, bucket.consumed)
+
+    def test_no_limit(self):
+        bucket = file_like_proxy.TokenBucket(0)
+
+        bucket.consume(10 ** 9)
+
+        self.assertEqual([], self.slept)
+        self.assertEqual(10 ** 9, bucket.consumed)
+
+    def _read_by_proxy(self, callback):
+        resp = mock.Mock(length=100)
+        resp.read.return_value = 'x' * 50
+        transfer_object = {'resource': mock.Mock(), 'id': 'fake_id',
+                           'name': 'fake_name', 'size': 100}
+        transfer_object['resource'].get_ref_image.return_value = resp
+        limiter = file_like_proxy.TokenBucket(0)
+        proxy = file_like_proxy.FileLikeProxy(transfer_object, callback, '-',
+                                              limiter=limiter)
+
+        self.now[0] += 1
+        proxy.read(50)
+
+    def test_proxy_reports_speed(self):
+        calls = []
+
+        def callback(*args, **kwargs):
+            calls.append((args, kwargs))
+
+        self._read_by_proxy(callback)
+
+        self.assertEqual(
+            [((50, 100, 'fake_id', 'fake_name'),
+              {'speed': 50, 'total_speed': 50})],
+            calls)
+
+    def test_proxy_calls_old_callback(self):
+        calls = []
+
+        def callback(size, length, obj_id, name):
+            calls.append((size, length, obj_id, name))
+
+        self._read_by_proxy(callback)
+
+        self.assertEqual([(50, 100, 'fake_id', 'fake_name')], calls)
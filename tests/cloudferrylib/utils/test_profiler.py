@@ -0,0 +1,160 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+import mock
+
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.utils import profiler
+from cloudferrylib.utils import utils
+from tests import test
+
+
+class FakeTask(task.Task):
+    def __init__(self, fail=False):
+        super(FakeTask, self).__init__()
+        self.fail = fail
+
+    def run(self, **kwargs):
+        if self.fail is True:
+            raise RuntimeError("fake error")
+        return {'result': self.step()}
+
+    @utils.log_step(mock.Mock())
+    def step(self):
+        if self.fail == 'step':
+            raise RuntimeError("fake step error")
+        return 1
+
+
+class ProfilerTestCase(test.TestCase):
+    def setUp(self):
+        super(ProfilerTestCase, self).setUp()
+        self.profiler = profiler.Profiler()
+        utils.stack_call_functions.addListener(self.profiler)
+        self.addCleanup(utils.stack_call_functions.removeListenerLast)
+
+    def _start(self, *tasks):
+        s = scheduler.Scheduler(migration=list(tasks),
+                                profiler=self.profiler)
+        s.start()
+        return s
+
+    def test_tasks_and_steps_are_recorded(self):
+        self._start(FakeTask(), FakeTask())
+
+        tasks = [e for e in self.profiler.events
+                 if e['cat'] == profiler.TASK]
+        steps = [e for e in self.profiler.events
+                 if e['cat'] == profiler.STEP]
+        self.assertEqual(2, len(tasks))
+        self.assertEqual(['step', 'step'], [e['name'] for e in steps])
+        self.assertEqual(profiler.OK, tasks[0]['args']['status'])
+        self.assertIn('cpu_time', tasks[0]['args'])
+        self.assertTrue(tasks[1]['args']['namespace_size'] > 0)
+        # step is nested in its task
+        self.assertTrue(tasks[0]['ts'] <= steps[0]['ts'])
+        self.assertTrue(steps[0]['ts'] + steps[0]['dur'] <=
+                        tasks[0]['ts'] + tasks[0]['dur'])
+
+    def test_failed_task_is_recorded(self):
+        s = self._start(FakeTask(fail=True))
+
+        self.assertEqual(scheduler.ERROR, s.status_error)
+        self.assertEqual(profiler.ERROR,
+                         self.profiler.events[0]['args']['status'])
+        self.assertIn('BaseTask|FakeTask', self.profiler.summary())
+
+    def test_dump_trace(self):
+        self._start(FakeTask())
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        self.profiler.dump_trace(path)
+
+        with open(path) as trace_file:
+            trace = json.load(trace_file)
+        self.assertEqual(['step', 'BaseTask|FakeTask'],
+                         [e['name'] for e in trace['traceEvents']])
+        self.assertEqual('X', trace['traceEvents'][0]['ph'])
+
+    def test_failed_step_is_recorded(self):
+        self._start(FakeTask(fail='step'))
+
+        step = [e for e in self.profiler.events
+                if e['cat'] == profiler.STEP][0]
+        self.assertEqual(profiler.ERROR, step['args']['status'])
+
+    def test_stack_of_steps_is_per_thread(self):
+        utils.stack_call_functions.append('main_step', (), {})
+        self.addCleanup(utils.stack_call_functions.pop, None)
+        depths = []
+
+        thread = threading.Thread(target=lambda: depths.append(
+            utils.stack_call_functions.depth()))
+        thread.start()
+        thread.join()
+
+        self.assertEqual([0], depths)
+
+    def test_cpu_time_of_other_thread_is_not_counted(self):
+        def burn():
+            end = time.time() + 0.3
+            while time.time() < end:
+                pass
+
+        start = profiler.cpu_time()
+        thread = threading.Thread(target=burn)
+        thread.start()
+        thread.join()
+
+        self.assertTrue(profiler.cpu_time() - start < 0.2)
+
+    def test_process_pool_events_are_merged(self):
+        first, last = FakeTask(), FakeTask()
+        first & FakeTask() & FakeTask()
+        first >> last
+        s = scheduler.Scheduler(migration=cursor.Cursor(first),
+                                profiler=self.profiler, workers=2,
+                                pool_type=scheduler.PROCESS_POOL)
+        s.start()
+
+        tasks = [e for e in self.profiler.events
+                 if e['cat'] == profiler.TASK]
+        self.assertEqual(4, len(tasks))
+        # branches are recorded in workers
+        self.assertTrue(len(set(e['pid'] for e in tasks)) > 1)
+
+    def test_thread_task_events_are_merged(self):
+        first = FakeTask()
+        thread_task = thread_tasks.WrapThreadTask(FakeTask())
+        first & thread_task
+        first >> thread_tasks.WaitThreadTask(thread_task)
+        s = scheduler.Scheduler(migration=cursor.Cursor(first),
+                                profiler=self.profiler)
+        s.start()
+
+        pids = set(e['pid'] for e in self.profiler.events)
+        self.assertEqual(2, len(pids))
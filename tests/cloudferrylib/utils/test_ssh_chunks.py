@@ -0,0 +1,133 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import shutil
+import tempfile
+
+import mock
+
+from cloudferrylib.utils.drivers import ssh_chunks
+from tests import test
+
+
+FAKE_DATA = {'host_src': 'src_host',
+             'path_src': '/dev/src_volume',
+             'host_dst': 'dst_host',
+             'path_dst': '/dev/dst_volume'}
+
+
+class ChunksManifestTestCase(test.TestCase):
+    def setUp(self):
+        super(ChunksManifestTestCase, self).setUp()
+        self.manifest_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.manifest_dir)
+
+    def test_done_chunks_are_restored(self):
+        manifest = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             100, 5)
+        manifest.mark_done(0, 'md5_0')
+        manifest.mark_done(3, 'md5_3')
+
+        restored = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             100, 5)
+
+        self.assertTrue(restored.is_done(0))
+        self.assertTrue(restored.is_done(3))
+        self.assertFalse(restored.is_done(1))
+
+    def test_other_chunk_size_is_not_restored(self):
+        manifest = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             100, 5)
+        manifest.mark_done(0, 'md5_0')
+
+        restored = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             200, 3)
+
+        self.assertFalse(restored.is_done(0))
+
+    def test_remove(self):
+        manifest = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             100, 5)
+        manifest.mark_done(0, 'md5_0')
+        manifest.remove()
+
+        restored = ssh_chunks.ChunksManifest(self.manifest_dir, FAKE_DATA,
+                                             100, 5)
+
+        self.assertFalse(restored.is_done(0))
+
+
+class ChunkPositionTestCase(test.TestCase):
+    def test_chunk_position(self):
+        position = ssh_chunks.SSHChunksTransfer._chunk_position
+
+        self.assertEqual((0, 100), position(0, 100, 3, 50))
+        self.assertEqual((100, 100), position(1, 100, 3, 50))
+        self.assertEqual((200, 50), position(2, 100, 3, 50))
+        self.assertEqual((200, 100), position(2, 100, 3, 0))
+
+
+class FakeOutput(str):
+    failed = False
+
+
+class TransferChunkTestCase(test.TestCase):
+    def setUp(self):
+        super(TransferChunkTestCase, self).setUp()
+        self.transfer = ssh_chunks.SSHChunksTransfer.__new__(
+            ssh_chunks.SSHChunksTransfer)
+        self.params = {'host_dst': 'dst_host',
+                       'path_src': '/dev/src_volume',
+                       'path_dst': '/dev/dst_volume',
+                       'ssh_user_dst': 'user',
+                       'ssh_sudo_pass_dst': 'secret',
+                       'src_temp_dir': '/src_tmp/',
+                       'dst_temp_dir': '/dst_tmp/',
+                       'attempts_count': 1,
+                       'part_size': 100,
+                       'part_count': 20,
+                       'part_modulo': 0,
+                       'manifest': mock.Mock()}
+        patcher = mock.patch.object(ssh_chunks.ssh_util.connection_manager,
+                                    'nested_ssh_cmd',
+                                    side_effect=lambda host, cmd: cmd)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.object(ssh_chunks, 'run',
+                       return_value=FakeOutput('md5 lv_part_1'))
+    def test_removes_only_own_chunk(self, run):
+        self.assertTrue(self.transfer._transfer_chunk(1, self.params))
+
+        commands = [call[0][0] for call in run.call_args_list]
+        self.assertIn('rm -f /src_tmp/lv_part_1 /src_tmp/lv_part_1.gz',
+                      commands)
+        self.assertIn('rm -f /dst_tmp/lv_part_1 /dst_tmp/lv_part_1.gz',
+                      commands)
+
+    @mock.patch.object(ssh_chunks, 'run',
+                       return_value=FakeOutput('md5 lv_part_1'))
+    def test_password_command_is_quiet(self, run):
+        self.transfer._transfer_chunk(1, self.params)
+
+        quiet_commands = [call[0][0] for call in run.call_args_list
+                          if call[1].get('quiet')]
+        self.assertEqual(1, len(quiet_commands))
+        self.assertIn('secret', quiet_commands[0])
+
+    @mock.patch.object(ssh_chunks, 'run', side_effect=SystemExit(1))
+    def test_abort_fails_only_chunk(self, _):
+        self.assertFalse(self.transfer._safe_transfer_chunk(1, self.params))
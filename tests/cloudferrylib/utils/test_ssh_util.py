@@ -0,0 +1,97 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.utils import ssh_util
+from tests import test
+
+
+class SshConnectionManagerTestCase(test.TestCase):
+    def setUp(self):
+        super(SshConnectionManagerTestCase, self).setUp()
+
+        self.fake_connection = mock.Mock()
+        self.fake_connections = {'root@host1': self.fake_connection}
+        mock.patch('cloudferrylib.utils.ssh_util.connections',
+                   self.fake_connections).start()
+        self.mock_settings = mock.patch(
+            'cloudferrylib.utils.ssh_util.settings').start()
+        self.mock_time = mock.patch(
+            'cloudferrylib.utils.ssh_util.time.time').start()
+        self.mock_time.return_value = 0
+
+        self.manager = ssh_util.SshConnectionManager(max_per_host=2,
+                                                     idle_timeout=10)
+
+    def test_connection_settings(self):
+        with self.manager.connection('host1', 'root'):
+            pass
+
+        self.mock_settings.assert_called_once_with(host_string='host1',
+                                                   user='root')
+
+    def test_idle_connection_is_closed(self):
+        with self.manager.connection('host1', 'root'):
+            pass
+
+        self.mock_time.return_value = 20
+        self.manager.evict_idle()
+
+        self.fake_connection.close.assert_called_once_with()
+        self.assertNotIn('root@host1', self.fake_connections)
+
+    def test_recently_used_connection_is_kept(self):
+        with self.manager.connection('host1', 'root'):
+            pass
+
+        self.mock_time.return_value = 5
+        self.manager.evict_idle()
+
+        self.assertFalse(self.fake_connection.close.called)
+
+    def test_busy_connection_is_kept(self):
+        with self.manager.connection('host1', 'root'):
+            pass
+        with self.manager.connection('host1', 'root', gateway='gw'):
+            self.mock_time.return_value = 20
+            self.manager.evict_idle()
+
+        self.assertFalse(self.fake_connection.close.called)
+
+    def test_commands_per_host_limit(self):
+        semaphore = self.manager._semaphore(('root', 'host1', None))
+
+        with self.manager.connection('host1', 'root'):
+            with self.manager.connection('host1', 'root'):
+                self.assertFalse(semaphore.acquire(False))
+        self.assertTrue(semaphore.acquire(False))
+
+    def test_configure_resizes_limit(self):
+        self.manager._semaphore(('root', 'host1', None))
+
+        self.manager.configure(1, 10)
+
+        with self.manager.connection('host1', 'root'):
+            semaphore = self.manager._semaphore(('root', 'host1', None))
+            self.assertFalse(semaphore.acquire(False))
+
+    def test_nested_ssh_cmd(self):
+        cmd = str(self.manager.nested_ssh_cmd('host2', 'ls'))
+
+        self.assertIn('-oControlMaster=auto', cmd)
+        self.assertIn('-oControlPersist=10', cmd)
+        self.assertTrue(cmd.endswith("host2 'ls'"))
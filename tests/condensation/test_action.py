@@ -50,3 +50,24 @@ class ActionTest(test.TestCase):
         initial_length = len(a.data[action.CONDENSE])
         a.add_condensation_action(vm, source_node, target_node)
         self.assertEqual(initial_length + 1, len(a.data[action.CONDENSE]))
+
+    @mock.patch("condensation.action.data_storage")
+    def test_flush(self, storage):
+        a = action.Actions("test")
+        a.dump_actions()
+        a.dump_actions()
+        self.assertFalse(storage.put_many.called)
+        a.flush()
+        storage.put_many.assert_called_once_with(
+            [("0_test", mock.ANY), ("1_test", mock.ANY)])
+        self.assertEqual([], a.dumped)
+
+    @mock.patch("condensation.action.data_storage")
+    def test_flush_every_steps(self, storage):
+        a = action.Actions("test")
+        for _ in range(action.FLUSH_STEPS + 1):
+            a.dump_actions()
+        self.assertEqual(1, storage.put_many.call_count)
+        self.assertEqual(action.FLUSH_STEPS,
+                         len(storage.put_many.call_args[0][0]))
+        self.assertEqual(1, len(a.dumped))
@@ -0,0 +1,69 @@
+import random
+
+from tests import test
+from condensation import algorithms
+
+
+class AlgorithmsParityTest(test.TestCase):
+    """numpy versions of algorithms should return the same solutions as
+    pure python ones"""
+
+    def setUp(self):
+        super(AlgorithmsParityTest, self).setUp()
+        if algorithms.numpy is None:
+            self.skipTest("numpy is not installed")
+        self.random = random.Random(42)
+
+    def _random_flavors(self, count, max_ram, max_core):
+        return [("fl%d" % i,
+                 self.random.randint(1, 5),
+                 self.random.randint(0, max_ram),
+                 self.random.randint(0, max_core)) for i in range(count)]
+
+    def test_accurate(self):
+        for _ in range(50):
+            max_ram = self.random.randint(0, 12)
+            max_core = self.random.randint(0, 8)
+            flavors_list = [fl[:1] + fl[2:] for fl in self._random_flavors(
+                self.random.randint(0, 10), max_ram + 2, max_core + 2)]
+            self.assertEqual(
+                algorithms.accurate_python(flavors_list, max_ram, max_core),
+                algorithms.accurate_numpy(flavors_list, max_ram, max_core))
+
+    def test_fast(self):
+        for _ in range(50):
+            max_ram = self.random.randint(0, 12)
+            max_core = self.random.randint(0, 8)
+            flavors_list = self._random_flavors(
+                self.random.randint(0, 5), max_ram + 2, max_core + 2)
+            self.assertEqual(
+                algorithms.fast_python(flavors_list, max_ram, max_core),
+                algorithms.fast_numpy(flavors_list, max_ram, max_core))
+
+    def test_numpy_is_default(self):
+        self.assertIs(algorithms.accurate_numpy, algorithms.accurate)
+        self.assertIs(algorithms.fast_numpy, algorithms.fast)
+
+
+class SolutionsCacheTest(test.TestCase):
+
+    def test_solution_is_reused_for_other_order(self):
+        cache = algorithms.SolutionsCache()
+        flavors_list = [("small", 3, 1, 1), ("big", 1, 2, 2)]
+        solution = algorithms.solve(False, flavors_list, 4, 4, cache)
+
+        cached = algorithms.solve(False, flavors_list[::-1], 4, 4, cache)
+
+        self.assertEqual(solution[::-1], cached)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertEqual(50., cache.hit_rate)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = algorithms.SolutionsCache(size=2)
+        flavors_list = [("small", 1, 1)]
+        for max_ram in (1, 2, 1, 3):
+            algorithms.solve(True, flavors_list, max_ram, 1, cache)
+
+        self.assertEqual(1, cache.hits)
+        self.assertIsNotNone(cache.get(True, flavors_list, 1, 1))
+        self.assertIsNone(cache.get(True, flavors_list, 2, 1))
@@ -0,0 +1,43 @@
+from tests import test
+import mock
+
+from condensation import benchmark
+
+
+class BenchmarkTest(test.TestCase):
+
+    def test_generate_state(self):
+        nodes, flavors, vms, groups = benchmark.generate_state(
+            nodes=4, flavors=3, fill_ratio=0.5, group_depth=2, groups=2)
+        self.assertEqual(4, len(nodes))
+        self.assertEqual(3, len(flavors))
+        for node_name in nodes:
+            ram = sum(flavors[vm["flavor"]]["ram"] for vm in vms.values()
+                      if vm["host"] == node_name)
+            self.assertTrue(ram <= benchmark.NODE_RAM / 2)
+        grouped = []
+        for group in groups.values():
+            self.assertEqual(2, len(group))
+            for subgroup in group.values():
+                grouped.extend(subgroup)
+        self.assertEqual(sorted(vms), sorted(grouped))
+
+    def test_generate_state_is_deterministic(self):
+        self.assertEqual(benchmark.generate_state(nodes=3, seed=1),
+                         benchmark.generate_state(nodes=3, seed=1))
+
+    def test_run_point(self):
+        conf = mock.Mock(core_reduction_coef=1, ram_reduction_coef=1,
+                         precision=85, workers=1, cache_size=16,
+                         max_iterations=0, time_limit=0)
+        with mock.patch("condensation.cloud.CONF") as cloud_conf, \
+                mock.patch("condensation.node.CONF") as node_conf, \
+                mock.patch("condensation.action.data_storage") as storage:
+            cloud_conf.condense = conf
+            node_conf.condense = conf
+            result = benchmark.run_point({"nodes": 6, "fill_ratio": 0.2})
+        self.assertIsNone(result["error"])
+        self.assertTrue(result["knapsack_calls"] > 0)
+        self.assertTrue(result["peak_rss_kb"] > 0)
+        self.assertTrue(result["dumped_bytes"] > 0)
+        self.assertFalse(storage.put.called)
@@ -1,5 +1,10 @@
+import multiprocessing
+
 from tests import test
 from condensation import cloud
+from condensation import flavor
+from condensation import node
+from condensation import vm
 import mock
 
 
@@ -10,3 +15,152 @@ class CloudTest(test.TestCase):
         c = cloud.Cloud("test")
         c.add_nodes(test_dict)
         self.assertEqual(c.nodes, test_dict)
+
+    @mock.patch('condensation.node.CONF')
+    def test_flavor_distribution_index(self, conf):
+        conf.condense = mock.Mock(core_reduction_coef=1,
+                                  ram_reduction_coef=1, precision=85)
+        fl = flavor.Flavor("1", "small", 1, 1)
+        nodes = {name: node.Node(name, 4, 4, 1, 1, 1, 1)
+                 for name in (u"node1", u"node2")}
+        c = cloud.Cloud("test", nodes)
+        vms = [vm.Vm(nodes["node1"], str(i), fl) for i in range(2)]
+        self.assertEqual({nodes["node1"]: 2}, fl.node_distribution(c))
+        self.assertEqual(2, fl.amount(c))
+
+        vms[0].link_node(nodes["node2"])
+        self.assertEqual({nodes["node1"]: 1, nodes["node2"]: 1},
+                         fl.node_distribution(c))
+
+        # full node is excluded from index
+        for i in range(3):
+            vm.Vm(nodes["node2"], "full%d" % i, fl)
+        self.assertEqual({nodes["node1"]: 1}, fl.node_distribution(c))
+        self.assertEqual(1, fl.amount(c))
+
+        node1 = nodes["node1"]
+        other = cloud.Cloud("other")
+        c.transfer_node(u"node1", other)
+        self.assertEqual({}, fl.node_distribution(c))
+        self.assertEqual({node1: 1}, fl.node_distribution(other))
+
+    @mock.patch('condensation.cloud.CONF')
+    @mock.patch('condensation.node.CONF')
+    def test_calc_required_flavors_in_pool(self, node_conf, cloud_conf):
+        node_conf.condense = cloud_conf.condense = mock.Mock(
+            core_reduction_coef=1, ram_reduction_coef=1, precision=85)
+        flavors = [flavor.Flavor(str(i), "fl%d" % i, i, i)
+                   for i in range(1, 4)]
+        for fl in flavors:
+            fl.reduce_resources(1, 1)
+        nodes = {name: node.Node(name, 12, 12, 1, 1, 1, 1)
+                 for name in (u"node%d" % i for i in range(4))}
+        c = cloud.Cloud("test", nodes)
+        for i, fl in enumerate(flavors * 3):
+            vm.Vm(nodes[u"node%d" % (i % 4)], str(i), fl)
+
+        results = []
+        pool = multiprocessing.Pool(2)
+        self.addCleanup(pool.terminate)
+        for c.pool in (None, pool):
+            c.required_flavors_for_nodes = {}
+            c.node_ids_to_be_recalculated = list(nodes)
+            c.calc_required_flavors_for_nodes()
+            results.append(c.required_flavors_for_nodes)
+
+        self.assertEqual(set(nodes), set(results[0]))
+        self.assertEqual(results[0], results[1])
+
+    def _make_spread_cloud(self, cloud_conf, node_conf):
+        node_conf.condense = cloud_conf.condense = mock.Mock(
+            core_reduction_coef=1, ram_reduction_coef=1, precision=85,
+            workers=1, cache_size=16, max_iterations=0, time_limit=0)
+        fl = flavor.Flavor("1", "small", 1, 1)
+        fl.reduce_resources(1, 1)
+        nodes = {name: node.Node(name, 4, 4, 1, 1, 1, 1)
+                 for name in (u"node%d" % i for i in range(4))}
+        c = cloud.Cloud("test", nodes)
+        for i in range(8):
+            vm.Vm(nodes[u"node%d" % (i % 4)], u"vm%d" % i, fl)
+        return c
+
+    @mock.patch('condensation.cloud.CONF')
+    @mock.patch('condensation.node.CONF')
+    def test_condense(self, node_conf, cloud_conf):
+        c = self._make_spread_cloud(cloud_conf, node_conf)
+
+        c.condense()
+
+        self.assertEqual(2, len([n for n in c.nodes.values() if n.vms]))
+        self.assertEqual(2, c.stats['nodes_filled'])
+        self.assertEqual(4, c.stats['vms_moved'])
+
+    @mock.patch('condensation.action.data_storage')
+    def test_migrate_to_flushes_steps_on_error(self, storage):
+        c = cloud.Cloud("test")
+        c.nodes = {u"node": mock.Mock()}
+        c.groups = [mock.Mock()]
+        c.condense = mock.Mock()
+        c.transfer_nodes = mock.Mock()
+        c.migrate_vms = mock.Mock(side_effect=[None, RuntimeError])
+        dst = mock.Mock()
+
+        self.assertRaises(RuntimeError, c.migrate_to, dst)
+
+        storage.put_many.assert_called_once_with([("0_test", mock.ANY)])
+        self.assertTrue(dst.actions.flush.called)
+
+    @mock.patch('condensation.cloud.CONF')
+    @mock.patch('condensation.node.CONF')
+    def test_condense_max_iterations(self, node_conf, cloud_conf):
+        c = self._make_spread_cloud(cloud_conf, node_conf)
+        cloud_conf.condense.max_iterations = 1
+
+        c.condense()
+
+        self.assertEqual(1, c.stats['iterations'])
+        self.assertEqual(3, len([n for n in c.nodes.values() if n.vms]))
+
+    @mock.patch('condensation.node.CONF')
+    def test_free_nodes_index(self, conf):
+        conf.condense = mock.Mock(core_reduction_coef=1,
+                                  ram_reduction_coef=1, precision=85)
+        fl = flavor.Flavor("1", "small", 2, 1)
+        nodes = {name: node.Node(name, 4, 8, 1, 1, 1, 1)
+                 for name in (u"node1", u"node2")}
+        c = cloud.Cloud("test", nodes)
+        vm.Vm(nodes[u"node1"], u"vm1", fl)
+        self.assertEqual([nodes[u"node1"], nodes[u"node2"]],
+                         [key[-1] for key in c.free_nodes])
+
+        for i in range(3):
+            vm.Vm(nodes[u"node1"], u"full%d" % i, fl)
+        self.assertEqual([nodes[u"node2"]], [key[-1] for key in c.free_nodes])
+
+    @mock.patch('condensation.cloud.CONF')
+    @mock.patch('condensation.node.CONF')
+    def test_migrate_group_best_fit(self, node_conf, cloud_conf):
+        node_conf.condense = cloud_conf.condense = mock.Mock(
+            core_reduction_coef=1, ram_reduction_coef=1, precision=85)
+        small = flavor.Flavor("1", "small", 1, 1)
+        large = flavor.Flavor("2", "large", 3, 3)
+        for fl in (small, large):
+            fl.reduce_resources(1, 1)
+        src_node = node.Node(u"src", 16, 16, 1, 1, 1, 1)
+        vms = [vm.Vm(src_node, u"vm%d" % i, fl)
+               for i, fl in enumerate([small, large, small, large])]
+        group = mock.Mock()
+        group.get_all_vms.return_value = vms
+        src = cloud.Cloud("src", {u"src": src_node}, [group])
+        dst_nodes = {name: node.Node(name, 4, 4, 1, 1, 1, 1)
+                     for name in (u"dst1", u"dst2")}
+        dst = cloud.Cloud("dst", dst_nodes)
+
+        with mock.patch.object(node.Node,
+                               "calculate_flavors_required") as knapsack:
+            self.assertTrue(src.migrate_group(dst))
+            self.assertFalse(knapsack.called)
+
+        self.assertEqual({}, src_node.vms)
+        for dst_node in dst_nodes.values():
+            self.assertEqual((0, 0), dst_node.free_resources)
@@ -33,3 +33,17 @@ class GroupTest(test.TestCase):
     def test_parent_count(self):
         g = group.Group()
         self.assertEqual(int, type(g.parent_count()))
+
+    def test_capacity_is_invalidated(self):
+        vms = [mock.Mock(flavor=mock.Mock(ram=2, core=1)) for i in range(3)]
+        child = group.Group("child")
+        child.add_vms({"vm0": vms[0], "vm1": vms[1]})
+        g = group.Group()
+        g.add_groups([child])
+        g.add_vms({"vm1": vms[1]})
+        self.assertEqual((4, 2), g.capacity)
+        self.assertEqual(set(vms[:2]), set(g.iter_vms()))
+
+        child.add_vms({"vm2": vms[2]})
+        self.assertEqual((6, 3), g.capacity)
+        self.assertEqual(3, len(g.get_all_vms()))
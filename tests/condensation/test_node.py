@@ -15,7 +15,8 @@ class NodeTest(test.TestCase):
 
     def test_link_vm(self):
         num = 3
-        vms = [mock.Mock(id=i) for i in range(3)]
+        vms = [mock.Mock(id=i, flavor=mock.Mock(ram=1, core=1))
+               for i in range(3)]
         n = node.Node(*range(7))
         initial_length = len(n.vms)
         map(n.link_vm, vms)
@@ -40,3 +41,19 @@ class NodeTest(test.TestCase):
     def test_calculate_flavors_required(self):
         n = node.Node(*range(1, 8))
         self.assertEqual(dict, type(n.calculate_flavors_required({})))
+
+    def test_resources_are_updated_on_link_unlink(self):
+        n = node.Node("node", 8, 16, 1, 1, 1, 1)
+        small = mock.Mock(ram=2, core=1)
+        big = mock.Mock(ram=4, core=2)
+        vms = [mock.Mock(vm_id=i, flavor=fl)
+               for i, fl in enumerate([small, small, big])]
+        map(n.link_vm, vms)
+        self.assertEqual((8, 4), n.free_resources)
+        self.assertEqual({small: 2, big: 1}, n.flavors_count)
+
+        n.unlink_vm(vms[0])
+        n.unlink_vm(vms[0])
+        self.assertEqual((10, 5), n.free_resources)
+        self.assertEqual({small: 1, big: 1}, n.flavors_count)
+        self.assertIsNone(n.get_vm_by_flavor(mock.Mock()))
@@ -0,0 +1,50 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import json
+import shutil
+import tempfile
+
+import mock
+
+from make_filters import make_filters
+from tests import test
+
+
+class MakeFiltersTestCase(test.TestCase):
+    def setUp(self):
+        super(MakeFiltersTestCase, self).setUp()
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    @mock.patch('make_filters.make_filters.data_storage')
+    def test_make_batches_database_calls(self, storage):
+        storage.BATCH_SIZE = 10
+        steps = [json.dumps({'migrate': [['vm1', 'node1']]}),
+                 json.dumps({'migrate': [['vm2', 'node2'],
+                                         ['vm3', 'node1']]})]
+        storage.get_many.return_value = steps + [None] * 8
+        storage.scan.return_value = iter(['migrate_vm_old'])
+
+        make_filters.make(self.folder, '2015-01-01')
+
+        storage.delete_batch.assert_called_once_with(['migrate_vm_old'])
+        self.assertEqual(1, storage.get_many.call_count)
+        storage.put_many.assert_called_once_with(
+            {'migrate_vm_vm1': 'node1', 'migrate_vm_vm2': 'node2',
+             'migrate_vm_vm3': 'node1'})
+        self.assertFalse(storage.get.called)
+        self.assertFalse(storage.put.called)
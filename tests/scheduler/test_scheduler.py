@@ -13,10 +13,20 @@
 # limitations under the License.
 
 
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+
 import mock
 
+from cloudferrylib.scheduler import checkpoint
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import namespace
 from cloudferrylib.scheduler import scheduler
 from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
 
 from tests import test
 
@@ -66,9 +76,263 @@ class MigrationRollbackTestCase(test.TestCase):
         assert not migration.run.called
 
 
-def mock_out_task(throws_exception=False):
+class ParallelSchedulerTestCase(test.TestCase):
+    def setUp(self):
+        super(ParallelSchedulerTestCase, self).setUp()
+        self.started = threading.Event()
+        self.first = mock_out_task()
+        self.last = mock_out_task()
+
+    def _make_net(self, *branches):
+        net = self.first
+        for branch in branches:
+            net = net & branch
+        net >> self.last
+        return cursor.Cursor(self.first)
+
+    def test_branches_run_at_the_same_time(self):
+        waiting = mock_out_task(result=lambda **kw: {
+            'waited': self.started.wait(5)})
+        starting = mock_out_task(result=lambda **kw: {
+            'started': self.started.set() or True})
+
+        s = scheduler.Scheduler(migration=self._make_net(waiting, starting),
+                                workers=2,
+                                pool_type=scheduler.THREAD_POOL)
+        s.start()
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertTrue(s.namespace.vars['waited'])
+        self.assertTrue(s.namespace.vars['started'])
+        self.assertTrue(self.last.run.call_args[1]['waited'])
+
+    def test_branches_run_in_process_pool(self):
+        branches = [mock_out_task(result={'a': 1}),
+                    mock_out_task(result={'b': 2})]
+
+        s = scheduler.Scheduler(migration=self._make_net(*branches),
+                                workers=2,
+                                pool_type=scheduler.PROCESS_POOL)
+        s.start()
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(1, s.namespace.vars['a'])
+        self.assertEqual(2, s.namespace.vars['b'])
+
+    def test_thread_task_branch_is_not_registered_in_parent(self):
+        thread_task = thread_tasks.WrapThreadTask(
+            mock_out_task(result={'a': 1}))
+
+        s = scheduler.Scheduler(
+            migration=self._make_net(thread_task, mock_out_task()),
+            workers=2, pool_type=scheduler.THREAD_POOL)
+        s.start()
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(1, s.namespace.vars['a'])
+        self.assertEqual({}, s.namespace.vars[namespace.CHILDREN])
+
+    def test_conflicting_branches_are_rolled_back(self):
+        branches = [mock_out_task(result={'a': 1}),
+                    mock_out_task(result={'a': 2})]
+        rollback = mock_out_task()
+
+        s = scheduler.Scheduler(migration=self._make_net(*branches),
+                                rollback=[rollback], workers=2)
+        s.start()
+
+        self.assertEqual(scheduler.ERROR, s.status_error)
+        self.assertIsInstance(s.exception, namespace.NamespaceConflict)
+        self.assertNotIn('a', s.namespace.vars)
+        self.assertTrue(rollback.run.called)
+        self.assertFalse(self.last.run.called)
+
+    def test_failed_branch_stops_chain(self):
+        branches = [mock_out_task(throws_exception=True),
+                    mock_out_task(result={'a': 1})]
+
+        s = scheduler.Scheduler(migration=self._make_net(*branches),
+                                workers=2)
+        s.start()
+
+        self.assertEqual(scheduler.ERROR, s.status_error)
+        self.assertFalse(self.last.run.called)
+
+
+class ThreadTaskResultTestCase(test.TestCase):
+    def _start(self, *child_tasks):
+        child_net = child_tasks[0]
+        for child_task in child_tasks[1:]:
+            child_net = child_net >> child_task
+        thread_task = thread_tasks.WrapThreadTask(child_net.go_start())
+        first = mock_out_task()
+        self.last = mock_out_task()
+        first & thread_task
+        first >> thread_tasks.WaitThreadTask(thread_task) >> self.last
+        s = scheduler.Scheduler(migration=cursor.Cursor(first))
+        s.start()
+        return s
+
+    def test_child_changes_are_returned_to_parent(self):
+        s = self._start(mock_out_task(result={'a': 1}),
+                        mock_out_task(result={'b': 2}))
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(1, s.namespace.vars['a'])
+        self.assertEqual(2, self.last.run.call_args[1]['b'])
+
+    def test_child_error_is_raised_in_parent(self):
+        s = self._start(mock_out_task(throws_exception=True))
+
+        self.assertEqual(scheduler.ERROR, s.status_error)
+        self.assertFalse(self.last.run.called)
+
+    def _start_without_wait(self, child_task, last):
+        thread_task = thread_tasks.WrapThreadTask(child_task)
+        first = mock_out_task()
+        first & thread_task
+        first >> last
+        s = scheduler.Scheduler(migration=cursor.Cursor(first))
+        s.start()
+        return s.namespace.vars[namespace.CHILDREN][thread_task]
+
+    def test_not_waited_child_is_released(self):
+        child = self._start_without_wait(
+            mock_out_task(result={'a': 'x' * 1024 * 1024}), mock_out_task())
+
+        self.assertEqual(0, child['process'].exitcode)
+
+    def test_not_waited_child_is_terminated_on_error(self):
+        child = self._start_without_wait(
+            mock_out_task(result={'a': 'x' * 1024 * 1024}),
+            mock_out_task(throws_exception=True))
+
+        self.assertIsNotNone(child['process'].exitcode)
+        self.assertIsNone(child['result'])
+
+    def test_wait_all_merges_children(self):
+        children = {}
+        for name, value in (('a', 1), ('b', 2)):
+            result, child_result = multiprocessing.Pipe(False)
+            child_result.send(({name: value}, None, []))
+            children[name] = {'process': mock.Mock(), 'result': result}
+
+        self.assertEqual(
+            {'a': 1, 'b': 2},
+            thread_tasks.WaitThreadAllTask().run(__children__=children))
+        self.assertTrue(children['a']['process'].join.called)
+
+
+class StatefulTask(task.Task):
+    def __init__(self, state=None):
+        super(StatefulTask, self).__init__()
+        self.state = state
+
+    def run(self, **kwargs):
+        return {'stateful': True}
+
+    def save(self):
+        return self.state
+
+    def restore(self, state):
+        self.state = state
+
+
+class CheckpointTestCase(test.TestCase):
+    def setUp(self):
+        super(CheckpointTestCase, self).setUp()
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        self.path = os.path.join(folder, 'checkpoint')
+
+    def _start(self, migration, resume=False, rollback=None):
+        s = scheduler.Scheduler(migration=migration, rollback=rollback,
+                                checkpoint=checkpoint.Checkpoint(self.path),
+                                resume=resume)
+        s.start()
+        return s
+
+    def test_failed_migration_is_resumed(self):
+        stateful = StatefulTask('saved')
+        self._start([mock_out_task(result={'a': 1}), stateful,
+                     mock_out_task(throws_exception=True)])
+        self.assertTrue(os.path.exists(self.path))
+
+        restarted = StatefulTask()
+        tasks = [mock_out_task(), restarted, mock_out_task(result={'b': 2})]
+        s = self._start(tasks, resume=True)
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertFalse(tasks[0].run.called)
+        self.assertEqual('saved', restarted.state)
+        self.assertEqual(1, tasks[2].run.call_args[1]['a'])
+        self.assertTrue(tasks[2].run.call_args[1]['stateful'])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_cursor_path_is_replayed(self):
+        first, second, third, fourth = [mock_out_task() for _ in range(4)]
+        first.run.side_effect = lambda **kw: first.set_next_path(1)
+        fourth.run.side_effect = Exception
+        first | third
+        first >> second >> fourth
+        third.next_element[0] = fourth
+        self._start(cursor.Cursor(first))
+        self.assertFalse(second.run.called)
+
+        tasks = [mock_out_task() for _ in range(4)]
+        tasks[0] | tasks[2]
+        tasks[0] >> tasks[1] >> tasks[3]
+        tasks[2].next_element[0] = tasks[3]
+        s = self._start(cursor.Cursor(tasks[0]), resume=True)
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual([False, False, False, True],
+                         [t.run.called for t in tasks])
+
+    def _thread_task_net(self, child, after_wait):
+        first = mock_out_task()
+        thread_task = thread_tasks.WrapThreadTask(child)
+        first & thread_task
+        first >> mock_out_task(throws_exception=after_wait is None) >> \
+            thread_tasks.WaitThreadTask(thread_task) >> \
+            (after_wait or mock_out_task())
+        return cursor.Cursor(first)
+
+    def test_thread_task_is_rerun_if_not_waited(self):
+        self._start(self._thread_task_net(
+            mock_out_task(result={'a': 1}), None))
+
+        last = mock_out_task()
+        s = self._start(self._thread_task_net(
+            mock_out_task(result={'a': 1}), last), resume=True)
+
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(1, last.run.call_args[1]['a'])
+
+    def test_unpicklable_vars_are_skipped(self):
+        saved = checkpoint.Checkpoint(self.path)
+        saved.save(scheduler.MIGRATION, [0], {'a': 1, 'f': lambda: 1,
+                                              'b': [2]}, {})
+
+        state = saved.load()
+
+        self.assertEqual({'a': 1, 'b': [2]}, state['vars'])
+        self.assertEqual([0], state['path'])
+
+    def test_rolled_back_migration_is_not_resumed(self):
+        self._start([mock_out_task(throws_exception=True)],
+                    rollback=[mock_out_task()])
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+def mock_out_task(throws_exception=False, result=None):
     t = task.Task()
     t.run = mock.Mock()
+    if callable(result):
+        t.run.side_effect = result
+    else:
+        t.run.return_value = result
     if throws_exception:
         t.run.side_effect = Exception
     return t
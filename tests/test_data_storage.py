@@ -0,0 +1,54 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+import data_storage
+from tests import test
+
+
+class DataStorageTestCase(test.TestCase):
+    def setUp(self):
+        super(DataStorageTestCase, self).setUp()
+        self.connection = mock.Mock()
+        self.pipe = self.connection.pipeline.return_value
+        patcher = mock.patch.object(data_storage, 'CONNECTION',
+                                    [self.connection])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.object(data_storage, 'BATCH_SIZE', 2)
+    def test_put_many_executes_pipeline_per_batch(self):
+        data_storage.put_many([('a', 1), ('b', 2), ('c', 3)])
+
+        self.assertEqual([mock.call('a', 1), mock.call('b', 2),
+                          mock.call('c', 3)], self.pipe.set.call_args_list)
+        self.assertEqual(2, self.pipe.execute.call_count)
+
+    @mock.patch.object(data_storage, 'BATCH_SIZE', 2)
+    def test_get_many_uses_mget_per_batch(self):
+        self.connection.mget.side_effect = lambda keys: [k.upper()
+                                                         for k in keys]
+
+        self.assertEqual(['A', 'B', 'C'],
+                         data_storage.get_many(['a', 'b', 'c']))
+        self.assertEqual(2, self.connection.mget.call_count)
+
+    def test_scan_does_not_use_keys(self):
+        self.connection.scan_iter.return_value = iter(['a'])
+
+        self.assertEqual(['a'], list(data_storage.scan('a*')))
+        self.assertFalse(self.connection.keys.called)